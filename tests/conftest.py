@@ -0,0 +1,120 @@
+import asyncio
+import json
+
+import pytest
+
+from tng.game.exc import IllegalMove
+from tng.game.factory import GameFactory
+from tng.game.game import Phase
+from tng.game.types import Direction, PlayerColor, Position, Tile
+
+
+def new_mid_game(random):
+    """
+    Every tile placed and lit, players on four way passages, moving.
+    """
+
+    game = GameFactory(random).new_game(
+        PlayerColor.red, PlayerColor.blue, PlayerColor.green, PlayerColor.purple
+    )
+    n = game.board.edge_length
+    board = game.board
+
+    for idx in range(n * n):
+        board = board.place_tile_idx(
+            idx, random.choice(list(Tile)[:4]), random.choice(list(Direction))
+        )
+
+    players = []
+
+    for p, idx in zip(game.players, random.sample(range(n * n), len(game.players))):
+        pos = Position(idx % n, idx // n)
+
+        board = board.place_tile(pos, Tile.four_way_passage).move_player(p.color, None, pos)
+        players.append(p._replace(pos=pos))
+
+    return game._replace(
+        board=board, players=players, phases=[Phase.move_player], lit=(1 << n * n) - 1
+    ).rehash()
+
+
+def play_random(fsm, game, random, count):
+    """
+    Applies up to count random legal moves, returning every (move, game)
+    pair. Stops early when no legal move leads to a game.
+    """
+
+    played = []
+
+    while len(played) < count:
+        candidates = list(fsm.legal_moves(game))
+
+        random.shuffle(candidates)
+
+        for move in candidates:
+            try:
+                next_game = fsm.apply(game, move)
+            except IllegalMove:
+                continue
+
+            if next_game is not None:
+                game = next_game
+                played.append((move, game))
+                break
+        else:
+            break
+
+    return played
+
+
+@pytest.fixture
+def mid_game():
+    return new_mid_game
+
+
+@pytest.fixture
+def play():
+    return play_random
+
+
+@pytest.fixture
+def rotate_placed():
+    """
+    Blue on its start tile, as after placing it, to rotate it.
+    """
+
+    game = GameFactory().new_game(
+        PlayerColor.blue, PlayerColor.red, PlayerColor.green, PlayerColor.purple
+    )
+    blue = game.players[0]._replace(pos=Position(3, 4))
+
+    return game._replace(
+        board=game.board.place_tile(blue.pos, Tile.start).move_player(blue.color, None, blue.pos),
+        players=[blue, *game.players[1:]],
+        phases=[Phase.place_start, Phase.rotate_placed],
+    ).rehash()
+
+
+async def http_request(port, method, path, body=None):
+    """
+    One HTTP/1.1 request to 127.0.0.1, returns the status and JSON body.
+    """
+
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    data = b'' if body is None else json.dumps(body).encode()
+
+    writer.write(
+        f'{method} {path} HTTP/1.1\r\nContent-Length: {len(data)}\r\n'
+        'Connection: close\r\n\r\n'.encode() + data
+    )
+
+    head = await reader.readuntil(b'\r\n\r\n')
+    response = await reader.read()
+    writer.close()
+
+    return int(head.split(b' ')[1]), json.loads(response)
+
+
+@pytest.fixture
+def http():
+    return http_request
@@ -0,0 +1,129 @@
+import asyncio
+import threading
+
+import pytest
+
+from tng.be.actor import MatchActor, Matches
+from tng.be.store import FileMatchStore, MatchNotFound
+from tng.game.fsm import TNGFSM
+from tng.game.moves import Move, MoveType, RotateTile
+from tng.game.types import Direction, PlayerColor
+
+
+class SlowStore(FileMatchStore):
+    """
+    Holds appends until released, loads while load_gate is clear.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+
+        self.appending = asyncio.Event()
+        self.release = asyncio.Event()
+        self.loading = threading.Event()
+        self.load_gate = threading.Event()
+        self.load_gate.set()
+
+    def load(self, match_id):
+        self.loading.set()
+        self.load_gate.wait()
+
+        return super().load(match_id)
+
+    async def append_async(self, match_id, move, game):
+        self.appending.set()
+        await self.release.wait()
+
+        return await super().append_async(match_id, move, game)
+
+
+def test_caller_gives_up(tmp_path, rotate_placed):
+    fsm = TNGFSM()
+    move = Move(
+        player=PlayerColor.blue,
+        param=RotateTile(move=MoveType.rotate_tile, direction=Direction.e),
+    )
+
+    async def run():
+        store = SlowStore(tmp_path, fsm, fsync=False)
+        store.create('m1', rotate_placed)
+
+        actor = MatchActor('m1', rotate_placed, fsm, store)
+        actor.start()
+
+        submitted = asyncio.create_task(actor.submit(move))
+
+        await store.appending.wait()
+        submitted.cancel()
+        store.release.set()
+
+        # the move is applied all the same, and the actor keeps going
+        assert await asyncio.wait_for(actor.drain(), 1) == 1
+
+        next_move = next(fsm.legal_moves(actor.game))
+
+        assert await asyncio.wait_for(actor.submit(next_move), 1) == 2
+        assert store.load('m1') == actor.game
+
+        await actor.stop()
+
+    asyncio.run(run())
+
+
+def test_released_not_reloaded(tmp_path, rotate_placed):
+    fsm = TNGFSM()
+    move = Move(
+        player=PlayerColor.blue,
+        param=RotateTile(move=MoveType.rotate_tile, direction=Direction.e),
+    )
+
+    async def run():
+        store = SlowStore(tmp_path, fsm, fsync=False)
+        matches = Matches(fsm, store=store)
+        actor = await matches.add(rotate_placed, 'm1')
+
+        submitted = asyncio.create_task(actor.submit(move))
+        await store.appending.wait()
+
+        # the supervisor sent a move to the old owner, draining its queue
+        releasing = asyncio.create_task(matches.release('m1'))
+        await asyncio.sleep(0)
+
+        with pytest.raises(MatchNotFound):
+            await matches.get('m1')
+
+        store.release.set()
+        released = await releasing
+
+        assert await submitted == released.version == 1
+        assert len(matches) == 0
+
+        # loaded by a request after the release: the same
+        with pytest.raises(MatchNotFound):
+            await matches.load('m1')
+
+        # until it comes back
+        adopted = await matches.adopt('m1', released.game, released.version)
+
+        assert await matches.get('m1') is adopted
+
+        await matches.close()
+
+        # released while being loaded from the store by another process
+        other = Matches(fsm, store=store)
+        store.load_gate.clear()
+        getting = asyncio.create_task(other.get('m1'))
+        await asyncio.to_thread(store.loading.wait)
+
+        releasing = asyncio.create_task(other.release('m1'))
+        await asyncio.sleep(0)
+        store.load_gate.set()
+
+        # the request got it before the release, which stopped it after
+        assert await getting is await releasing
+        assert len(other) == 0
+
+        with pytest.raises(MatchNotFound):
+            await other.get('m1')
+
+    asyncio.run(run())
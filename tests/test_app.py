@@ -0,0 +1,126 @@
+import asyncio
+import json
+
+import pytest
+from pydantic import TypeAdapter
+
+from tng.be.actor import Matches
+from tng.be.app import serve
+from tng.be.http import HTTPError, read_request
+from tng.game.diff import apply_patch, decode_patch
+from tng.game.fsm import TNGFSM
+from tng.game.game import Game
+from tng.game.moves import Move, MoveType, RotateTile
+from tng.game.types import Direction, PlayerColor
+
+
+async def next_event(reader):
+    event = await reader.readuntil(b'\n\n')
+    name, data = event.decode().strip().split('\n')
+
+    return name.removeprefix('event: '), json.loads(data.removeprefix('data: '))
+
+
+def test_server(rotate_placed, http):
+    async def run():
+        matches = Matches()
+        server = await serve(matches, port=0)
+        port = server.sockets[0].getsockname()[1]
+        game = rotate_placed
+
+        await matches.add(game, 'm1')
+
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b'GET /matches/m1/events HTTP/1.1\r\n\r\n')
+
+        head = await reader.readuntil(b'\r\n\r\n')
+        assert head.startswith(b'HTTP/1.1 200')
+
+        name, state = await next_event(reader)
+        assert name == 'game'
+        assert state['version'] == 0
+        assert TypeAdapter(Game).validate_python(state['game']) == game
+
+        move = Move(
+            player=PlayerColor.blue,
+            param=RotateTile(move=MoveType.rotate_tile, direction=Direction.e),
+        )
+
+        assert await http(port, 'POST', '/matches/m1/moves', move.model_dump(mode='json')) == (
+            200,
+            {'version': 1},
+        )
+
+        name, event = await next_event(reader)
+        assert name == 'move'
+        assert event['version'] == 1
+        assert Move.model_validate(event['move']) == move
+
+        game2 = TNGFSM().apply(game, move)
+        patch = decode_patch(json.dumps(event['patch']))
+        assert apply_patch(game, patch) == game2
+
+        # blue already rotated its tile
+        status, body = await http(port, 'POST', '/matches/m1/moves', move.model_dump(mode='json'))
+        assert status == 409
+
+        status, body = await http(port, 'GET', '/matches/m1')
+        assert status == 200
+        assert body['version'] == 1
+
+        status, body = await http(port, 'GET', '/matches/nope')
+        assert status == 404
+
+        status, body = await http(port, 'POST', '/matches/m1/moves', {'player': 'blue'})
+        assert status == 400
+
+        status, body = await http(
+            port, 'POST', '/matches', {'players': ['blue', 'red', 'green', 'purple']}
+        )
+        assert status == 201
+        assert body['version'] == 0
+        assert len(matches) == 2
+
+        status, body = await http(port, 'POST', '/matches', {'players': ['blue']})
+        assert status == 400
+
+        # the supervisor routes are only served to the supervisor
+        for method, path in [
+            ('POST', '/matches/m1/release'),
+            ('POST', '/matches/m2/adopt'),
+            ('PUT', '/matches/m2'),
+            ('GET', '/matches'),
+        ]:
+            status, body = await http(port, method, path, {'players': ['blue']})
+            assert status in (404, 405)
+
+        assert 'm1' in matches.ids()
+        assert len(matches) == 2
+
+        server.close()
+        await matches.close()
+
+        # the event stream ends with the match
+        assert await reader.read() == b''
+
+        writer.close()
+        await server.wait_closed()
+
+    asyncio.run(run())
+
+
+def test_invalid_content_length():
+    async def read(content_length):
+        reader = asyncio.StreamReader()
+        reader.feed_data(
+            f'POST /matches HTTP/1.1\r\nContent-Length: {content_length}\r\n\r\n'.encode()
+        )
+        reader.feed_eof()
+
+        return await read_request(reader)
+
+    for content_length in ['-1', '+2', '1_0', 'x', '\u0661', '']:
+        with pytest.raises(HTTPError) as e:
+            asyncio.run(read(content_length))
+
+        assert e.value.status == 400
@@ -0,0 +1,100 @@
+from random import Random
+
+import pytest
+
+from tng.be.archive import Archive, ArchiveError, match_record, rebuild
+from tng.be.store import MatchNotFound
+from tng.game.factory import GameFactory
+from tng.game.fsm import TNGFSM
+from tng.game.game import BitBoard, Phase
+from tng.game.types import PlayerColor
+
+
+def records(count, seed=0):
+    random = Random(seed)
+    fsm = TNGFSM()
+
+    for i in range(count):
+        factory = GameFactory(random, board_class=[BitBoard, GameFactory().board_class][i % 2])
+        colors = random.sample(list(PlayerColor), 4 + i % 2)
+        game = factory.new_game(*colors)
+
+        # the record only keeps them, see test_rebuild
+        moves = list(fsm.legal_moves(game))[: i % 7]
+
+        yield match_record(f'm{i}', game, moves, game._replace(phases=[Phase.game_won]))
+
+
+def test_get(tmp_path):
+    archive = Archive(tmp_path, segment_size=500, fsync=False)
+    written = list(records(50))
+
+    for record in written:
+        archive.append(record)
+
+    assert len(archive.sealed) > 3
+    assert len(archive) == 50
+
+    for record in written:
+        assert archive.get(record.match_id) == record
+
+    assert list(archive.records()) == written
+
+    with pytest.raises(MatchNotFound):
+        archive.get('m50')
+
+    with pytest.raises(ArchiveError):
+        archive.append(written[3])
+
+    # ids are ASCII, with their length on a byte
+    with pytest.raises(ValueError):
+        archive.append(written[3]._replace(match_id='m\u00e9'))
+
+    long_id = written[3]._replace(match_id='m' * 128)
+    archive.append(long_id)
+
+    assert archive.get(long_id.match_id) == long_id
+
+    archive.close()
+
+    # read only, from the indexes and the scanned last segment
+    reader = Archive(tmp_path, readonly=True)
+
+    assert len(reader) == 51
+    assert reader.get('m49') == written[49]
+    assert reader.get('m0') == written[0]
+
+    reader.close()
+
+
+def test_torn_record(tmp_path):
+    written = list(records(3))
+    archive = Archive(tmp_path, fsync=False)
+
+    for record in written[:2]:
+        archive.append(record)
+
+    archive.close()
+
+    with open(tmp_path / '000000.seg', 'ab') as f:
+        f.write(b'\0\0\1')
+
+    reopened = Archive(tmp_path, fsync=False)
+    reopened.append(written[2])
+
+    assert list(reopened.records()) == written
+
+    reopened.close()
+
+
+def test_rebuild():
+    game = GameFactory(Random(1)).new_game(
+        PlayerColor.blue, PlayerColor.red, PlayerColor.green, PlayerColor.purple
+    )
+    record = match_record('m1', game, [], game)
+
+    assert rebuild(record) == game
+    assert record.outcome == Phase.place_start
+
+    with pytest.raises(ValueError):
+        match_record('m1', game._replace(turn=1).rehash(), [], game)
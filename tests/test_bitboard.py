@@ -0,0 +1,80 @@
+from tng.game.game import Board, BitBoard
+from tng.game.types import Direction, Tile, PlayerColor, Position
+
+
+def sample_board() -> Board:
+    return (
+        Board.empty(6)
+        .place_tile(Position(3, 4), Tile.start, Direction.e)
+        .place_tile(Position(3, 3), Tile.t_passage, Direction.w)
+        .place_tile(Position(2, 4), Tile.straight_passage, Direction.e)
+        .place_tile(Position(0, 4), Tile.wax_eater)
+        .place_tile(Position(5, 5), Tile.four_way_passage)
+        .move_player(PlayerColor.blue, None, Position(3, 4))
+        .move_player(PlayerColor.red, None, Position(5, 5))
+    )
+
+
+def test_round_trip():
+    board = sample_board()
+
+    assert BitBoard.from_board(board).to_board() == board
+
+
+def test_same_api():
+    board = sample_board()
+    bitboard = BitBoard.from_board(board)
+
+    for y in range(6):
+        for x in range(6):
+            pos = Position(x, y)
+
+            assert bitboard.at(pos) == board.at(pos)
+
+            if board.at(pos).tile is None:
+                continue
+
+            assert bitboard.visible_cells_coords_from(pos) == board.visible_cells_coords_from(pos)
+            assert bitboard.visible_cells_from(pos) == board.visible_cells_from(pos)
+
+            for d in Direction:
+                assert bitboard.is_connected(pos, d) == board.is_connected(pos, d)
+
+    moves = [
+        lambda b: b.move_player(PlayerColor.blue, Position(3, 4), Position(3, 3)),
+        lambda b: b.place_tile(Position(3, 4), Tile.pit),
+        lambda b: b.drop_tiles([Position(2, 4), Position(0, 4)]),
+    ]
+
+    for m in moves:
+        board = m(board)
+        bitboard = m(bitboard)
+
+        assert bitboard.to_board() == board
+
+
+def test_shift_wraps():
+    bitboard = BitBoard.empty(6)
+    corner = 1 << Position(0, 0).idx(6)
+
+    assert bitboard.shift(corner, Direction.n) == 1 << Position(0, 5).idx(6)
+    assert bitboard.shift(corner, Direction.w) == 1 << Position(5, 0).idx(6)
+    assert bitboard.shift(corner, Direction.s) == 1 << Position(0, 1).idx(6)
+    assert bitboard.shift(corner, Direction.e) == 1 << Position(1, 0).idx(6)
+
+
+def test_lit_mask():
+    board = sample_board()
+    bitboard = BitBoard.from_board(board)
+
+    lit = {Position(3, 4), Position(5, 5)}
+    lit.update(board.visible_cells_coords_from(Position(3, 4)))
+
+    expected = 0
+
+    for p in lit:
+        expected |= 1 << p.idx(6)
+
+    assert bitboard.lit_mask([PlayerColor.blue]) == expected
+    assert bitboard.empty_mask & bitboard.tiled_mask == 0
+    assert bitboard.occupied_mask == 1 << Position(3, 4).idx(6) | 1 << Position(5, 5).idx(6)
@@ -0,0 +1,56 @@
+from pydantic import BaseModel
+
+from tng.game.game import Board, Cell, CellStore, Game
+from tng.game.factory import GameFactory
+from tng.game.types import Direction, PlayerColor, Position, Tile
+
+
+def test_set_copies_only_the_touched_row():
+    board = Board.empty(6)
+
+    board2 = board.place_tile(Position(2, 3), Tile.key)
+
+    shared = [a is b for a, b in zip(board.cells.rows, board2.cells.rows)]
+
+    assert shared == [True, True, True, False, True, True]
+
+    # old snapshot is untouched
+    assert board.at(Position(2, 3)).tile is None
+    assert board2.at(Position(2, 3)).tile is Tile.key
+
+
+def test_update_groups_rows():
+    store = Board.empty(6).cells
+    key = Cell(tile=Tile.key, direction=Direction.n, players=[])
+
+    store2 = store.update([(0, key), (5, key), (35, key)])
+
+    assert [c.tile for c in store2].count(Tile.key) == 3
+    assert store2.rows[1] is store.rows[1]
+    assert store.update([]) is store
+
+
+def test_sequence_api():
+    store = Board.empty(7).cells
+
+    assert len(store) == 49
+    assert store[-1] is store[48]
+    assert store[0:7] == list(store.rows[0])
+    assert store == list(store)
+    assert CellStore.from_cells(list(store)) == store
+
+
+def test_pydantic_round_trip():
+    class Snapshot(BaseModel):
+        game: Game
+
+    game = (
+        GameFactory()
+        .new_game(PlayerColor.red, PlayerColor.blue, PlayerColor.green, PlayerColor.purple)
+        .place_tile(Position(1, 1), Tile.start)
+    )
+
+    restored = Snapshot.model_validate_json(Snapshot(game=game).model_dump_json()).game
+
+    assert isinstance(restored.board.cells, CellStore)
+    assert restored == game
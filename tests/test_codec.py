@@ -0,0 +1,92 @@
+import pytest
+
+from tng.game.codec import CodecError, decode, encode
+from tng.game.factory import GameFactory
+from tng.game.game import BitBoard, Decision, Phase
+from tng.game.moves import MoveType
+from tng.game.types import Direction, FallDirection, PlayerColor, Position, Tile
+
+
+def new_game():
+    return GameFactory().new_game(
+        PlayerColor.red,
+        PlayerColor.blue,
+        PlayerColor.green,
+        PlayerColor.purple,
+        PlayerColor.yellow,
+    )
+
+
+def mid_game():
+    game = new_game()
+    red = game.players[0]._replace(pos=Position(3, 4), has_key=True, nerves=2)
+    blue = game.players[1]._replace(
+        pos=Position(3, 4), falling=True, fall_direction=FallDirection.column
+    )
+
+    board = (
+        game.board.place_tile(red.pos, Tile.four_way_passage)
+        .place_tile(Position(3, 3), Tile.t_passage, Direction.w)
+        .place_tile(Position(6, 6), Tile.wax_eater, Direction.s)
+        .move_player(red.color, None, red.pos)
+        .move_player(blue.color, None, blue.pos)
+    )
+
+    return game._replace(
+        board=board,
+        players=[red, blue, *game.players[2:]],
+        draw_index=17,
+        turn=1,
+        phases=[Phase.move_player, Phase.falling],
+        last_placed_tile_pos=Position(3, 3),
+        decisions=[Decision(PlayerColor.red, MoveType.block)],
+        lit=0b1011 << 20,
+    ).rehash()
+
+
+def test_round_trip():
+    for game in [new_game(), mid_game(), mid_game()._replace(decisions=None).rehash()]:
+        data = encode(game)
+
+        assert decode(data) == game
+        assert len(data) < 150
+
+
+def test_bitboard():
+    game = mid_game()
+    game = game._replace(board=BitBoard.from_board(game.board))
+
+    decoded = decode(encode(game))
+
+    assert isinstance(decoded.board, BitBoard)
+    assert decoded == game
+
+
+def test_cell_players_order():
+    game = mid_game()
+    decoded = decode(encode(game))
+
+    assert decoded.board.at(Position(3, 4)).players == [PlayerColor.red, PlayerColor.blue]
+
+
+def test_tile_holder_changed_in_place():
+    game = new_game()
+    encode(game)
+
+    # eg. patched by a test, or another match reusing the list
+    game.tile_holder[0] = Tile.pit if game.tile_holder[0] is not Tile.pit else Tile.key
+
+    assert decode(encode(game)).tile_holder == game.tile_holder
+
+
+def test_corrupted():
+    data = encode(mid_game())
+
+    with pytest.raises(CodecError):
+        decode(data[:-3])
+
+    with pytest.raises(CodecError):
+        decode(data + b'\0')
+
+    with pytest.raises(CodecError):
+        decode(bytes([99]) + data[1:])
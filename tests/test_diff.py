@@ -0,0 +1,73 @@
+from tng.game.diff import ListDelta, apply_patch, decode_patch, diff, encode_patch
+from tng.game.factory import GameFactory
+from tng.game.game import BitBoard, Decision, Phase
+from tng.game.moves import MoveType
+from tng.game.types import FallDirection, PlayerColor, Position, Tile
+
+
+def new_game():
+    return GameFactory().new_game(
+        PlayerColor.red, PlayerColor.blue, PlayerColor.green, PlayerColor.purple
+    )
+
+
+def moved(game):
+    return (
+        game.edit()
+        .place_tile(Position(2, 2), Tile.four_way_passage)
+        .push_phase(Phase.rotate_placed)
+        .fall_direction(1, FallDirection.column)
+        .change_nerves(1, 1)
+        .add_decision(Decision(PlayerColor.blue, MoveType.block))
+        .draw_tile()
+        .commit()
+    )
+
+
+def test_diff():
+    game = new_game()
+    game2 = moved(game)
+
+    patch = diff(game, game2)
+
+    assert list(patch.cells) == [14]
+    assert patch.players == {1: {'nerves': 2, 'fall_direction': FallDirection.column}}
+    assert patch.phases == ListDelta(1, [Phase.rotate_placed])
+    assert patch.decisions == ListDelta(0, [Decision(PlayerColor.blue, MoveType.block)])
+    assert patch.draw_index == 1
+    assert patch.turn is None
+
+    assert apply_patch(game, patch) == game2
+    assert apply_patch(game2, diff(game2, game)) == game
+
+
+def test_unchanged():
+    game = new_game()
+    patch = diff(game, game.edit().commit())
+
+    assert patch.cells == {} and patch.players == {}
+    assert patch.phases is None and patch.decisions is None
+
+
+def test_json():
+    game = new_game()
+    game2 = moved(game)
+
+    data = encode_patch(diff(game, game2))
+
+    assert apply_patch(game, decode_patch(data)) == game2
+    assert len(data) < 200
+
+
+def test_bitboard():
+    game = new_game()
+    game = game._replace(board=BitBoard.from_board(game.board)).rehash()
+    game2 = moved(game)
+    game2 = game2._replace(
+        board=game2.board.move_player(PlayerColor.red, None, Position(2, 2))
+    ).rehash()
+
+    patched = apply_patch(game, diff(game, game2))
+
+    assert patched == game2
+    assert patched.board.zobrist == game2.board.zobrist
@@ -0,0 +1,102 @@
+from random import Random
+
+import pytest
+
+from tng.be.archive import match_record
+from tng.be.export import (
+    Table,
+    export,
+    match_columns,
+    move_columns,
+    move_features,
+    read_column,
+    summary,
+)
+from tng.game.factory import GameFactory
+from tng.game.game import Decision, Phase
+from tng.game.moves import MoveType
+from tng.game.types import PlayerColor, Tile
+
+
+def records(count, seed=0):
+    random = Random(seed)
+
+    for i in range(count):
+        colors = random.sample(list(PlayerColor), 4 + i % 2)
+        game = GameFactory(random).new_game(*colors)
+        outcome = [Phase.game_won, Phase.game_lost][i % 3 == 0]
+
+        yield match_record(f'm{i}', game, [], game._replace(phases=[outcome]))
+
+
+def test_table(tmp_path):
+    table = Table(tmp_path, {'a': 'I', 'b': 'b'}, chunk=2)
+
+    for i in range(5):
+        table.append((i, -i))
+
+    table.close()
+
+    assert read_column(tmp_path / 'a.npy', 'I').tolist() == [0, 1, 2, 3, 4]
+    assert read_column(tmp_path / 'b.npy', 'b').tolist() == [0, -1, -2, -3, -4]
+
+    with pytest.raises(ValueError):
+        read_column(tmp_path / 'a.npy', 'H')
+
+
+def test_export(tmp_path):
+    written = list(records(6))
+
+    assert export(written, tmp_path) == 6
+    assert (tmp_path / 'matches' / 'ids.txt').read_text().split() == [r.match_id for r in written]
+
+    matches = {
+        name: read_column(tmp_path / 'matches' / f'{name}.npy', code).tolist()
+        for name, code in match_columns.items()
+    }
+
+    assert matches['players'] == [4, 5, 4, 5, 4, 5]
+    assert matches['edge_length'] == [6, 7, 6, 7, 6, 7]
+    assert matches['first_key_move'] == [-1] * 6
+    assert matches['deck_wax_eater'] == [12, 10, 12, 10, 12, 10]
+    assert matches['deck_key'] == [6, 7, 6, 7, 6, 7]
+
+    for name, code in move_columns.items():
+        assert read_column(tmp_path / 'moves' / f'{name}.npy', code).tolist() == []
+
+
+def test_move_features():
+    game = GameFactory(Random(0)).new_game(
+        PlayerColor.blue, PlayerColor.red, PlayerColor.green, PlayerColor.purple
+    )
+    deck = [Tile.t_passage, Tile.wax_eater, Tile.key, *game.tile_holder[3:]]
+    before = game._replace(tile_holder=deck, draw_index=1)
+    blue, red, *others = before.players
+
+    # blue drew the monster, which attacks red, still holding a nerve
+    after = before._replace(
+        draw_index=2,
+        players=[blue._replace(has_key=True), red._replace(nerves=red.nerves - 1), *others],
+        decisions=[Decision(PlayerColor.red, MoveType.block)],
+    )
+
+    assert move_features(before, after) == (1, 1, 1, 1, 1, 0)
+
+    # green refused to block, with no monster drawn: not a hit
+    after = before._replace(players=[blue, red, others[0]._replace(has_light=False), others[1]])
+
+    assert move_features(before, after) == (0, 0, 0, 0, 0, 1)
+
+
+def test_summary(tmp_path):
+    pytest.importorskip('numpy')
+
+    export(records(6), tmp_path)
+    s = summary(tmp_path)
+
+    assert s['by_edge_length'][6]['matches'] == 3
+    assert s['by_edge_length'][6]['win_rate'] == pytest.approx(2 / 3)
+    assert s['by_edge_length'][7]['loss_rate'] == pytest.approx(1 / 3)
+    assert s['by_edge_length'][7]['first_key_move_median'] is None
+    assert sum(d['matches'] for d in s['by_deck'].values()) == 6
+    assert s['by_move'] == {}
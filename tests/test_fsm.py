@@ -1,8 +1,23 @@
+from random import Random
+
+import pytest
+
 from tng.game.factory import GameFactory
 from tng.game.fsm import TNGFSM
-from tng.game.types import PlayerColor, Direction, Tile, Position
-from tng.game.moves import Move, PlaceTile, MoveType, RotateTile
-from tng.game.game import Phase
+from tng.game.types import PlayerColor, Direction, FallDirection, Tile, Position
+from tng.game.moves import (
+    Crawl,
+    DiscardTile,
+    Fall,
+    Move,
+    OptionalMovement,
+    PlaceTile,
+    MoveType,
+    RotateTile,
+    Stay,
+)
+from tng.game.game import Decision, Phase
+from tng.game.exc import IllegalMove
 
 
 def test_place_start_place_tile():
@@ -115,3 +130,330 @@ def test_rotate_discovered_start_tile_rotate_tile():
     assert game5.board.at(Position(3, 3)).direction == Direction.s
     assert game5.board.at(Position(3, 4)).players == [PlayerColor.blue]
     assert game5.players[0].pos == Position(3, 4)
+
+
+def set_up(fsm, random, players):
+    game = GameFactory(random).new_game(*random.sample(list(PlayerColor), players))
+
+    # every player places and rotates their start tile, discovering the
+    # tiles around it
+    while game.current_phase is not Phase.move_player:
+        game = fsm.apply(game, random.choice(list(fsm.legal_moves(game))))
+
+    return game
+
+
+def test_seeded_setup():
+    fsm = TNGFSM()
+
+    for seed in range(20):
+        game = set_up(fsm, Random(seed), 4 + seed % 2)
+
+        assert game.turn == 0
+        assert game.zobrist == game.rehash().zobrist
+
+        for p in game.players:
+            assert game.board.at(p.pos).tile is Tile.start
+            assert game.board.at(p.pos).players == [p.color]
+
+
+def test_dispatch_table():
+    fsm = TNGFSM()
+
+    assert set(fsm.handlers[Phase.place_start]) == {MoveType.place_tile}
+    assert set(fsm.handlers[Phase.rotate_placed]) == {MoveType.rotate_tile}
+    assert fsm.handlers[Phase.game_won] == {}
+
+
+def test_illegal_move_type():
+    factory = GameFactory()
+
+    game = factory.new_game(
+        PlayerColor.blue, PlayerColor.red, PlayerColor.green, PlayerColor.purple
+    )
+
+    fsm = TNGFSM()
+
+    with pytest.raises(IllegalMove, match='illegal move .* in phase Phase.place_start'):
+        fsm.apply(
+            game,
+            Move(
+                player=PlayerColor.blue,
+                param=RotateTile(move=MoveType.rotate_tile, direction=Direction.e),
+            ),
+        )
+
+
+def test_legal_moves(rotate_placed):
+    factory = GameFactory()
+
+    game = factory.new_game(
+        PlayerColor.blue, PlayerColor.red, PlayerColor.green, PlayerColor.purple
+    )
+
+    fsm = TNGFSM()
+
+    moves = list(fsm.legal_moves(game))
+
+    assert len(moves) == 36
+    assert all(m.player == PlayerColor.blue for m in moves)
+    assert all(m.param.move == MoveType.place_tile for m in moves)
+
+    game2 = rotate_placed
+    moves2 = list(fsm.legal_moves(game2))
+
+    assert [m.param.move for m in moves2] == [MoveType.rotate_tile] * 4
+
+    for m in moves2:
+        fsm.apply(game2, m)
+
+
+def test_legal_moves_end_game():
+    fsm = TNGFSM()
+    final_flickers = 0
+
+    for seed in range(400):
+        random = Random(seed)
+        game = set_up(fsm, random, 4 + seed % 2)
+
+        # a few tiles left
+        game = game._replace(draw_index=len(game.tile_holder) - 1 - random.randrange(4)).rehash()
+
+        # bounded: a rule letting a match go round in circles fails below
+        for _ in range(1000):
+            if game.current_phase in (Phase.game_won, Phase.game_lost):
+                break
+
+            final_flickers += game.final_flickers()
+
+            # legal_moves never raises, and apply accepts what it yields
+            moves = list(fsm.legal_moves(game))
+
+            if not moves:
+                break
+
+            game = fsm.apply(game, random.choice(moves))
+
+        else:
+            pytest.fail(f'seed {seed}: no end after 1000 moves')
+
+    assert final_flickers > 100
+
+
+def test_crawl_on_drawn_monster():
+    game = GameFactory().new_game(
+        PlayerColor.blue, PlayerColor.red, PlayerColor.green, PlayerColor.purple
+    )
+    pos = Position(2, 2)
+
+    # blue in the dark, crawling east to an empty cell, the next tile a monster
+    blue = game.players[0]._replace(pos=pos, has_light=False, nerves=1)
+    game = game._replace(
+        board=game.board.place_tile(pos, Tile.four_way_passage).move_player(blue.color, None, pos),
+        players=[blue, *game.players[1:]],
+        phases=[Phase.move_player],
+        tile_holder=[Tile.wax_eater, *game.tile_holder[1:]],
+    ).rehash()
+    move = Move(player=blue.color, param=Crawl(move=MoveType.crawl, direction=Direction.e))
+
+    crawled = TNGFSM().apply(game, move)
+
+    assert crawled.players[0].pos == Position(3, 2)
+    assert crawled.board.at(Position(3, 2)).tile is Tile.wax_eater
+    assert not any(d.action is MoveType.crawl for d in crawled.decisions or ())
+
+
+def test_random_matches():
+    fsm = TNGFSM()
+    ended = 0
+
+    for seed in range(30):
+        random = Random(seed)
+        game = set_up(fsm, random, 4 + seed % 2)
+
+        for _ in range(2000):
+            if game.current_phase in (Phase.game_won, Phase.game_lost):
+                break
+
+            moves = list(fsm.legal_moves(game))
+
+            if not moves:
+                break
+
+            game = fsm.apply(game, random.choice(moves))
+
+        else:
+            pytest.fail(f'seed {seed}: no end after 2000 moves')
+
+        # the deck is played through
+        ended += game.final_flickers()
+
+    assert ended == 30
+
+
+def blue_at(pos, tile, **changes):
+    """
+    Blue moving, on tile at pos.
+    """
+
+    game = GameFactory().new_game(
+        PlayerColor.blue, PlayerColor.red, PlayerColor.green, PlayerColor.purple
+    )
+    blue = game.players[0]._replace(pos=pos)
+
+    return game._replace(
+        board=game.board.place_tile(pos, tile).move_player(blue.color, None, pos),
+        players=[blue, *game.players[1:]],
+        phases=[Phase.move_player],
+        **changes,
+    ).rehash()
+
+
+def test_crawl_off_crumbling_tile():
+    game = blue_at(Position(2, 2), Tile.straight_passage)
+    game = game._replace(board=game.board.place_tile(Position(2, 1), Tile.four_way_passage))
+    move = Move(player=PlayerColor.blue, param=Crawl(move=MoveType.crawl, direction=Direction.n))
+
+    crawled = TNGFSM().apply(game, move)
+
+    # the tile left crumbles, not the one reached
+    assert crawled.board.at(Position(2, 2)).tile is Tile.pit
+    assert crawled.board.at(Position(2, 1)).tile is Tile.four_way_passage
+    assert crawled.board.at(Position(2, 1)).players == [PlayerColor.blue]
+    assert not crawled.players[0].falling
+
+
+def test_optional_movement_first():
+    game = blue_at(
+        Position(2, 2),
+        Tile.four_way_passage,
+        decisions=[Decision(PlayerColor.blue, MoveType.optional_movement)],
+    )
+    fsm = TNGFSM()
+
+    assert {m.param.move for m in fsm.legal_moves(game)} == {MoveType.optional_movement}
+
+    with pytest.raises(IllegalMove, match='optional movement'):
+        fsm.apply(
+            game,
+            Move(player=PlayerColor.blue, param=Crawl(move=MoveType.crawl, direction=Direction.n)),
+        )
+
+    next_game = fsm.apply(
+        game,
+        Move(
+            player=PlayerColor.blue,
+            param=OptionalMovement(move=MoveType.optional_movement, move_again=False),
+        ),
+    )
+
+    assert next_game.turn == 1
+
+    again = fsm.apply(
+        game,
+        Move(
+            player=PlayerColor.blue,
+            param=OptionalMovement(move=MoveType.optional_movement, move_again=True),
+        ),
+    )
+
+    assert again.turn == 0
+    assert again.players[0].nerves == game.players[0].nerves - 1
+    assert not again.decisions
+
+
+def test_discard_once():
+    game = blue_at(Position(2, 2), Tile.four_way_passage)
+    game = game._replace(
+        board=game.board.place_tile(Position(4, 4), Tile.pit),
+        phases=[Phase.final_flickers],
+        draw_index=len(game.tile_holder),
+    )
+    moves = list(TNGFSM().legal_moves(game))
+
+    assert moves
+    assert all(m.param.pos != Position(4, 4) for m in moves)
+
+    with pytest.raises(IllegalMove, match='already discarded'):
+        TNGFSM().apply(
+            game,
+            Move(
+                player=PlayerColor.blue,
+                param=DiscardTile(move=MoveType.discard_tile, pos=Position(4, 4)),
+            ),
+        )
+
+
+def test_replay(rotate_placed):
+    game2 = rotate_placed
+    fsm = TNGFSM()
+    move = Move(
+        player=PlayerColor.blue,
+        param=RotateTile(move=MoveType.rotate_tile, direction=Direction.e),
+    )
+
+    replayed = fsm.replay(game2, [move])
+
+    assert replayed == fsm.apply(game2, move)
+    assert replayed.zobrist == replayed.rehash().zobrist
+    assert fsm.replay(game2, []) is game2
+
+    # not checked: red plays out of turn
+    assert fsm.replay(game2, [move.model_copy(update={'player': PlayerColor.red})]) == replayed
+
+    with pytest.raises(IllegalMove):
+        fsm.replay(game2, [move, move])
+
+
+def test_stay_on_drawn_monster():
+    game = blue_at(Position(2, 2), Tile.four_way_passage)
+    game = game._replace(tile_holder=[Tile.wax_eater, *game.tile_holder[1:]], draw_index=0).rehash()
+    fsm = TNGFSM()
+
+    game = fsm.apply(game, Move(player=PlayerColor.blue, param=Stay(move=MoveType.stay)))
+
+    assert game.phases == [Phase.move_player, Phase.place_monster]
+
+    move = next(iter(fsm.legal_moves(game)))
+    game = fsm.apply(game, move)
+
+    # the stay goes on once the monster is placed
+    assert game.phases == [Phase.move_player]
+    assert game.board.at(move.param.pos).tile is Tile.wax_eater
+    assert game.has_decision(PlayerColor.blue, MoveType.optional_movement)
+
+
+def test_fall_then_land():
+    game = blue_at(Position(2, 2), Tile.straight_passage)
+    game = game._replace(board=game.board.place_tile(Position(2, 1), Tile.pit))
+    fsm = TNGFSM()
+
+    game = fsm.apply(
+        game,
+        Move(player=PlayerColor.blue, param=Crawl(move=MoveType.crawl, direction=Direction.n)),
+    )
+
+    assert game.phases == [Phase.move_player, Phase.falling]
+
+    game = fsm.apply(
+        game,
+        Move(player=PlayerColor.blue, param=Fall(move=MoveType.fall, direction=FallDirection.row)),
+    )
+
+    # blue lands on their next turn
+    assert game.phases == [Phase.move_player]
+    assert game.turn == 1
+    assert game.players[0].falling
+
+    game = game.set_turn(0)
+    moves = list(fsm.legal_moves(game))
+
+    assert moves
+    assert {m.param.move for m in moves} == {MoveType.land}
+
+    game = fsm.apply(game, moves[0])
+    blue = game.players[0]
+
+    assert not blue.falling
+    assert blue.pos.y == 1
+    assert game.board.at(blue.pos).players == [PlayerColor.blue]
@@ -0,0 +1,55 @@
+from tng.game.factory import GameFactory
+from tng.game.game import Phase
+from tng.game.types import PlayerColor, Position, Tile
+
+
+def new_game():
+    return GameFactory().new_game(
+        PlayerColor.red,
+        PlayerColor.blue,
+        PlayerColor.green,
+        PlayerColor.purple,
+    )
+
+
+def test_original_untouched():
+    game = new_game()
+    players = list(game.players)
+    phases = list(game.phases)
+
+    edit = game.edit().change_nerves(0, 2).push_phase(Phase.place_monster).draw_tile()
+    edit.commit()
+
+    assert game.players == players
+    assert game.phases == phases
+    assert game.draw_index == 0
+
+
+def test_commit_shares_unchanged_lists():
+    game = new_game()
+
+    g2 = game.edit().draw_tile().commit()
+
+    assert g2.players is game.players
+    assert g2.phases is game.phases
+    assert g2.draw_index == 1
+
+
+def test_same_as_chained_calls():
+    game = new_game()
+    pos = Position(2, 3)
+
+    chained = game.place_tile(pos, Tile.start).change_nerves(1, 1).push_phase(Phase.landing)
+    edited = game.edit().place_tile(pos, Tile.start).change_nerves(1, 1).push_phase(Phase.landing)
+
+    assert edited.commit() == chained
+
+
+def test_edit_after_commit():
+    game = new_game()
+    edit = game.edit().change_nerves(0, 1)
+    g2 = edit.commit()
+    g3 = edit.change_nerves(0, 1).commit()
+
+    assert g2.players[0].nerves == 2
+    assert g3.players[0].nerves == 3
@@ -1,4 +1,9 @@
+import pytest
+
+from pydantic import TypeAdapter
+
 from tng.game.factory import GameFactory
+from tng.game.game import Game, GameRuntimeError
 from tng.game.types import PlayerColor
 
 
@@ -29,3 +34,49 @@ def test_new_game():
     assert all(p.nerves == 1 for p in game.players)
 
     assert len(game.tile_holder) == 76
+
+
+def test_player_index():
+    game = GameFactory().new_game(
+        PlayerColor.red,
+        PlayerColor.blue,
+        PlayerColor.green,
+        PlayerColor.purple,
+    )
+
+    for idx, p in enumerate(game.players):
+        assert game.player_index[p.color] == idx
+        assert game.player_idx(p.color) == idx
+        assert game.player_status(p.color) is p
+
+    g2 = game.change_nerves(1, 1)
+
+    assert g2.player_index is game.player_index
+    assert g2.player_status(PlayerColor.blue).nerves == 2
+
+    with pytest.raises(GameRuntimeError):
+        game.player_status(PlayerColor.yellow)
+
+
+def test_game_without_player_index():
+    game = GameFactory().new_game(
+        PlayerColor.red,
+        PlayerColor.blue,
+        PlayerColor.green,
+        PlayerColor.purple,
+    )
+
+    # JSON of a game from before player_index, lit and zobrist
+    old = TypeAdapter(Game).validate_python(TypeAdapter(Game).dump_python(game, mode='json')[:8])
+
+    assert old.player_index is None
+    assert old.player_idx(PlayerColor.green) == 2
+    assert old.change_nerves(1, 1).player_status(PlayerColor.blue).nerves == 2
+
+    with pytest.raises(GameRuntimeError):
+        old.player_status(PlayerColor.yellow)
+
+    rehashed = old.rehash()
+
+    assert rehashed.player_index == game.player_index
+    assert rehashed.zobrist == game.zobrist
@@ -0,0 +1,32 @@
+from tng.game.geometry import geometry
+from tng.game.types import Direction, Position
+
+
+def test_neighbors():
+    g = geometry(6)
+
+    for idx, pos in enumerate(g.positions):
+        assert g.idx(pos) == idx
+
+        for d in Direction:
+            assert g.positions[g.neighbor(idx, d)] == d.neighbor(pos, 6)
+
+
+def test_rays():
+    g = geometry(7)
+    idx = g.idx(Position(0, 0))
+
+    assert [g.positions[p] for p in g.rays[idx][0]] == [Position(0, y) for y in range(6, 0, -1)]
+    assert [g.positions[p] for p in g.rays[idx][1]] == [Position(x, 0) for x in range(1, 7)]
+
+
+def test_rows_and_columns():
+    g = geometry(6)
+
+    assert [g.positions[p] for p in g.rows[2]] == [Position(x, 2) for x in range(6)]
+    assert [g.positions[p] for p in g.columns[3]] == [Position(3, y) for y in range(6)]
+
+
+def test_custom_size_is_cached():
+    assert geometry(9) is geometry(9)
+    assert geometry(9).size == 81
@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from tng.be.actor import MatchActor, Matches
+from tng.be.hotset import HotSet, HotSetStats, estimate_size
+from tng.be.store import MatchNotFound
+from tng.game.fsm import TNGFSM
+from tng.game.moves import Move, MoveType, RotateTile
+from tng.game.types import Direction, PlayerColor
+
+
+def test_lru(rotate_placed):
+    game = rotate_placed
+    fsm = TNGFSM()
+    hot = HotSet(max_entries=2)
+
+    for match_id in 'abc':
+        hot.add(MatchActor(match_id, game, fsm))
+
+    assert hot.get('a') is not None
+    assert hot.get('x') is None
+
+    # b is the least recently used
+    assert [a.match_id for a in hot.evict()] == ['b']
+    assert list(hot) == ['c', 'a']
+
+    hot.add(MatchActor('d', game, fsm))
+    hot.get('c').busy = True
+
+    assert [a.match_id for a in hot.evict()] == ['a']
+    assert hot.stats() == HotSetStats(
+        hits=2, misses=1, evictions=2, entries=2, bytes=2 * estimate_size(game)
+    )
+
+
+def test_byte_limit(rotate_placed):
+    game = rotate_placed
+    hot = HotSet(max_bytes=2 * estimate_size(game))
+
+    for match_id in 'abc':
+        hot.add(MatchActor(match_id, game, TNGFSM()))
+
+    assert len(hot.evict()) == 1
+    assert len(hot) == 2
+
+
+def test_spill(tmp_path, rotate_placed):
+    game = rotate_placed
+    move = Move(
+        player=PlayerColor.blue,
+        param=RotateTile(move=MoveType.rotate_tile, direction=Direction.e),
+    )
+
+    async def run():
+        matches = Matches(max_entries=1, spill_dir=tmp_path)
+
+        await matches.add(game, 'm1')
+        await matches.add(game, 'm2')
+
+        assert list(matches.actors) == ['m2']
+        assert sorted(matches.ids()) == ['m1', 'm2']
+
+        m1 = await matches.get('m1')
+
+        assert m1.game == game
+        assert await m1.submit(move) == 1
+
+        await matches.get('m2')
+        m1 = await matches.get('m1')
+
+        assert m1.version == 1
+        assert m1.game == TNGFSM().apply(game, move)
+
+        with pytest.raises(MatchNotFound):
+            await matches.get('m3')
+
+        stats = matches.stats()
+
+        assert (stats.hits, stats.evictions, stats.entries) == (0, 4, 1)
+
+        await matches.close()
+
+    asyncio.run(run())
+
+
+def test_needs_somewhere_to_spill():
+    with pytest.raises(ValueError):
+        Matches(max_entries=10)
@@ -0,0 +1,87 @@
+import pytest
+
+from tng.game.exc import IllegalMove
+from tng.game.factory import GameFactory
+from tng.game.fsm import TNGFSM
+from tng.game.game import Phase
+from tng.game.latency import LatencyCollector, LatencyStats
+from tng.game.moves import Move, MoveType, RotateTile
+from tng.game.types import Direction, PlayerColor, Position, Tile
+
+
+def test_stats():
+    stats = LatencyStats()
+
+    for us in [1, 3, 3, 100]:
+        stats.add(us / 1_000_000, False)
+
+    stats.add(0.5, True)
+
+    assert stats.count == 5
+    assert stats.errors == 1
+    assert stats.min == 1 / 1_000_000
+    assert stats.max == 0.5
+    assert sum(stats.buckets) == 5
+    assert stats.percentile(50) == 4 / 1_000_000
+
+
+def test_fsm_records():
+    game = GameFactory().new_game(
+        PlayerColor.blue, PlayerColor.red, PlayerColor.green, PlayerColor.purple
+    )
+
+    blue = game.players[0]._replace(pos=Position(3, 4))
+    game = game._replace(
+        board=game.board.place_tile(blue.pos, Tile.four_way_passage).move_player(
+            blue.color, None, blue.pos
+        ),
+        players=[blue, *game.players[1:]],
+        phases=[Phase.place_start, Phase.rotate_placed],
+    )
+
+    latency = LatencyCollector()
+    fsm = TNGFSM(latency)
+    rotate = RotateTile(move=MoveType.rotate_tile, direction=Direction.e)
+
+    # every neighbour is empty: stays in the sub fsm, discovering tiles
+    fsm.apply(game, Move(player=PlayerColor.blue, param=rotate))
+
+    with pytest.raises(IllegalMove):
+        fsm.apply(game, Move(player=PlayerColor.red, param=rotate))
+
+    stats = latency.stats[(Phase.rotate_placed, MoveType.rotate_tile, 'move')]
+
+    assert stats.count == 2
+    assert stats.errors == 1
+    assert list(latency.snapshot()) == ['rotate_placed/rotate_tile/move']
+
+
+def test_disabled_by_default():
+    assert TNGFSM().latency is None
+
+
+def test_sub_phase_complete_recorded():
+    game = GameFactory().new_game(
+        PlayerColor.blue, PlayerColor.red, PlayerColor.green, PlayerColor.purple
+    )
+
+    blue = game.players[0]._replace(pos=Position(3, 4))
+    board = game.board.place_tile(blue.pos, Tile.start).move_player(blue.color, None, blue.pos)
+
+    for d in Direction:
+        board = board.place_tile(board.dest_coords(blue.pos, d), Tile.four_way_passage)
+
+    game = game._replace(
+        board=board,
+        players=[blue, *game.players[1:]],
+        phases=[Phase.place_start, Phase.rotate_placed],
+    )
+
+    latency = LatencyCollector()
+    fsm = TNGFSM(latency)
+    rotate = RotateTile(move=MoveType.rotate_tile, direction=Direction.e)
+
+    game2 = fsm.apply(game, Move(player=PlayerColor.blue, param=rotate))
+
+    assert game2.turn == 1
+    assert latency.stats[(Phase.place_start, MoveType.rotate_tile, 'sub_phase_complete')].count == 1
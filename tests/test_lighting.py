@@ -0,0 +1,82 @@
+from tng.game.factory import GameFactory
+from tng.game.game import BitBoard
+from tng.game.types import Direction, PlayerColor, Position, Tile
+
+
+def new_game(board_class=None):
+    factory = GameFactory() if board_class is None else GameFactory(board_class=board_class)
+
+    game = factory.new_game(
+        PlayerColor.red,
+        PlayerColor.blue,
+        PlayerColor.green,
+        PlayerColor.purple,
+    )
+
+    # red stands on a straight passage (open n/s), the others are not on the board
+    game = (
+        game.place_tile(Position(2, 2), Tile.straight_passage, Direction.n)
+        .place_tile(Position(2, 1), Tile.four_way_passage)
+        .place_tile(Position(2, 3), Tile.t_passage, Direction.e)
+        .place_tile(Position(3, 2), Tile.four_way_passage)
+        .place_tile(Position(4, 4), Tile.key)
+    )
+
+    red = game.players[0]._replace(pos=Position(2, 2))
+
+    return game._replace(
+        board=game.board.move_player(PlayerColor.red, None, red.pos),
+        players=[red] + game.players[1:],
+    )
+
+
+def test_placed_tiles_are_candidates():
+    game = new_game()
+
+    for p in [Position(2, 2), Position(2, 1), Position(3, 2), Position(4, 4)]:
+        assert game.lit >> p.idx(6) & 1
+
+
+def test_lit_mask():
+    game = new_game()
+
+    expected = 0
+
+    for p in [Position(2, 2), Position(2, 1), Position(2, 3)]:
+        expected |= 1 << p.idx(6)
+
+    assert game.lit_mask() == expected
+
+
+def test_refresh_drops_unlit_tiles():
+    for board_class in [None, BitBoard]:
+        game = new_game(board_class).refresh_lighting()
+
+        assert game.lit == game.lit_mask()
+        assert game.board.at(Position(2, 1)).tile is Tile.four_way_passage
+        assert game.board.at(Position(3, 2)).tile is None
+        assert game.board.at(Position(4, 4)).tile is None
+
+
+def test_refresh_candle_out():
+    game = new_game().refresh_lighting()
+    game = game.light_out(game.players[0]).refresh_lighting()
+
+    assert game.lit == 1 << Position(2, 2).idx(6)
+    assert game.board.at(Position(2, 2)).tile is Tile.straight_passage
+
+
+def test_rehash_builds_lit():
+    for board_class in [None, BitBoard]:
+        built = new_game(board_class)
+        # as built by hand or from JSON
+        game = built._replace(lit=0).rehash()
+
+        assert game.lit == built.board.tiled_mask
+
+        game = game.refresh_lighting()
+
+        assert game.lit == game.lit_mask()
+        assert game.board.at(Position(2, 1)).tile is Tile.four_way_passage
+        assert game.board.at(Position(3, 2)).tile is None
+        assert game.board.at(Position(4, 4)).tile is None
@@ -1,5 +1,19 @@
-from tng.game.moves import PlaceTile, Move, MoveType
-from tng.game.types import PlayerColor, Position
+import pytest
+
+from pydantic import ValidationError
+
+from tng.game.codec import decode_moves as codec_decode_moves, encode_moves
+from tng.game.moves import (
+    Crawl,
+    PlaceTile,
+    Move,
+    MoveType,
+    decode_move_lines,
+    decode_moves,
+    trusted,
+    trusted_move,
+)
+from tng.game.types import Direction, PlayerColor, Position
 
 
 def test_marshalling():
@@ -18,3 +32,78 @@ def test_unmarshalling():
     assert t == Move(
         player=PlayerColor.blue, param=PlaceTile(move=MoveType.place_tile, pos=Position(x=1, y=4))
     )
+
+
+place = '{"player":"blue","param":{"move":"place_tile","pos":[1,4]}}'
+crawl = '{"player":"red","param":{"move":"crawl","direction":"e"}}'
+
+expected = [
+    Move(player=PlayerColor.blue, param=PlaceTile(move=MoveType.place_tile, pos=Position(1, 4))),
+    Move(player=PlayerColor.red, param=Crawl(move=MoveType.crawl, direction=Direction.e)),
+]
+
+
+def test_decode_moves():
+    assert decode_moves(f'[{place},{crawl}]') == expected
+
+    with pytest.raises(ValidationError):
+        decode_moves('[{"player":"red","param":{"move":"fly"}}]')
+
+
+def test_decode_move_lines():
+    lines = [place, '', crawl.encode(), place, '\n', crawl]
+
+    assert list(decode_move_lines(lines)) == expected * 2
+
+
+def test_decode_move_lines_errors():
+    # two moves on a line are not two lines
+    with pytest.raises(ValidationError) as e:
+        list(decode_move_lines([place, f'{place},{crawl}']))
+
+    assert e.value.errors()[0]['loc'] == (2,)
+
+    with pytest.raises(ValidationError) as e:
+        list(decode_move_lines([place, '', crawl, '{"player":"red"}']))
+
+    assert e.value.errors()[0]['loc'] == (4, 'param')
+
+
+def test_trusted_move():
+    m = trusted_move(
+        PlayerColor.blue, trusted(PlaceTile, move=MoveType.place_tile, pos=Position(1, 4))
+    )
+
+    assert m == expected[0]
+    assert m.model_dump_json() == place
+
+
+def test_trusted_same_as_validated():
+    validated = [
+        Move.model_validate_json(line)
+        for line in [
+            place,
+            '{"player":"red","param":{"move":"rotate_tile","direction":"e"}}',
+            '{"player":"red","param":{"move":"stay"}}',
+            '{"player":"red","param":{"move":"crawl","direction":"s"}}',
+            '{"player":"red","param":{"move":"optional_movement","move_again":true}}',
+            '{"player":"red","param":{"move":"fall","direction":"row"}}',
+            '{"player":"red","param":{"move":"land","place":3}}',
+            '{"player":"red","param":{"move":"discard_tile","pos":null}}',
+            '{"player":"red","param":{"move":"pass_key","player":"green"}}',
+            '{"player":"red","param":{"move":"block","block":false}}',
+            '{"player":"red","param":{"move":"move_again"}}',
+        ]
+    ]
+
+    # built by trusted
+    for m, v in zip(codec_decode_moves(encode_moves(validated)), validated, strict=True):
+        assert m == v
+        assert m.model_dump() == v.model_dump()
+        assert m.model_dump_json() == v.model_dump_json()
+        assert m.model_fields_set == v.model_fields_set
+        assert m.param.model_fields_set == v.param.model_fields_set
+        assert repr(m) == repr(v)
+        assert m.model_copy(update={'player': PlayerColor.blue}) == v.model_copy(
+            update={'player': PlayerColor.blue}
+        )
@@ -0,0 +1,101 @@
+import asyncio
+import json
+
+from collections import Counter
+
+from tng.be.actor import game_adapter
+from tng.be.shard import HashRing, Supervisor, serve
+from tng.game.moves import Move, MoveType, RotateTile
+from tng.game.types import Direction, PlayerColor
+
+
+def test_ring():
+    keys = [f'match-{i}' for i in range(10_000)]
+    ring = HashRing(['w0', 'w1', 'w2'])
+
+    owners = {k: ring.owner(k) for k in keys}
+    shares = Counter(owners.values())
+
+    assert set(shares) == {'w0', 'w1', 'w2'}
+    assert min(shares.values()) > len(keys) / 6
+
+    ring.add('w3')
+
+    # only the keys taken by the new node move
+    moved = {k for k in keys if ring.owner(k) != owners[k]}
+
+    assert moved
+    assert {ring.owner(k) for k in moved} == {'w3'}
+
+    ring.remove('w3')
+
+    assert {k: ring.owner(k) for k in keys} == owners
+    assert HashRing(['w2', 'w0', 'w1']).owner('x') == HashRing(['w0', 'w1', 'w2']).owner('x')
+
+
+def test_supervisor(rotate_placed, http):
+    players = ['blue', 'red', 'green', 'purple']
+
+    async def run():
+        supervisor = Supervisor()
+        await supervisor.start(2)
+
+        server = await serve(supervisor, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+
+        try:
+            status, body = await http(port, 'POST', '/matches', {'players': players})
+            assert status == 201
+
+            # blue rotating its start tile in every match
+            state = {'version': 0, 'game': game_adapter.dump_python(rotate_placed, mode='json')}
+            ids = [f'm{i}' for i in range(12)]
+
+            for match_id in ids:
+                worker = supervisor.worker(match_id)
+                status, _ = await worker.request(
+                    'POST', f'/matches/{match_id}/adopt', json.dumps(state).encode()
+                )
+                assert status == 201
+
+            # the workers control routes are not public
+            for method, path in [
+                ('POST', '/matches/m0/release'),
+                ('POST', '/matches/m12/adopt'),
+                ('PUT', '/matches/m12'),
+                ('GET', '/matches'),
+            ]:
+                status, _ = await http(port, method, path, state)
+                assert status in (404, 405)
+
+            move = Move(
+                player=PlayerColor.blue,
+                param=RotateTile(move=MoveType.rotate_tile, direction=Direction.e),
+            ).model_dump(mode='json')
+
+            # moves in flight while a worker is added then one removed
+            rebalancing = asyncio.gather(
+                supervisor.add_worker(),
+                *(http(port, 'POST', f'/matches/{i}/moves', move) for i in ids),
+            )
+            name, *results = await rebalancing
+
+            assert {status for status, _ in results} == {200}
+            assert len(supervisor.ring) == 3
+
+            await supervisor.remove_worker('w0')
+            assert sorted(supervisor.ring.nodes) == ['w1', name]
+
+            for match_id in ids:
+                status, body = await http(port, 'GET', f'/matches/{match_id}')
+                assert status == 200
+                assert body['version'] == 1
+
+            status, body = await http(port, 'GET', '/matches/nope')
+            assert status == 404
+
+        finally:
+            server.close()
+            await supervisor.close()
+
+    asyncio.run(run())
@@ -0,0 +1,58 @@
+from random import Random
+
+from tng.game.game import Board
+from tng.game.monsters import AttackingMonsters
+from tng.game.sight import SightLines
+from tng.game.types import Direction, PlayerColor, Position, Tile
+
+
+def test_sight_line():
+    board = (
+        Board.empty(6)
+        .place_tile(Position(2, 2), Tile.wax_eater, Direction.n)
+        .place_tile(Position(2, 1), Tile.straight_passage)
+        .place_tile(Position(2, 0), Tile.pit)
+        .place_tile(Position(2, 3), Tile.four_way_passage)
+        .place_tile(Position(1, 2), Tile.four_way_passage)
+    )
+
+    lines = board.sight_lines.lines
+
+    assert list(lines) == [Position(2, 2).idx(6)]
+
+    seen = [board.geometry.positions[idx] for idx in lines[Position(2, 2).idx(6)]]
+
+    # cut by the pit north and by empty cells elsewhere
+    assert seen == [Position(2, 1), Position(2, 3), Position(1, 2)]
+
+
+def test_attacks_report_the_monster():
+    board = (
+        Board.empty(6)
+        .place_tile(Position(2, 2), Tile.wax_eater, Direction.n)
+        .place_tile(Position(2, 3), Tile.four_way_passage)
+        .place_tile(Position(2, 4), Tile.four_way_passage)
+        .move_player(PlayerColor.red, None, Position(2, 3))
+    )
+
+    # blue leaves (2, 4), looking at the monster through red's cell
+    attacks = AttackingMonsters(board).trigger_monsters(Position(2, 4))
+
+    assert list(attacks) == [PlayerColor.red]
+    assert [cell.tile for cell in attacks[PlayerColor.red]] == [Tile.wax_eater]
+
+
+def test_incremental_update():
+    rng = Random(42)
+    tiles = [Tile.wax_eater, Tile.t_passage, Tile.four_way_passage, Tile.pit, Tile.key]
+    board = Board.empty(6)
+
+    for _ in range(300):
+        pos = Position(rng.randrange(6), rng.randrange(6))
+
+        if rng.random() < 0.3:
+            board = board.drop_tiles([pos])
+        else:
+            board = board.place_tile(pos, rng.choice(tiles), rng.choice(list(Direction)))
+
+        assert board.sight_lines == SightLines.build(board.cells, board.geometry)
@@ -0,0 +1,134 @@
+import asyncio
+
+from random import Random
+
+import pytest
+
+from tng.be.sqlite_store import SqliteMatchStore
+from tng.be.store import MatchNotFound, StoreError
+from tng.game.fsm import TNGFSM
+
+
+def test_load_replays_tail(tmp_path, mid_game, play):
+    fsm = TNGFSM()
+    random = Random(1)
+    game = mid_game(random)
+    played = play(fsm, game, random, 7)
+
+    assert len(played) == 7
+
+    store = SqliteMatchStore(tmp_path / 'tng.db', fsm, snapshot_every=3)
+    store.create('m1', game)
+
+    assert store.load('m1') == game
+
+    for i, (move, g) in enumerate(played):
+        assert store.append('m1', move, g) == i + 1
+        assert store.load('m1') == g
+
+    assert store.latest_snapshot('m1')[0] == 6
+    assert list(store.moves('m1')) == [m for m, _ in played]
+
+    store.close()
+
+    # a fresh store, as after a restart
+    reopened = SqliteMatchStore(tmp_path / 'tng.db', fsm, snapshot_every=3)
+
+    assert reopened.load('m1') == played[-1][1]
+    assert reopened.count('m1') == 7
+
+    reopened.close()
+
+
+def test_group_commit(tmp_path, mid_game, play):
+    fsm = TNGFSM()
+    random = Random(2)
+    game = mid_game(random)
+    (move, g1), *_ = play(fsm, game, random, 1)
+
+    store = SqliteMatchStore(tmp_path / 'tng.db', fsm, commit_interval=0.05)
+    ids = [f'm{i}' for i in range(20)]
+
+    for match_id in ids:
+        store.create(match_id, game)
+
+    commits = []
+    commit = store.commit
+    store.commit = lambda batch: (commits.append(len(batch)), commit(batch))
+
+    async def run():
+        # the unknown match fails alone
+        return await asyncio.gather(
+            *(store.append_async(match_id, move, g1) for match_id in [*ids, 'nope']),
+            return_exceptions=True,
+        )
+
+    *counts, error = asyncio.run(run())
+
+    assert counts == [1] * len(ids)
+    assert isinstance(error, MatchNotFound)
+    assert commits == [len(ids) + 1]
+    assert all(store.load(match_id) == g1 for match_id in ids)
+
+    store.close()
+
+
+def test_cancelled_write(tmp_path, mid_game, play):
+    fsm = TNGFSM()
+    random = Random(2)
+    game = mid_game(random)
+    (move, g1), *_ = play(fsm, game, random, 1)
+
+    store = SqliteMatchStore(tmp_path / 'tng.db', fsm, commit_interval=0.05)
+    store.create('m1', game)
+    store.create('m2', game)
+
+    # given up while queued: dropped, and the writer keeps going
+    cancelled = store.submit(store.append_op('m1', move, g1))
+
+    assert cancelled.cancel()
+    assert store.submit(store.append_op('m2', move, g1)).result(timeout=5) == 1
+    assert store.append('m1', move, g1) == 1
+
+    store.close()
+
+
+def test_state_hash_checked(tmp_path, mid_game, play):
+    fsm = TNGFSM()
+    random = Random(3)
+    game = mid_game(random)
+    (move, g1), *_ = play(fsm, game, random, 1)
+
+    store = SqliteMatchStore(tmp_path / 'tng.db', fsm)
+    store.create('m1', game)
+    store.append('m1', move, g1._replace(zobrist=g1.zobrist ^ 1))
+
+    with pytest.raises(StoreError):
+        store.load('m1')
+
+    store.close()
+
+
+def test_errors(tmp_path, mid_game):
+    store = SqliteMatchStore(tmp_path / 'tng.db')
+    game = mid_game(Random(0))
+
+    store.create('m1', game)
+
+    with pytest.raises(StoreError):
+        store.create('m1', game)
+
+    with pytest.raises(MatchNotFound):
+        store.load('m2')
+
+    with pytest.raises(ValueError):
+        store.create('../m3', game)
+
+    store.delete('m1')
+
+    assert not store.exists('m1')
+
+    store.close()
+
+    with pytest.raises(StoreError):
+        store.create('m4', game)
@@ -0,0 +1,115 @@
+import os
+import stat
+
+from random import Random
+
+import pytest
+
+from tng.be.store import FileMatchStore, MatchNotFound, StoreError
+from tng.game.fsm import TNGFSM
+
+
+def test_load_replays_tail(tmp_path, mid_game, play):
+    fsm = TNGFSM()
+    random = Random(1)
+    game = mid_game(random)
+    played = play(fsm, game, random, 7)
+
+    assert len(played) == 7
+
+    store = FileMatchStore(tmp_path, fsm, snapshot_every=3, fsync=False)
+    store.create('m1', game)
+
+    assert store.load('m1') == game
+
+    for i, (move, g) in enumerate(played):
+        assert store.append('m1', move, g) == i + 1
+        assert store.load('m1') == g
+
+    assert sorted(f.name for f in (tmp_path / 'm1').glob('*.snapshot')) == [
+        '0000000000.snapshot',
+        '0000000003.snapshot',
+        '0000000006.snapshot',
+    ]
+
+    assert list(store.moves('m1')) == [m for m, _ in played]
+
+    # a fresh store, as after a restart
+    reopened = FileMatchStore(tmp_path, fsm, snapshot_every=3)
+
+    assert reopened.load('m1') == played[-1][1]
+
+
+def test_torn_write(tmp_path, mid_game, play):
+    fsm = TNGFSM()
+    random = Random(1)
+    game = mid_game(random)
+    (m1, g1), (m2, g2) = play(fsm, game, random, 2)
+
+    store = FileMatchStore(tmp_path, fsm, fsync=False)
+    store.create('m1', game)
+    store.append('m1', m1, g1)
+
+    with open(tmp_path / 'm1' / 'moves.jsonl', 'ab') as f:
+        f.write(m2.model_dump_json().encode()[:10])
+
+    reopened = FileMatchStore(tmp_path, fsm, fsync=False)
+
+    assert reopened.load('m1') == g1
+    assert reopened.append('m1', m2, g2) == 2
+    assert reopened.load('m1') == g2
+
+
+def test_errors(tmp_path, mid_game):
+    store = FileMatchStore(tmp_path, fsync=False)
+    game = mid_game(Random(0))
+
+    store.create('m1', game)
+
+    with pytest.raises(StoreError):
+        store.create('m1', game)
+
+    with pytest.raises(MatchNotFound):
+        store.load('m2')
+
+    for match_id in ['../m3', '', 'm\u00e9', 'm' * 129]:
+        with pytest.raises(ValueError):
+            store.create(match_id, game)
+
+    store.create('m' * 128, game)
+
+    store.delete('m1')
+
+    assert not store.exists('m1')
+
+
+def test_fsync_dir(tmp_path, monkeypatch, mid_game, play):
+    fsm = TNGFSM()
+    random = Random(1)
+    game = mid_game(random)
+    played = play(fsm, game, random, 2)
+    synced = []
+    fsync = os.fsync
+
+    def spy(fd):
+        if stat.S_ISDIR(os.fstat(fd).st_mode):
+            synced.append(sorted(f.name for f in (tmp_path / 'm1').iterdir()))
+
+        fsync(fd)
+
+    monkeypatch.setattr(os, 'fsync', spy)
+
+    store = FileMatchStore(tmp_path, fsm, snapshot_every=2)
+    store.create('m1', game)
+
+    # the match directory in root, then the first snapshot renamed in it
+    assert synced == [[], ['0000000000.snapshot']]
+
+    for move, g in played:
+        store.append('m1', move, g)
+
+    # the log created, then the second snapshot renamed
+    assert synced[2:] == [
+        ['0000000000.snapshot', 'moves.jsonl'],
+        ['0000000000.snapshot', '0000000002.snapshot', 'moves.jsonl'],
+    ]
@@ -1,5 +1,28 @@
-from tng.game.types import Tile, Direction, open_directions
+from tng.game.types import (
+    Tile,
+    Direction,
+    open_directions,
+    rotated_open_directions,
+    open_edges,
+    direction_bit,
+)
 
 
 def test_open_directions():
     assert open_directions[Tile.start] == [Direction.s, Direction.w]
+
+
+def test_rotated_open_directions():
+    assert rotated_open_directions[Tile.start][Direction.n] == (Direction.s, Direction.w)
+    assert rotated_open_directions[Tile.start][Direction.e] == (Direction.w, Direction.n)
+
+    for tile, dirs in open_directions.items():
+        for o in Direction:
+            rotated = rotated_open_directions[tile][o]
+
+            assert rotated == tuple(d.rotate(o) for d in dirs)
+            assert open_edges[tile][o] == sum(direction_bit[d] for d in rotated)
+
+
+def test_every_tile_has_open_directions():
+    assert set(rotated_open_directions) == set(Tile)
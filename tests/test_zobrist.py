@@ -0,0 +1,65 @@
+from random import Random
+
+from tng.game.factory import GameFactory
+from tng.game.game import BitBoard, Decision, Phase
+from tng.game.moves import MoveType
+from tng.game.types import Direction, FallDirection, PlayerColor, Position, Tile
+
+
+def new_game(board_class=None):
+    factory = GameFactory(Random(0)) if board_class is None else GameFactory(Random(0), board_class)
+
+    return factory.new_game(
+        PlayerColor.red,
+        PlayerColor.blue,
+        PlayerColor.green,
+        PlayerColor.purple,
+    )
+
+
+def play(game):
+    return (
+        game.edit()
+        .place_tile(Position(1, 1), Tile.four_way_passage)
+        .place_tile(Position(1, 2), Tile.wax_eater, Direction.s)
+        .push_phase(Phase.rotate_placed)
+        .draw_tiles(3)
+        .set_turn(2)
+        .change_nerves(1, 1)
+        .fall_direction(3, FallDirection.row)
+        .add_decision(Decision(PlayerColor.blue, MoveType.block))
+        .add_decision(Decision(PlayerColor.red, MoveType.block))
+        .discard_decision(PlayerColor.blue, MoveType.block)
+        .drop_tiles_idx([8])
+        .new_phase(Phase.landing)
+        .commit()
+    )
+
+
+def test_incremental():
+    for board_class in [None, BitBoard]:
+        game = new_game(board_class)
+        g2 = play(game)
+
+        assert g2.zobrist == g2.rehash().zobrist
+        assert g2.zobrist != game.zobrist
+        assert g2.pop_phase().zobrist == g2.pop_phase().rehash().zobrist
+
+
+def test_board_classes_agree():
+    game = new_game()
+    bit_game = game._replace(board=BitBoard.from_board(game.board))
+
+    assert bit_game.board.zobrist == game.board.zobrist
+    assert play(bit_game).zobrist == play(game).zobrist
+
+
+def test_transpositions():
+    game = new_game()
+
+    g1 = game.draw_tile().set_turn(1)
+    g2 = game.set_turn(1).draw_tile()
+
+    assert g1.zobrist == g2.zobrist
+    assert hash(g1) == hash(g2)
+    assert len({g1, g2, game}) == 2
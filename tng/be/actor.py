@@ -0,0 +1,391 @@
+"""
+One actor per match.
+
+A MatchActor owns its match state and is the only one changing it: moves
+are queued in its mailbox and applied, one at a time, by the actor task.
+Matches never share state, so no lock is needed and a slow match doesn't
+hold up the others.
+
+After each move the actor publishes an event (the move and the state
+patch, see tng.game.diff) to the match subscribers.
+"""
+
+import asyncio
+import os
+import uuid
+
+from collections.abc import Sequence
+
+from pydantic import TypeAdapter
+
+from tng.game.diff import diff, encode_patch
+from tng.game.factory import GameFactory
+from tng.game.fsm import TNGFSM
+from tng.game.game import Game, GameRuntimeError
+from tng.game.moves import Move
+from tng.game.types import PlayerColor
+
+from .hotset import HotSet, HotSetStats, SpillDir
+from .http import sse_event
+from .store import MatchNotFound, MatchStore
+
+game_adapter = TypeAdapter(Game)
+
+# events a subscriber can lag behind before being dropped
+SUBSCRIBER_BACKLOG = 256
+
+
+class MatchActor:
+    def __init__(
+        self,
+        match_id: str,
+        game: Game,
+        fsm: TNGFSM,
+        store: MatchStore | None = None,
+        version: int = 0,
+    ) -> None:
+        self.match_id = match_id
+        self.game = game
+        self.fsm = fsm
+        self.store = store
+        self.version = version  # moves applied
+        self.busy = False  # applying a move
+
+        # None moves mark where drain was called
+        self.mailbox: asyncio.Queue[tuple[Move | None, asyncio.Future[int]]] = asyncio.Queue()
+        self.subscribers: set[asyncio.Queue[bytes]] = set()
+        self.task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self.task = asyncio.create_task(self.run(), name=f'match {self.match_id}')
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+
+            try:
+                await self.task
+
+            except asyncio.CancelledError:
+                pass
+
+        while not self.mailbox.empty():
+            _, result = self.mailbox.get_nowait()
+
+            if not result.done():
+                result.set_exception(GameRuntimeError(f'match {self.match_id} stopped'))
+
+        for q in self.subscribers:
+            q.shutdown()
+
+        self.subscribers.clear()
+
+    async def submit(self, move: Move) -> int:
+        """
+        Queues move, returns the match version after it has been applied
+        or raises what TNGFSM.apply raised.
+        """
+
+        result: asyncio.Future[int] = asyncio.get_running_loop().create_future()
+
+        self.mailbox.put_nowait((move, result))
+
+        return await result
+
+    async def drain(self) -> int:
+        """
+        Waits for the moves queued so far to be applied, returns the match
+        version.
+        """
+
+        result: asyncio.Future[int] = asyncio.get_running_loop().create_future()
+
+        self.mailbox.put_nowait((None, result))
+
+        return await result
+
+    async def run(self) -> None:
+        while True:
+            move, result = await self.mailbox.get()
+
+            if result.cancelled():
+                continue
+
+            if move is None:
+                if not result.done():
+                    result.set_result(self.version)
+
+                continue
+
+            self.busy = True
+
+            try:
+                game = self.fsm.apply(self.game, move)
+
+                if game is None:
+                    raise GameRuntimeError(f'no game returned applying {move}')
+
+                if self.store is not None:
+                    # the actor waits for it so the log keeps the moves order
+                    await self.store.append_async(self.match_id, move, game)
+
+            except Exception as e:
+                if not result.done():
+                    result.set_exception(e)
+
+                continue
+
+            finally:
+                self.busy = False
+
+            previous, self.game = self.game, game
+            self.version += 1
+
+            # the caller may have given up while the move was stored
+            if not result.done():
+                result.set_result(self.version)
+
+            if self.subscribers:
+                self.publish(sse_event('move', self.move_event(move, previous, game)))
+
+    @property
+    def idle(self) -> bool:
+        return not self.busy and self.mailbox.empty() and not self.subscribers
+
+    def move_event(self, move: Move, previous: Game, game: Game) -> bytes:
+        return b'{"version":%d,"move":%b,"patch":%b}' % (
+            self.version,
+            move.model_dump_json().encode(),
+            encode_patch(diff(previous, game)),
+        )
+
+    def state_event(self) -> bytes:
+        return b'{"version":%d,"game":%b}' % (self.version, game_adapter.dump_json(self.game))
+
+    def subscribe(self) -> asyncio.Queue[bytes]:
+        """
+        A queue receiving the match events, starting with the current state.
+        It is shut down if the subscriber falls too far behind.
+        """
+
+        q: asyncio.Queue[bytes] = asyncio.Queue(SUBSCRIBER_BACKLOG)
+
+        q.put_nowait(sse_event('game', self.state_event()))
+        self.subscribers.add(q)
+
+        return q
+
+    def unsubscribe(self, q: asyncio.Queue[bytes]) -> None:
+        self.subscribers.discard(q)
+
+    def publish(self, event: bytes) -> None:
+        for q in list(self.subscribers):
+            try:
+                q.put_nowait(event)
+
+            except asyncio.QueueFull:
+                # it can reconnect and start over from the full state
+                self.subscribers.discard(q)
+                q.shutdown(immediate=True)
+
+
+class Matches:
+    """
+    The running match actors, by match id.
+
+    With a store, matches are persisted and the ones not running are
+    loaded back on first use.
+
+    With max_entries or max_bytes, only the most recently used matches keep
+    running (see HotSet): idle ones beyond the limits are stopped, spilled
+    to spill_dir if given, and rehydrated from there, or else reloaded
+    from the store, on next use.
+    """
+
+    def __init__(
+        self,
+        fsm: TNGFSM | None = None,
+        factory: GameFactory | None = None,
+        store: MatchStore | None = None,
+        max_entries: int | None = None,
+        max_bytes: int | None = None,
+        spill_dir: str | os.PathLike | None = None,
+    ) -> None:
+        if (max_entries is not None or max_bytes is not None) and (
+            store is None and spill_dir is None
+        ):
+            raise ValueError('evicting matches needs a store or a spill directory')
+
+        self.fsm = fsm if fsm is not None else TNGFSM()
+        self.factory = factory if factory is not None else GameFactory()
+        self.store = store
+
+        self.actors = HotSet(max_entries, max_bytes)
+        self.spill = SpillDir(spill_dir) if spill_dir is not None else None
+        self.loading: dict[str, asyncio.Task[MatchActor]] = {}
+        # handed over to another process, not to be loaded back here
+        self.released: set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self.actors)
+
+    def ids(self) -> list[str]:
+        """
+        Matches held by this process, running or spilled.
+        """
+
+        ids = list(self.actors)
+
+        if self.spill is not None:
+            ids.extend(self.spill)
+
+        return ids
+
+    def stats(self) -> HotSetStats:
+        return self.actors.stats()
+
+    async def create(
+        self, colors: Sequence[PlayerColor], match_id: str | None = None
+    ) -> MatchActor:
+        return await self.add(self.factory.new_game(*colors), match_id)
+
+    async def add(self, game: Game, match_id: str | None = None) -> MatchActor:
+        if match_id is None:
+            match_id = uuid.uuid4().hex
+
+        self.check_new(match_id)
+
+        if self.store is not None:
+            await asyncio.to_thread(self.store.create, match_id, game)
+
+        return await self.start(MatchActor(match_id, game, self.fsm, self.store))
+
+    def check_new(self, match_id: str) -> None:
+        if match_id in self.actors or self.spill is not None and match_id in self.spill:
+            raise ValueError(f'match already running: {match_id}')
+
+    async def start(self, actor: MatchActor) -> MatchActor:
+        self.actors.add(actor)
+        actor.start()
+
+        await self.evict()
+
+        return actor
+
+    async def evict(self) -> None:
+        for actor in self.actors.evict():
+            if self.spill is not None:
+                # before yielding: a request for it finds it spilled
+                self.spill.write(actor.match_id, actor.version, actor.game)
+
+            await actor.stop()
+
+    async def get(self, match_id: str) -> MatchActor:
+        while True:
+            if match_id in self.released:
+                raise MatchNotFound(match_id)
+
+            actor = self.actors.get(match_id)
+
+            if actor is not None:
+                return actor
+
+            # concurrent requests share the same load
+            loading = self.loading.get(match_id)
+
+            if loading is None:
+                loading = self.loading[match_id] = asyncio.create_task(self.load(match_id))
+                loading.add_done_callback(lambda _: self.loading.pop(match_id, None))
+
+            actor = await asyncio.shield(loading)
+
+            # else evicted again before this request got to run
+            if actor.match_id in self.actors:
+                return actor
+
+    async def load(self, match_id: str) -> MatchActor:
+        if match_id in self.released:
+            raise MatchNotFound(match_id)
+
+        if self.spill is not None:
+            spilled = await asyncio.to_thread(self.spill.read, match_id)
+
+            if spilled is not None:
+                version, game = spilled
+                self.spill.delete(match_id)
+
+                return await self.start(MatchActor(match_id, game, self.fsm, self.store, version))
+
+        store = self.store
+
+        if store is None:
+            raise MatchNotFound(match_id)
+
+        if not await asyncio.to_thread(store.exists, match_id):
+            raise MatchNotFound(match_id)
+
+        game = await asyncio.to_thread(store.load, match_id)
+        version = await asyncio.to_thread(store.count, match_id)
+
+        return await self.start(MatchActor(match_id, game, self.fsm, store, version))
+
+    async def release(self, match_id: str) -> MatchActor:
+        """
+        Stops running match_id once its queued moves are applied, handing it
+        over to another process (see tng.be.shard): the returned actor has
+        the final game and version. Requests for it get MatchNotFound from
+        then on, until it is adopted back: the store still has it, it must
+        not be loaded again while the other process runs it.
+        """
+
+        self.released.add(match_id)
+
+        # a load under way runs the match: released below
+        if (loading := self.loading.get(match_id)) is not None:
+            await asyncio.wait([loading])
+
+        actor = self.actors.pop(match_id)
+
+        if actor is not None:
+            await actor.drain()
+            await actor.stop()
+
+        elif self.spill is not None and (spilled := self.spill.read(match_id)) is not None:
+            version, game = spilled
+            actor = MatchActor(match_id, game, self.fsm, self.store, version)
+
+        else:
+            # not held here, nothing to hand over
+            self.released.discard(match_id)
+            raise MatchNotFound(match_id)
+
+        if self.spill is not None:
+            self.spill.delete(match_id)
+
+        if self.store is not None:
+            self.store.forget(match_id)
+
+        return actor
+
+    async def adopt(self, match_id: str, game: Game, version: int) -> MatchActor:
+        """
+        Runs a match released by another process.
+        """
+
+        self.check_new(match_id)
+        self.released.discard(match_id)
+
+        if self.store is not None:
+            if not self.store.exists(match_id):
+                raise MatchNotFound(match_id)
+
+            # the other process logged to it since
+            self.store.forget(match_id)
+
+        return await self.start(MatchActor(match_id, game, self.fsm, self.store, version))
+
+    async def close(self) -> None:
+        for actor in list(self.actors.values()):
+            await actor.stop()
+
+        self.actors.clear()
@@ -1,2 +1,322 @@
+"""
+The game server.
+
+HTTP/1.1 (see tng.be.http) on asyncio, one actor per match (see
+tng.be.actor):
+
+ * POST /matches {"players": [colors]}: new match
+ * GET /matches/<id>: match version and game
+ * POST /matches/<id>/moves <Move>: plays a move, returns the match version
+ * GET /matches/<id>/events: server sent events, the match game then
+   every move with the state patch it produced (see tng.game.diff)
+ * GET /health
+
+Used by the supervisor to move matches between worker processes (see
+tng.be.shard), only served by the workers, on their unix socket (see
+App.control):
+
+ * GET /matches: ids of the running matches
+ * PUT /matches/<id> {"players": [colors]}: new match with the given id
+ * POST /matches/<id>/release: stops running the match, returns its
+   version and game as GET does
+ * POST /matches/<id>/adopt {"version": n, "game": game}: runs a released
+   match
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+
+from pydantic import TypeAdapter, ValidationError
+
+from tng.game.exc import IllegalMove
+from tng.game.moves import decode_move
+from tng.game.types import PlayerColor
+
+from .actor import MatchActor, Matches, game_adapter
+from .http import HTTPError, Request, read_request, response, stream_head
+from .sqlite_store import SqliteMatchStore
+from .store import FileMatchStore, MatchNotFound, MatchStore, check_match_id
+
+logger = logging.getLogger(__name__)
+
+colors_adapter = TypeAdapter(list[PlayerColor])
+
+# seconds between keep alive comments on idle event streams
+PING_INTERVAL = 15
+
+
+def json_body(data: object) -> bytes:
+    return json.dumps(data, separators=(',', ':')).encode()
+
+
+def error_body(message: str) -> bytes:
+    return json_body({'error': message})
+
+
+def json_object(body: bytes) -> dict:
+    data = json.loads(body)
+
+    if not isinstance(data, dict):
+        raise HTTPError(400, 'expected a JSON object')
+
+    return data
+
+
+class App:
+    def __init__(self, matches: Matches, control: bool = False) -> None:
+        self.matches = matches
+        # serves the supervisor routes too
+        self.control = control
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+
+                except HTTPError as e:
+                    writer.write(response(e.status, error_body(e.message), keep_alive=False))
+                    await writer.drain()
+                    break
+
+                if request is None:
+                    break
+
+                if await self.handle(request, writer) is False or not request.keep_alive:
+                    break
+
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+
+        finally:
+            writer.close()
+
+    async def handle(self, request: Request, writer: asyncio.StreamWriter) -> bool:
+        """
+        Writes the response to request, returns whether the connection can
+        be kept alive.
+        """
+
+        parts = request.path.strip('/').split('/')
+
+        match request.method, parts:
+            case 'GET', ['matches', match_id, 'events']:
+                await self.stream_events(match_id, writer)
+                return False
+
+        try:
+            status, body = await self.route(request.method, parts, request.body)
+
+        except HTTPError as e:
+            status, body = e.status, error_body(e.message)
+
+        except MatchNotFound as e:
+            status, body = 404, error_body(f'match not found: {e}')
+
+        except IllegalMove as e:
+            status, body = 409, error_body(str(e))
+
+        except (ValidationError, ValueError) as e:
+            status, body = 400, error_body(str(e))
+
+        except Exception as e:
+            # GameRuntimeError included: an engine bug, not the client fault
+            logger.exception('error handling %s %s', request.method, request.path)
+            status, body = 500, error_body(str(e))
+
+        writer.write(response(status, body, keep_alive=request.keep_alive))
+        await writer.drain()
+
+        return True
+
+    async def route(self, method: str, parts: list[str], body: bytes) -> tuple[int, bytes]:
+        match method, parts:
+            case 'GET', ['health']:
+                return 200, json_body(self.matches.stats()._asdict())
+
+            case 'GET', ['matches'] if self.control:
+                return 200, json_body({'ids': self.matches.ids()})
+
+            case 'POST', ['matches']:
+                colors = colors_adapter.validate_python(json_object(body).get('players'))
+
+                return 201, created(await self.matches.create(colors))
+
+            case 'PUT', ['matches', match_id] if self.control:
+                check_match_id(match_id)
+                colors = colors_adapter.validate_python(json_object(body).get('players'))
+
+                return 201, created(await self.matches.create(colors, match_id))
+
+            case 'GET', ['matches', match_id]:
+                actor = await self.matches.get(match_id)
+
+                return 200, actor.state_event()
+
+            case 'POST', ['matches', match_id, 'release'] if self.control:
+                actor = await self.matches.release(match_id)
+
+                return 200, actor.state_event()
+
+            case 'POST', ['matches', match_id, 'adopt'] if self.control:
+                check_match_id(match_id)
+                data = json_object(body)
+                version = data.get('version')
+
+                if not isinstance(version, int) or version < 0:
+                    raise HTTPError(400, f'invalid version: {version!r}')
+
+                game = game_adapter.validate_python(data.get('game')).rehash()
+
+                return 201, created(await self.matches.adopt(match_id, game, version))
+
+            case 'POST', ['matches', match_id, 'moves']:
+                move = decode_move(body)
+                actor = await self.matches.get(match_id)
+
+                return 200, json_body({'version': await actor.submit(move)})
+
+            case _, ['health'] | ['matches'] | ['matches', _] | ['matches', _, 'moves']:
+                raise HTTPError(405, f'method not allowed: {method}')
+
+            case _, ['matches', _, 'release' | 'adopt'] if self.control:
+                raise HTTPError(405, f'method not allowed: {method}')
+
+        raise HTTPError(404, f'not found: /{"/".join(parts)}')
+
+    async def stream_events(self, match_id: str, writer: asyncio.StreamWriter) -> None:
+        try:
+            actor = await self.matches.get(match_id)
+
+        except (MatchNotFound, ValueError) as e:
+            writer.write(response(404, error_body(f'match not found: {e}'), keep_alive=False))
+            await writer.drain()
+            return
+
+        events = actor.subscribe()
+
+        try:
+            writer.write(stream_head())
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(events.get(), PING_INTERVAL)
+
+                except TimeoutError:
+                    event = b': ping\n\n'
+
+                except asyncio.QueueShutDown:
+                    break
+
+                writer.write(event)
+                await writer.drain()
+
+        finally:
+            actor.unsubscribe(events)
+
+
+def created(actor: MatchActor) -> bytes:
+    return b'{"id":"%b",%b' % (actor.match_id.encode(), actor.state_event()[1:])
+
+
+async def serve(matches: Matches, host: str = '127.0.0.1', port: int = 8000) -> asyncio.Server:
+    return await asyncio.start_server(App(matches).handle_connection, host, port)
+
+
+async def run(host: str, port: int, matches: Matches) -> None:
+    server = await serve(matches, host, port)
+
+    logger.info('serving on %s', ', '.join(str(s.getsockname()) for s in server.sockets))
+
+    try:
+        await server.serve_forever()
+
+    finally:
+        server.close()
+        # ends the event streams, the server waits for their connections
+        await matches.close()
+        await server.wait_closed()
+
+        if matches.store is not None:
+            matches.store.close()
+
+
+def open_store(data_dir: str | None, db: str | None, snapshot_every: int) -> MatchStore | None:
+    if db is not None:
+        return SqliteMatchStore(db, snapshot_every=snapshot_every)
+
+    if data_dir is not None:
+        return FileMatchStore(data_dir, snapshot_every=snapshot_every)
+
+    return None
+
+
 def main():
-    pass  # TODO
+    parser = argparse.ArgumentParser(description='TNG game server')
+
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    storage = parser.add_mutually_exclusive_group()
+    storage.add_argument('--data-dir', help='persist matches there, in memory only if not set')
+    storage.add_argument('--db', help='persist matches to this SQLite database instead')
+    parser.add_argument('--snapshot-every', type=int, default=50)
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=0,
+        help='run matches in that many processes (see tng.be.shard), in this one if 0',
+    )
+    parser.add_argument(
+        '--max-matches', type=int, help='matches kept running per process, unbounded if not set'
+    )
+    parser.add_argument(
+        '--max-bytes', type=int, help='estimated memory of the matches kept running per process'
+    )
+    parser.add_argument(
+        '--spill-dir',
+        help='where matches beyond the limits are spilled, else they are reloaded from the '
+        'data dir (workers spill to temporary directories)',
+    )
+
+    args = parser.parse_args()
+
+    limited = args.max_matches is not None or args.max_bytes is not None
+
+    persisted = args.data_dir is not None or args.db is not None
+
+    if limited and not persisted and args.spill_dir is None and args.workers == 0:
+        parser.error('--max-matches and --max-bytes need --data-dir, --db or --spill-dir')
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.workers > 0:
+        # shard imports this module
+        from .shard import Supervisor, run as run_supervisor
+
+        supervisor = Supervisor(
+            args.data_dir,
+            args.snapshot_every,
+            max_entries=args.max_matches,
+            max_bytes=args.max_bytes,
+            db=args.db,
+        )
+        coro = run_supervisor(args.host, args.port, args.workers, supervisor)
+
+    else:
+        matches = Matches(
+            store=open_store(args.data_dir, args.db, args.snapshot_every),
+            max_entries=args.max_matches,
+            max_bytes=args.max_bytes,
+            spill_dir=args.spill_dir,
+        )
+        coro = run(args.host, args.port, matches)
+
+    try:
+        asyncio.run(coro)
+
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,448 @@
+"""
+Archive of finished matches.
+
+A match record holds what it takes to rebuild the match exactly: board
+class, player colors and deck (see GameFactory.new_game), the moves
+(2 bytes each, see tng.game.codec.encode_moves) and the outcome, the
+current phase of the last game.
+
+Records are appended to segment files, <n>.seg, of about segment_size
+bytes. When a segment is full it is sealed by writing its index,
+<n>.idx: 16 bytes entries (64 bit hash of the match id, record offset)
+sorted by hash. Segments and indexes are read through mmap: fetching a
+match binary searches the indexes and decodes its record only, whatever
+the archive size. The index of the segment being written is kept in
+memory, rebuilt by scanning the segment when the archive is opened.
+
+Record layout, integers unsigned big endian:
+
+    length            4 bytes, of the rest of the record
+    match id          1 byte length, then ASCII
+    board class       1 byte, 0 Board, 1 BitBoard
+    colors            1 byte count, then color indexes
+    deck              2 bytes length, then tile indexes, two per byte
+    outcome           1 byte, phase index
+    moves             4 bytes count, then 2 bytes each
+"""
+
+import bisect
+import hashlib
+import mmap
+import os
+import struct
+
+from collections.abc import Iterator, Sequence
+from pathlib import Path
+from typing import BinaryIO, NamedTuple
+
+from tng.game.codec import (
+    Reader,
+    all_phases,
+    decode_moves,
+    decode_tile_holder,
+    encode_moves,
+    encode_tile_holder,
+    phase_index,
+)
+from tng.game.factory import GameFactory
+from tng.game.fsm import TNGFSM
+from tng.game.game import BitBoard, Board, Game, Phase
+from tng.game.moves import Move
+from tng.game.types import PlayerColor, Tile, all_colors, color_index
+
+from .store import MatchNotFound, StoreError, check_match_id
+
+MAGIC = b'TNGA\x01'
+
+index_entry = struct.Struct('>QQ')
+
+
+class ArchiveError(StoreError):
+    pass
+
+
+class MatchRecord(NamedTuple):
+    match_id: str
+    board_class: type[Board] | type[BitBoard]
+    colors: list[PlayerColor]
+    deck: list[Tile]
+    moves: list[Move]
+    outcome: Phase
+
+
+def match_record(match_id: str, initial: Game, moves: Sequence[Move], final: Game) -> MatchRecord:
+    """
+    The record of a match started from initial, a GameFactory new game,
+    and ended at final.
+    """
+
+    colors = [p.color for p in initial.players]
+    board_class = type(initial.board)
+
+    if GameFactory(board_class=board_class).new_game(*colors, deck=initial.tile_holder) != initial:
+        raise ValueError(f'match {match_id} did not start from a new game')
+
+    return MatchRecord(
+        match_id, board_class, colors, initial.tile_holder, list(moves), final.current_phase
+    )
+
+
+def first_game(record: MatchRecord) -> Game:
+    """
+    The game an archived match started from.
+    """
+
+    return GameFactory(board_class=record.board_class).new_game(*record.colors, deck=record.deck)
+
+
+def rebuild(record: MatchRecord, fsm: TNGFSM | None = None) -> Game:
+    """
+    The last game of an archived match.
+    """
+
+    # archived moves have been validated when played
+    return (fsm if fsm is not None else TNGFSM()).replay(first_game(record), record.moves)
+
+
+def id_hash(match_id: str) -> int:
+    return int.from_bytes(hashlib.blake2b(match_id.encode(), digest_size=8).digest())
+
+
+def encode_record(record: MatchRecord) -> bytes:
+    match_id = record.match_id.encode('ascii')
+    body = b''.join(
+        [
+            bytes([len(match_id)]),
+            match_id,
+            bytes([1 if record.board_class is BitBoard else 0, len(record.colors)]),
+            bytes(color_index[c] for c in record.colors),
+            encode_tile_holder(record.deck),
+            bytes([phase_index[record.outcome]]),
+            len(record.moves).to_bytes(4),
+            encode_moves(record.moves),
+        ]
+    )
+
+    return len(body).to_bytes(4) + body
+
+
+def decode_record(data: bytes) -> MatchRecord:
+    """
+    data is a record without its length.
+    """
+
+    r = Reader(data)
+    match_id = r.take(r.byte()).decode('ascii')
+    board_class = BitBoard if r.byte() == 1 else Board
+    colors = [all_colors[c] for c in r.take(r.byte())]
+    deck = decode_tile_holder(r)
+    outcome = all_phases[r.byte()]
+    moves = decode_moves(r.take(2 * int.from_bytes(r.take(4))))
+
+    if r.at != len(data):
+        raise ArchiveError(f'unexpected record length: {len(data)}, expected {r.at}')
+
+    return MatchRecord(match_id, board_class, colors, deck, moves, outcome)
+
+
+class Segment:
+    """
+    A segment file, mapped read only. The map grows with the file as
+    records are read past its end.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.file = open(path, 'rb')
+        self.map: mmap.mmap | None = None
+
+        # sealed segments only, sorted hashes and their record offsets
+        self.index: mmap.mmap | None = None
+        self.entries = 0
+
+    def close(self) -> None:
+        for m in (self.map, self.index):
+            if m is not None:
+                m.close()
+
+        self.file.close()
+
+    def view(self, end: int) -> mmap.mmap:
+        """
+        The map, covering at least the first end bytes.
+        """
+
+        if self.map is None or len(self.map) < end:
+            if self.map is not None:
+                self.map.close()
+
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+            if len(self.map) < end:
+                raise ArchiveError(f'{self.path} truncated')
+
+        return self.map
+
+    def read(self, offset: int) -> MatchRecord:
+        start = offset + 4
+        end = start + int.from_bytes(self.view(start)[offset:start])
+
+        return decode_record(self.view(end)[start:end])
+
+    def record_id(self, offset: int) -> str:
+        start = offset + 5
+        end = start + self.view(start)[offset + 4]
+
+        return bytes(self.view(end)[start:end]).decode('ascii')
+
+    def load_index(self, path: Path) -> None:
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size:
+                self.index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self.entries = len(self.index) // index_entry.size
+
+    def find(self, match_id: str) -> int | None:
+        """
+        Offset of match_id record, from the index.
+        """
+
+        index = self.index
+
+        if index is None:
+            return None
+
+        h = id_hash(match_id)
+        i = bisect.bisect_left(
+            range(self.entries),
+            h,
+            key=lambda i: index_entry.unpack_from(index, i * index_entry.size)[0],
+        )
+
+        # colliding hashes are next to each other
+        while i < self.entries:
+            entry_hash, offset = index_entry.unpack_from(index, i * index_entry.size)
+
+            if entry_hash != h:
+                break
+
+            if self.record_id(offset) == match_id:
+                return offset
+
+            i += 1
+
+        return None
+
+    def scan(self, size: int) -> Iterator[tuple[int, int]]:
+        """
+        Start and end offsets of the complete records in the first size bytes.
+        """
+
+        if size <= len(MAGIC):
+            return
+
+        m = self.view(size)
+        offset = len(MAGIC)
+
+        while offset + 4 <= size:
+            start = offset + 4
+            end = start + int.from_bytes(m[offset:start])
+
+            if end > size:
+                break
+
+            yield offset, end
+            offset = end
+
+
+class Archive:
+    """
+    Segments under root. Only one process may append, any number can read:
+    readers see the records appended before they opened the archive, and
+    the ones they append themselves.
+    """
+
+    segment_suffix = '.seg'
+    index_suffix = '.idx'
+
+    def __init__(
+        self,
+        root: str | os.PathLike,
+        segment_size: int = 64 << 20,
+        fsync: bool = True,
+        readonly: bool = False,
+    ) -> None:
+        self.root = Path(root)
+        self.segment_size = segment_size
+        self.fsync = fsync
+        self.readonly = readonly
+
+        if not readonly:
+            self.root.mkdir(parents=True, exist_ok=True)
+
+        self.sealed: list[Segment] = []
+
+        # the segment being appended to, None until the first append after
+        # a sealed one, and its index
+        self.active: Segment | None = None
+        self.active_file: BinaryIO | None = None
+        self.active_size = 0
+        self.active_index: dict[str, int] = {}
+
+        paths = sorted(self.root.glob(f'*{self.segment_suffix}'))
+
+        for path in paths:
+            segment = Segment(path)
+            index = path.with_suffix(self.index_suffix)
+
+            if index.exists():
+                segment.load_index(index)
+                self.sealed.append(segment)
+
+            elif path is paths[-1]:
+                self.open_active(segment)
+
+            else:
+                segment.close()
+                raise ArchiveError(f'{path} is not the last segment and has no index')
+
+    def __len__(self) -> int:
+        return sum(s.entries for s in self.sealed) + len(self.active_index)
+
+    def __contains__(self, match_id: str) -> bool:
+        return self.find(match_id) is not None
+
+    def close(self) -> None:
+        if self.active_file is not None:
+            self.active_file.close()
+
+        for segment in self.segments():
+            segment.close()
+
+    def segments(self) -> list[Segment]:
+        return self.sealed if self.active is None else [*self.sealed, self.active]
+
+    def open_active(self, segment: Segment) -> None:
+        size = os.fstat(segment.file.fileno()).st_size
+        end = len(MAGIC)
+
+        for offset, end in segment.scan(size):
+            self.active_index[segment.record_id(offset)] = offset
+
+        self.active = segment
+        self.active_size = end
+
+        if self.readonly:
+            return
+
+        self.active_file = open(segment.path, 'r+b')
+
+        if size < len(MAGIC):
+            self.active_file.write(MAGIC)
+
+        # a torn last record
+        elif end != size:
+            self.active_file.truncate(end)
+
+        self.active_file.seek(end)
+
+    def find(self, match_id: str) -> tuple[Segment, int] | None:
+        offset = self.active_index.get(match_id)
+
+        if offset is not None and self.active is not None:
+            return self.active, offset
+
+        for segment in reversed(self.sealed):
+            offset = segment.find(match_id)
+
+            if offset is not None:
+                return segment, offset
+
+        return None
+
+    def get(self, match_id: str) -> MatchRecord:
+        found = self.find(match_id)
+
+        if found is None:
+            raise MatchNotFound(match_id)
+
+        segment, offset = found
+
+        return segment.read(offset)
+
+    def records(self) -> Iterator[MatchRecord]:
+        """
+        Every record, in archiving order.
+        """
+
+        for segment in self.segments():
+            size = self.active_size if segment is self.active else len(segment.view(0))
+
+            for offset, _ in segment.scan(size):
+                yield segment.read(offset)
+
+    def append(self, record: MatchRecord) -> None:
+        if self.readonly:
+            raise ArchiveError('archive opened read only')
+
+        check_match_id(record.match_id)
+
+        if record.match_id in self:
+            raise ArchiveError(f'match already archived: {record.match_id}')
+
+        data = encode_record(record)
+        f = self.active_file if self.active_file is not None else self.new_segment()
+
+        f.write(data)
+        f.flush()
+
+        if self.fsync:
+            os.fsync(f.fileno())
+
+        self.active_index[record.match_id] = self.active_size
+        self.active_size += len(data)
+
+        if self.active_size >= self.segment_size:
+            self.seal()
+
+    def new_segment(self) -> BinaryIO:
+        path = self.root / f'{len(self.sealed):06}{self.segment_suffix}'
+
+        with open(path, 'xb') as f:
+            f.write(MAGIC)
+
+        f = self.active_file = open(path, 'r+b')
+        f.seek(0, os.SEEK_END)
+
+        self.active = Segment(path)
+        self.active_size = len(MAGIC)
+        self.active_index = {}
+
+        return f
+
+    def seal(self) -> None:
+        if self.active is None or self.active_file is None:
+            return
+
+        entries = sorted(
+            (id_hash(match_id), offset) for match_id, offset in self.active_index.items()
+        )
+        index = self.active.path.with_suffix(self.index_suffix)
+        tmp = index.with_suffix('.tmp')
+
+        with open(tmp, 'wb') as f:
+            f.write(b''.join(index_entry.pack(*e) for e in entries))
+            f.flush()
+
+            if self.fsync:
+                os.fsync(f.fileno())
+
+        tmp.replace(index)
+
+        self.active_file.close()
+        self.active.load_index(index)
+        self.sealed.append(self.active)
+
+        self.active = None
+        self.active_file = None
+        self.active_size = 0
+        self.active_index = {}
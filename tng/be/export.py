@@ -0,0 +1,390 @@
+"""
+Columnar export of matches, for analysis.
+
+Matches, archived (see archive.Archive.records), are replayed once and
+flattened into two tables: one row per match, see match_columns, and
+one per move, see move_columns. Every column is a .npy file,
+<root>/matches/<column>.npy and <root>/moves/<column>.npy, and
+<root>/matches/ids.txt lists the match ids, one per row.
+
+numpy.load reads the columns, memory mapped if asked, and analyses run
+over whole columns, see summary. The files themselves are written with
+the standard library: numpy is only needed by load and summary.
+
+Columns are appended to their file in chunks as matches are replayed;
+the row count in the .npy headers is written when the export is closed.
+"""
+
+import ast
+import os
+import sys
+
+from array import array
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any, BinaryIO
+
+from tng.game.codec import move_type_index, phase_index
+from tng.game.fsm import TNGFSM
+from tng.game.game import BitBoard, Game, Phase
+from tng.game.moves import MoveType
+from tng.game.types import all_tiles, color_index, is_monster, tile_index
+
+from .archive import MatchRecord, first_game
+from .store import check_match_id
+
+match_columns = {
+    'players': 'B',
+    'edge_length': 'B',
+    'bitboard': 'B',
+    'outcome': 'B',  # phase index, see tng.game.codec.all_phases
+    'moves': 'I',
+    'tiles_drawn': 'H',
+    'first_key_move': 'i',  # -1 if no key was collected
+    'keys_collected': 'B',
+    'monster_hits': 'I',
+    # deck composition, tiles count by kind
+    **{f'deck_{t.value}': 'B' for t in all_tiles},
+}
+
+move_columns = {
+    'match': 'I',  # row in the matches table
+    'seq': 'I',  # from 0
+    'player': 'B',  # color index
+    'move_type': 'B',  # see tng.game.codec.all_move_types
+    'tiles_drawn': 'B',
+    'monsters_drawn': 'B',
+    # players attacked by the monsters drawn: a block decision raised, or
+    # their candle put out
+    'monster_hits': 'B',
+    'keys_collected': 'B',
+    'nerves_spent': 'B',
+    'lights_out': 'B',
+}
+
+NPY_MAGIC = b'\x93NUMPY\x01\x00'
+
+# large enough for any shape, so that the header can be rewritten in place
+NPY_HEADER_SIZE = 128
+
+
+def npy_descr(typecode: str) -> str:
+    size = array(typecode).itemsize
+    kind = 'f' if typecode in 'fd' else 'u' if typecode.isupper() else 'i'
+    order = '|' if size == 1 else '<' if sys.byteorder == 'little' else '>'
+
+    return f'{order}{kind}{size}'
+
+
+def npy_header(typecode: str, rows: int) -> bytes:
+    """
+    .npy format 1.0 header of a rows long vector of typecode items.
+    """
+
+    header = f"{{'descr': '{npy_descr(typecode)}', 'fortran_order': False, 'shape': ({rows},), }}"
+    size = NPY_HEADER_SIZE - len(NPY_MAGIC) - 2
+
+    return NPY_MAGIC + size.to_bytes(2, 'little') + header.ljust(size - 1).encode('ascii') + b'\n'
+
+
+def read_column(path: str | os.PathLike, typecode: str) -> array:
+    """
+    A column written by an export, without numpy.
+    """
+
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    if not data.startswith(NPY_MAGIC):
+        raise ValueError(f'{path} is not a .npy 1.0 file')
+
+    magic = len(NPY_MAGIC)
+    start = magic + 2
+    end = start + int.from_bytes(data[magic:start], 'little')
+
+    header = ast.literal_eval(data[start:end].decode('ascii'))
+
+    if header['descr'] != npy_descr(typecode):
+        raise ValueError(f'{path} items are {header["descr"]}, not {npy_descr(typecode)}')
+
+    column = array(typecode)
+    column.frombytes(data[end:])
+
+    if (len(column),) != header['shape']:
+        raise ValueError(f'{path} has {len(column)} rows, expected {header["shape"][0]}')
+
+    return column
+
+
+class Column:
+    def __init__(self, path: Path, typecode: str) -> None:
+        self.typecode = typecode
+        self.rows = 0
+        self.file: BinaryIO = open(path, 'wb')
+        self.file.write(npy_header(typecode, 0))
+
+    def write(self, values: array) -> None:
+        values.tofile(self.file)
+        self.rows += len(values)
+
+    def close(self) -> None:
+        self.file.seek(0)
+        self.file.write(npy_header(self.typecode, self.rows))
+        self.file.close()
+
+
+class Table:
+    """
+    Columns under root, rows buffered chunk at a time.
+    """
+
+    def __init__(self, root: Path, columns: dict[str, str], chunk: int = 1 << 16) -> None:
+        root.mkdir(parents=True, exist_ok=True)
+
+        self.chunk = chunk
+        self.rows = 0
+        self.files = [Column(root / f'{name}.npy', code) for name, code in columns.items()]
+        self.buffers = [array(code) for code in columns.values()]
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def append(self, row: Iterable[int]) -> None:
+        """
+        row values are in columns order.
+        """
+
+        for buffer, value in zip(self.buffers, row, strict=True):
+            buffer.append(value)
+
+        self.rows += 1
+
+        if len(self.buffers[0]) >= self.chunk:
+            self.flush()
+
+    def flush(self) -> None:
+        for f, buffer in zip(self.files, self.buffers):
+            f.write(buffer)
+            del buffer[:]
+
+    def close(self) -> None:
+        self.flush()
+
+        for f in self.files:
+            f.close()
+
+
+def block_decisions(game: Game) -> int:
+    return sum(d.action is MoveType.block for d in game.decisions or ())
+
+
+def move_features(before: Game, after: Game) -> tuple[int, ...]:
+    """
+    What a move changed, the move_columns after player and move_type.
+    """
+
+    start = before.draw_index
+    end = after.draw_index
+    monsters = sum(is_monster[t] for t in before.tile_holder[start:end])
+    keys = nerves = lights_out = 0
+
+    # players never change order
+    for p, q in zip(before.players, after.players):
+        keys += q.has_key and not p.has_key
+        nerves += max(p.nerves - q.nerves, 0)
+        lights_out += p.has_light and not q.has_light
+
+    # a block refused puts the candle out too, but in response of a
+    # decision: only the moves drawing a monster count its hits
+    hits = max(block_decisions(after) - block_decisions(before), 0) + lights_out
+
+    return end - start, monsters, hits if monsters else 0, keys, nerves, lights_out
+
+
+class Export:
+    """
+    Appends matches to the tables under root.
+    """
+
+    def __init__(
+        self, root: str | os.PathLike, fsm: TNGFSM | None = None, chunk: int = 1 << 16
+    ) -> None:
+        self.root = Path(root)
+        self.fsm = fsm if fsm is not None else TNGFSM()
+        self.matches = Table(self.root / 'matches', match_columns, chunk)
+        self.moves = Table(self.root / 'moves', move_columns, chunk)
+        self.ids = open(self.root / 'matches' / 'ids.txt', 'w', encoding='ascii')
+
+    def close(self) -> None:
+        self.matches.close()
+        self.moves.close()
+        self.ids.close()
+
+    def add(self, record: MatchRecord) -> int:
+        """
+        Replays record, returns its row.
+        """
+
+        check_match_id(record.match_id)
+
+        row = len(self.matches)
+        game = first_game(record)
+        first_key = -1
+        keys = hits = 0
+
+        # archived moves have been validated when played
+        for seq, move in enumerate(record.moves):
+            next_game = self.fsm.replay(game, (move,))
+            features = move_features(game, next_game)
+
+            self.moves.append(
+                (
+                    row,
+                    seq,
+                    color_index[move.player],
+                    move_type_index[move.param.move],
+                    *features,
+                )
+            )
+
+            if features[3] and first_key < 0:
+                first_key = seq
+
+            hits += features[2]
+            keys += features[3]
+            game = next_game
+
+        deck = [0] * len(all_tiles)
+
+        for t in record.deck:
+            deck[tile_index[t]] += 1
+
+        self.matches.append(
+            (
+                len(record.colors),
+                game.board.edge_length,
+                record.board_class is BitBoard,
+                phase_index[record.outcome],
+                len(record.moves),
+                game.draw_index,
+                first_key,
+                keys,
+                hits,
+                *deck,
+            )
+        )
+        self.ids.write(f'{record.match_id}\n')
+
+        return row
+
+
+def export(
+    records: Iterable[MatchRecord], root: str | os.PathLike, fsm: TNGFSM | None = None
+) -> int:
+    """
+    Exports records under root, returns how many.
+    """
+
+    out = Export(root, fsm)
+
+    try:
+        for record in records:
+            out.add(record)
+
+    finally:
+        out.close()
+
+    return len(out.matches)
+
+
+def load(root: str | os.PathLike, mmap: bool = True) -> tuple[dict[str, Any], dict[str, Any]]:
+    """
+    The matches and moves columns under root, as numpy arrays.
+    """
+
+    import numpy as np
+
+    mode = 'r' if mmap else None
+    root = Path(root)
+
+    def columns(table: str, names: Iterable[str]) -> dict[str, Any]:
+        return {name: np.load(root / table / f'{name}.npy', mmap_mode=mode) for name in names}
+
+    return columns('matches', match_columns), columns('moves', move_columns)
+
+
+def summary(root: str | os.PathLike, bucket: int = 10) -> dict[str, Any]:
+    """
+    What designers ask for, with plain Python values (JSON ready):
+
+     * by_edge_length: matches, win and loss rates, mean moves, share of
+       matches where a key was collected and median move of the first
+       one, monster hits per move
+     * by_deck: matches and win rate by deck composition
+     * by_move: keys collected and monster hits per move, by bucket moves
+       long slices of the match (key collection and attacks timing)
+    """
+
+    import numpy as np
+
+    matches, moves = load(root)
+
+    won = matches['outcome'] == phase_index[Phase.game_won]
+    lost = matches['outcome'] == phase_index[Phase.game_lost]
+    keyed = matches['first_key_move'] >= 0
+    edge = matches['edge_length']
+
+    by_edge_length = {}
+
+    for e in np.unique(edge):
+        rows = edge == e
+        first_keys = matches['first_key_move'][rows & keyed]
+        played = int(matches['moves'][rows].sum())
+
+        by_edge_length[int(e)] = {
+            'matches': int(rows.sum()),
+            'win_rate': float(won[rows].mean()),
+            'loss_rate': float(lost[rows].mean()),
+            'moves_mean': float(matches['moves'][rows].mean()),
+            'key_rate': float(keyed[rows].mean()),
+            'first_key_move_median': float(np.median(first_keys)) if len(first_keys) else None,
+            'monster_hits_per_move': (
+                float(matches['monster_hits'][rows].sum() / played) if played else None
+            ),
+        }
+
+    decks = np.stack([matches[f'deck_{t.value}'] for t in all_tiles], axis=1)
+    compositions, inverse, counts = np.unique(
+        decks, axis=0, return_inverse=True, return_counts=True
+    )
+    wins = np.bincount(inverse.ravel(), weights=won, minlength=len(compositions))
+
+    by_deck = {
+        ','.join(f'{t.value}={n}' for t, n in zip(all_tiles, composition) if n): {
+            'matches': int(count),
+            'win_rate': float(w / count),
+        }
+        for composition, count, w in zip(compositions, counts, wins)
+    }
+
+    buckets = moves['seq'] // bucket
+    played = np.bincount(buckets)
+
+    by_move = {
+        int(b)
+        * bucket: {
+            'moves': int(n),
+            'keys_collected': float(k / n),
+            'monster_hits': float(h / n),
+        }
+        for b, (n, k, h) in enumerate(
+            zip(
+                played,
+                np.bincount(buckets, weights=moves['keys_collected'], minlength=len(played)),
+                np.bincount(buckets, weights=moves['monster_hits'], minlength=len(played)),
+            )
+        )
+        if n
+    }
+
+    return {'by_edge_length': by_edge_length, 'by_deck': by_deck, 'by_move': by_move}
@@ -0,0 +1,191 @@
+"""
+Bounded set of running matches.
+
+Most matches sit idle between turns: HotSet keeps the most recently used
+match actors, up to max_entries of them and max_bytes of estimated memory,
+and evicts the least recently used idle ones beyond. Evicted matches are
+spilled to disk as encoded snapshots (see tng.game.codec, about a hundred
+bytes) by SpillDir, and rehydrated by Matches on next use.
+"""
+
+import os
+
+from collections import OrderedDict
+from collections.abc import Iterator
+from itertools import islice
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple
+
+from tng.game.codec import decode, encode
+from tng.game.game import Game
+
+from .store import check_match_id
+
+if TYPE_CHECKING:
+    from .actor import MatchActor
+
+# rough memory use, measured with tracemalloc: an idle actor (task, mailbox)
+ACTOR_BYTES = 5000
+# a game, on top of its cells and deck
+GAME_BYTES = 1500
+CELL_BYTES = 100
+TILE_BYTES = 8
+
+
+def estimate_size(game: Game) -> int:
+    n = game.board.edge_length
+
+    return ACTOR_BYTES + GAME_BYTES + CELL_BYTES * n * n + TILE_BYTES * len(game.tile_holder)
+
+
+class HotSetStats(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    bytes: int  # estimated
+
+
+class HotSet:
+    """
+    LRU of match actors by id, with hit, miss and eviction counters.
+
+    Only idle actors are evicted (see MatchActor.idle): the set can stay
+    over its limits while the matches in it are busy.
+    """
+
+    def __init__(self, max_entries: int | None = None, max_bytes: int | None = None) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        # least recently used first, actor and estimated size
+        self.entries: OrderedDict[str, tuple['MatchActor', int]] = OrderedDict()
+        self.bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, match_id: str) -> bool:
+        return match_id in self.entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.entries)
+
+    def values(self) -> Iterator['MatchActor']:
+        return (actor for actor, _ in self.entries.values())
+
+    def stats(self) -> HotSetStats:
+        return HotSetStats(self.hits, self.misses, self.evictions, len(self.entries), self.bytes)
+
+    def get(self, match_id: str) -> 'MatchActor | None':
+        entry = self.entries.get(match_id)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(match_id)
+
+        return entry[0]
+
+    def add(self, actor: 'MatchActor') -> None:
+        self.pop(actor.match_id)
+
+        size = estimate_size(actor.game)
+
+        self.entries[actor.match_id] = (actor, size)
+        self.bytes += size
+
+    def pop(self, match_id: str) -> 'MatchActor | None':
+        entry = self.entries.pop(match_id, None)
+
+        if entry is None:
+            return None
+
+        self.bytes -= entry[1]
+
+        return entry[0]
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.bytes = 0
+
+    def over(self, entries: int, size: int) -> bool:
+        return (self.max_entries is not None and entries > self.max_entries) or (
+            self.max_bytes is not None and size > self.max_bytes
+        )
+
+    def evict(self) -> list['MatchActor']:
+        """
+        Removes least recently used idle actors until back within the limits,
+        returns them.
+        """
+
+        entries, size = len(self.entries), self.bytes
+        evicted = []
+
+        # never the most recently used one, it has just been asked for
+        for actor, actor_size in islice(self.entries.values(), len(self.entries) - 1):
+            if not self.over(entries, size):
+                break
+
+            if actor.idle:
+                evicted.append(actor)
+                entries -= 1
+                size -= actor_size
+
+        for actor in evicted:
+            self.pop(actor.match_id)
+
+        self.evictions += len(evicted)
+
+        return evicted
+
+
+class SpillDir:
+    """
+    Evicted matches, one <match id>.spill file each: the match version as
+    8 bytes big endian, then the encoded game.
+    """
+
+    suffix = '.spill'
+
+    def __init__(self, root: str | os.PathLike) -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path(self, match_id: str) -> Path:
+        check_match_id(match_id)
+
+        return self.root / f'{match_id}{self.suffix}'
+
+    def __contains__(self, match_id: str) -> bool:
+        return self.path(match_id).exists()
+
+    def __iter__(self) -> Iterator[str]:
+        return (f.name.removesuffix(self.suffix) for f in self.root.glob(f'*{self.suffix}'))
+
+    def write(self, match_id: str, version: int, game: Game) -> None:
+        final = self.path(match_id)
+        tmp = final.with_suffix('.tmp')
+
+        # not synced: it is the memory of the running process, not a backup
+        tmp.write_bytes(version.to_bytes(8) + encode(game))
+        tmp.replace(final)
+
+    def read(self, match_id: str) -> tuple[int, Game] | None:
+        try:
+            data = self.path(match_id).read_bytes()
+
+        except FileNotFoundError:
+            return None
+
+        return int.from_bytes(data[:8]), decode(data[8:])
+
+    def delete(self, match_id: str) -> None:
+        self.path(match_id).unlink(missing_ok=True)
@@ -0,0 +1,120 @@
+"""
+Minimal HTTP/1.1 over asyncio streams: just what the game server needs
+(request with Content-Length body, keep alive, plain and streamed
+responses), to stay on the standard library.
+"""
+
+import asyncio
+
+from typing import NamedTuple
+
+MAX_BODY = 1 << 20
+
+reasons = {
+    200: 'OK',
+    201: 'Created',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    409: 'Conflict',
+    413: 'Content Too Large',
+    500: 'Internal Server Error',
+    503: 'Service Unavailable',
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Request(NamedTuple):
+    method: str
+    path: str
+    headers: dict[str, str]  # lower case names
+    body: bytes
+
+    @property
+    def keep_alive(self) -> bool:
+        return self.headers.get('connection', '').lower() != 'close'
+
+
+async def read_request(reader: asyncio.StreamReader) -> Request | None:
+    """
+    The next request on the connection, None when the client closed it.
+    """
+
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+
+    except asyncio.IncompleteReadError as e:
+        if not e.partial.strip():
+            return None
+
+        raise HTTPError(400, 'truncated request')
+
+    except asyncio.LimitOverrunError:
+        raise HTTPError(413, 'headers too large')
+
+    request_line, *header_lines = head.decode('latin-1').split('\r\n')
+
+    try:
+        method, target, _ = request_line.split(' ')
+
+    except ValueError:
+        raise HTTPError(400, f'malformed request line: {request_line!r}')
+
+    headers = {}
+
+    for line in header_lines:
+        if line:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+    content_length = headers.get('content-length', '0')
+
+    # digits only: int() takes signs, spaces, underscores and non ASCII digits
+    if not (content_length.isascii() and content_length.isdigit()):
+        raise HTTPError(400, f'invalid content length: {content_length!r}')
+
+    length = int(content_length)
+
+    if length > MAX_BODY:
+        raise HTTPError(413, f'body too large: {length}')
+
+    body = await reader.readexactly(length) if length else b''
+
+    return Request(method, target.partition('?')[0], headers, body)
+
+
+def response(
+    status: int,
+    body: bytes = b'',
+    content_type: str = 'application/json',
+    keep_alive: bool = True,
+) -> bytes:
+    return (
+        f'HTTP/1.1 {status} {reasons.get(status, "")}\r\n'
+        f'Content-Type: {content_type}\r\n'
+        f'Content-Length: {len(body)}\r\n'
+        f'Connection: {"keep-alive" if keep_alive else "close"}\r\n'
+        '\r\n'
+    ).encode('latin-1') + body
+
+
+def stream_head(content_type: str = 'text/event-stream') -> bytes:
+    # no length: the body lasts until the connection is closed
+    return (
+        'HTTP/1.1 200 OK\r\n'
+        f'Content-Type: {content_type}\r\n'
+        'Cache-Control: no-cache\r\n'
+        'Connection: close\r\n'
+        '\r\n'
+    ).encode('latin-1')
+
+
+def sse_event(event: str, data: bytes) -> bytes:
+    # data is single line JSON
+    return b'event: ' + event.encode() + b'\ndata: ' + data + b'\n\n'
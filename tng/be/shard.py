@@ -0,0 +1,497 @@
+"""
+Matches sharded over worker processes.
+
+The engine is CPU bound pure Python: a process runs one core worth of
+matches. The Supervisor runs N worker processes, each one a game server
+(see tng.be.app) listening on a unix socket, and serves the public HTTP
+API proxying the match requests (state, moves and events) to the worker
+owning the match. The routes moving matches between workers are only
+served on the workers sockets.
+
+Matches are pinned to workers by consistent hashing of their id (see
+HashRing): adding or removing a worker only moves the matches it gains or
+loses, about 1/N of them. Moving a match releases it from its old worker
+once its queued moves are applied, then the new worker adopts its state;
+requests for it wait meanwhile, nothing in flight is dropped.
+"""
+
+import asyncio
+import bisect
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import uuid
+
+from collections.abc import Iterable
+from multiprocessing.synchronize import Event
+from pathlib import Path
+from typing import NamedTuple
+
+from .actor import Matches
+from .app import App, error_body, json_body, json_object, open_store
+from .http import HTTPError, Request, read_request, response
+
+logger = logging.getLogger(__name__)
+
+# moves handed over at the same time while rebalancing
+MIGRATION_CONCURRENCY = 64
+
+
+def ring_hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest())
+
+
+class HashRing:
+    """
+    Consistent hashing: nodes own the keys hashing between their points
+    and the previous ones on the ring. replicas points per node even out
+    the shares.
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), replicas: int = 64) -> None:
+        self.replicas = replicas
+        self.nodes: set[str] = set()
+
+        # sorted points, node of each point
+        self.points: list[int] = []
+        self.owners: list[str] = []
+
+        for node in nodes:
+            self.add(node)
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def copy(self) -> 'HashRing':
+        ring = HashRing(replicas=self.replicas)
+
+        ring.nodes = set(self.nodes)
+        ring.points = list(self.points)
+        ring.owners = list(self.owners)
+
+        return ring
+
+    def add(self, node: str) -> None:
+        if node in self.nodes:
+            raise ValueError(f'node already in ring: {node}')
+
+        self.nodes.add(node)
+
+        for i in range(self.replicas):
+            point = ring_hash(f'{node}#{i}')
+            idx = bisect.bisect(self.points, point)
+
+            self.points.insert(idx, point)
+            self.owners.insert(idx, node)
+
+    def remove(self, node: str) -> None:
+        self.nodes.remove(node)
+
+        kept = [(p, o) for p, o in zip(self.points, self.owners) if o != node]
+
+        self.points = [p for p, _ in kept]
+        self.owners = [o for _, o in kept]
+
+    def owner(self, key: str) -> str:
+        if not self.points:
+            raise LookupError('empty ring')
+
+        idx = bisect.bisect(self.points, ring_hash(key))
+
+        return self.owners[idx % len(self.owners)]
+
+
+class WorkerConfig(NamedTuple):
+    data_dir: str | None
+    snapshot_every: int
+    # hot set limits, see Matches
+    max_entries: int | None
+    max_bytes: int | None
+    db: str | None  # SQLite store instead of data_dir
+
+
+def worker_main(path: str, spill_dir: str, config: WorkerConfig, ready: Event) -> None:
+    store = open_store(config.data_dir, config.db, config.snapshot_every)
+
+    async def run() -> None:
+        matches = Matches(
+            store=store,
+            max_entries=config.max_entries,
+            max_bytes=config.max_bytes,
+            spill_dir=spill_dir,
+        )
+        server = await asyncio.start_unix_server(App(matches, control=True).handle_connection, path)
+
+        ready.set()
+
+        try:
+            await server.serve_forever()
+
+        finally:
+            server.close()
+            await matches.close()
+
+            if store is not None:
+                store.close()
+
+    try:
+        asyncio.run(run())
+
+    except KeyboardInterrupt:
+        pass
+
+
+class Worker:
+    def __init__(self, name: str, path: str, process: multiprocessing.Process) -> None:
+        self.name = name
+        self.path = path
+        self.process = process
+
+    async def request(self, method: str, path: str, body: bytes = b'') -> tuple[int, bytes]:
+        reader, writer = await self.send(method, path, body)
+
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+            data = await reader.read()
+
+        finally:
+            writer.close()
+
+        return int(head.split(b' ', 2)[1]), data
+
+    async def send(
+        self, method: str, path: str, body: bytes = b''
+    ) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        reader, writer = await asyncio.open_unix_connection(self.path)
+
+        writer.write(
+            f'{method} {path} HTTP/1.1\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            'Connection: close\r\n'
+            '\r\n'.encode('latin-1') + body
+        )
+
+        return reader, writer
+
+
+class Supervisor:
+    """
+    Runs the worker processes and routes requests to them.
+
+    With data_dir (or db), workers share a FileMatchStore there (or a
+    SqliteMatchStore). A match runs, so is written, on one worker at a
+    time: its old owner stops it, queued moves applied, before the new
+    one adopts it, and doesn't load it back (see Matches.release).
+    max_entries and max_bytes bound each worker hot set, see Matches.
+    """
+
+    def __init__(
+        self,
+        data_dir: str | os.PathLike | None = None,
+        snapshot_every: int = 50,
+        replicas: int = 64,
+        max_entries: int | None = None,
+        max_bytes: int | None = None,
+        db: str | os.PathLike | None = None,
+    ) -> None:
+        self.config = WorkerConfig(
+            None if data_dir is None else str(data_dir),
+            snapshot_every,
+            max_entries,
+            max_bytes,
+            None if db is None else str(db),
+        )
+
+        self.ring = HashRing(replicas=replicas)
+        self.workers: dict[str, Worker] = {}
+        # worker sockets and spill directories
+        self.run_dir = Path(tempfile.mkdtemp(prefix='tng-be-'))
+        self.context = multiprocessing.get_context('spawn')
+        self.next_worker = 0
+
+        # match id -> set once the match has moved to its new owner
+        self.migrating: dict[str, asyncio.Event] = {}
+        # cleared while rebalancing decides which matches move
+        self.routing = asyncio.Event()
+        self.routing.set()
+        self.creating = 0
+        self.created = asyncio.Event()
+        self.rebalancing = asyncio.Lock()
+
+    async def start(self, workers: int) -> None:
+        for _ in range(workers):
+            await self.add_worker()
+
+    async def close(self) -> None:
+        for worker in list(self.workers.values()):
+            await self.stop_process(worker)
+
+        self.workers.clear()
+        shutil.rmtree(self.run_dir, ignore_errors=True)
+
+    # workers
+
+    async def add_worker(self) -> str:
+        name = f'w{self.next_worker}'
+        path = str(self.run_dir / f'{name}.sock')
+        ready = self.context.Event()
+
+        self.next_worker += 1
+
+        process = self.context.Process(
+            target=worker_main,
+            args=(path, str(self.run_dir / f'{name}.spill'), self.config, ready),
+            name=f'tng-be {name}',
+            daemon=True,
+        )
+        process.start()
+
+        for _ in range(300):
+            if await asyncio.to_thread(ready.wait, 0.1) or not process.is_alive():
+                break
+
+        if not ready.is_set():
+            process.kill()
+            raise RuntimeError(f'worker {name} did not start, exit code {process.exitcode}')
+
+        self.workers[name] = Worker(name, path, process)
+
+        ring = self.ring.copy()
+        ring.add(name)
+        await self.rebalance(ring)
+
+        return name
+
+    async def remove_worker(self, name: str) -> None:
+        worker = self.workers[name]
+
+        if len(self.ring) == 1:
+            raise ValueError('cannot remove the last worker')
+
+        ring = self.ring.copy()
+        ring.remove(name)
+        await self.rebalance(ring)
+
+        del self.workers[name]
+        await self.stop_process(worker)
+
+    async def stop_process(self, worker: Worker) -> None:
+        worker.process.terminate()
+        await asyncio.to_thread(worker.process.join, 10)
+
+        if worker.process.is_alive():
+            worker.process.kill()
+
+    async def rebalance(self, ring: HashRing) -> None:
+        """
+        Switches to ring, moving the matches whose owner changes.
+        """
+
+        async with self.rebalancing:
+            # no new requests while finding the matches to move, the ones
+            # creating matches with the old ring have to finish first
+            self.routing.clear()
+
+            try:
+                while self.creating:
+                    self.created.clear()
+                    await self.created.wait()
+
+                moves = []
+
+                for name in self.ring.nodes:
+                    status, data = await self.workers[name].request('GET', '/matches')
+
+                    if status != 200:
+                        raise RuntimeError(f'worker {name} listing: {status} {data!r}')
+
+                    for match_id in json.loads(data)['ids']:
+                        if (owner := ring.owner(match_id)) != name:
+                            moves.append((match_id, self.workers[name], self.workers[owner]))
+
+                for match_id, _, _ in moves:
+                    self.migrating[match_id] = asyncio.Event()
+
+                self.ring = ring
+
+            finally:
+                self.routing.set()
+
+            limit = asyncio.Semaphore(MIGRATION_CONCURRENCY)
+
+            async def move(match_id: str, source: Worker, target: Worker) -> None:
+                async with limit:
+                    try:
+                        await self.migrate(match_id, source, target)
+
+                    finally:
+                        self.migrating.pop(match_id).set()
+
+            await asyncio.gather(*(move(*m) for m in moves))
+
+            if moves:
+                logger.info('moved %d matches', len(moves))
+
+    async def migrate(self, match_id: str, source: Worker, target: Worker) -> None:
+        status, state = await source.request('POST', f'/matches/{match_id}/release')
+
+        if status == 404:
+            # not running anymore
+            return
+
+        if status != 200:
+            raise RuntimeError(f'releasing {match_id}: {status} {state!r}')
+
+        status, data = await target.request('POST', f'/matches/{match_id}/adopt', state)
+
+        if status != 201:
+            raise RuntimeError(f'adopting {match_id}: {status} {data!r}')
+
+    # requests
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+
+                except HTTPError as e:
+                    writer.write(response(e.status, error_body(e.message), keep_alive=False))
+                    await writer.drain()
+                    break
+
+                if request is None:
+                    break
+
+                if not await self.handle(request, writer) or not request.keep_alive:
+                    break
+
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+
+        finally:
+            writer.close()
+
+    async def handle(self, request: Request, writer: asyncio.StreamWriter) -> bool:
+        parts = request.path.strip('/').split('/')
+
+        match request.method, parts:
+            case 'GET', ['health']:
+                status, body = 200, json_body({'workers': sorted(self.ring.nodes)})
+
+            case 'GET', ['matches', match_id, 'events']:
+                await self.stream(match_id, request, writer)
+                return False
+
+            case _:
+                try:
+                    status, body = await self.dispatch(request, parts)
+
+                except OSError as e:
+                    logger.exception('forwarding %s %s', request.method, request.path)
+                    status, body = 503, error_body(f'worker unavailable: {e}')
+
+        writer.write(response(status, body, keep_alive=request.keep_alive))
+        await writer.drain()
+
+        return True
+
+    async def dispatch(self, request: Request, parts: list[str]) -> tuple[int, bytes]:
+        match request.method, parts:
+            case 'POST', ['matches']:
+                return await self.create(request.body)
+
+            case ('GET', ['matches', match_id]) | ('POST', ['matches', match_id, 'moves']):
+                return await self.forward(match_id, request)
+
+            case _, ['health'] | ['matches'] | ['matches', _] | ['matches', _, 'moves']:
+                return 405, error_body(f'method not allowed: {request.method}')
+
+        # the workers control routes are not forwarded
+        return 404, error_body(f'not found: {request.path}')
+
+    async def create(self, body: bytes) -> tuple[int, bytes]:
+        try:
+            json_object(body)
+
+        except (HTTPError, ValueError) as e:
+            return 400, error_body(str(e))
+
+        await self.routing.wait()
+
+        match_id = uuid.uuid4().hex
+        self.creating += 1
+
+        try:
+            return await self.worker(match_id).request('PUT', f'/matches/{match_id}', body)
+
+        finally:
+            self.creating -= 1
+
+            if not self.creating:
+                self.created.set()
+
+    async def forward(self, match_id: str, request: Request) -> tuple[int, bytes]:
+        while True:
+            worker = await self.route(match_id)
+            status, body = await worker.request(request.method, request.path, request.body)
+
+            # sent to the old owner while it was being released
+            if status == 404 and (
+                match_id in self.migrating or self.worker(match_id) is not worker
+            ):
+                continue
+
+            return status, body
+
+    async def stream(self, match_id: str, request: Request, writer: asyncio.StreamWriter) -> None:
+        worker = await self.route(match_id)
+        reader, upstream = await worker.send(request.method, request.path)
+
+        # the stream ends when the match is released, clients reconnect
+        try:
+            while data := await reader.read(1 << 16):
+                writer.write(data)
+                await writer.drain()
+
+        finally:
+            upstream.close()
+
+    async def route(self, match_id: str) -> Worker:
+        await self.routing.wait()
+
+        while (moved := self.migrating.get(match_id)) is not None:
+            await moved.wait()
+
+        return self.worker(match_id)
+
+    def worker(self, match_id: str) -> Worker:
+        return self.workers[self.ring.owner(match_id)]
+
+
+async def serve(supervisor: Supervisor, host: str, port: int) -> asyncio.Server:
+    return await asyncio.start_server(supervisor.handle_connection, host, port)
+
+
+async def run(host: str, port: int, workers: int, supervisor: Supervisor) -> None:
+    await supervisor.start(workers)
+    server = await serve(supervisor, host, port)
+
+    logger.info(
+        'serving on %s, %d workers',
+        ', '.join(str(s.getsockname()) for s in server.sockets),
+        workers,
+    )
+
+    try:
+        await server.serve_forever()
+
+    finally:
+        server.close()
+        await supervisor.close()
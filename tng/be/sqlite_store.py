@@ -0,0 +1,358 @@
+"""
+SQLite match persistence with group commit.
+
+Every write (a move with the state hash it led to, a snapshot, a new
+match) is queued to a single writer thread, which applies whatever is
+queued in one transaction every commit_interval seconds at most: many
+matches share the cost of a durable commit. Writers are told a write is
+done, or failed, only once its transaction is committed.
+
+The database is in WAL mode with synchronous=FULL: a committed
+transaction survives a power loss, and reads, from a connection per
+thread, don't wait for the writer.
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future
+
+from tng.game.codec import encode
+from tng.game.fsm import TNGFSM
+from tng.game.game import Game
+from tng.game.moves import Move
+
+from .store import MatchNotFound, MatchStore, StoreError, check_match_id
+
+schema = '''
+CREATE TABLE IF NOT EXISTS matches (
+    id TEXT PRIMARY KEY
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS moves (
+    match_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,  -- from 1
+    move BLOB NOT NULL,  -- JSON
+    zobrist INTEGER,  -- of the game after the move, signed
+    PRIMARY KEY (match_id, seq)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS snapshots (
+    match_id TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    game BLOB NOT NULL,  -- tng.game.codec
+    PRIMARY KEY (match_id, count)
+) WITHOUT ROWID;
+'''
+
+# a write, run in the batch transaction, its result goes to the submitter
+type Op[T] = Callable[[sqlite3.Connection], T]
+
+
+def to_signed(value: int) -> int:
+    # SQLite integers are signed 64 bits
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+class SqliteMatchStore(MatchStore):
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        fsm: TNGFSM | None = None,
+        snapshot_every: int = 50,
+        commit_interval: float = 0.002,
+        max_batch: int = 1000,
+    ) -> None:
+        super().__init__(fsm, snapshot_every)
+
+        self.path = os.fspath(path)
+        self.commit_interval = commit_interval
+        self.max_batch = max_batch
+
+        self.writer = self.connect()
+        self.writer.execute('PRAGMA journal_mode=WAL')
+        self.writer.executescript(schema)
+
+        self.local = threading.local()
+        self.readers: list[sqlite3.Connection] = []
+
+        self.pending: list[tuple[Op, Future]] = []
+        self.cond = threading.Condition()
+        self.closing = False
+        self.thread = threading.Thread(target=self.run_writer, name='sqlite store', daemon=True)
+        self.thread.start()
+
+    def connect(self) -> sqlite3.Connection:
+        # transactions are explicit
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+
+        conn.execute('PRAGMA synchronous=FULL')
+        conn.execute('PRAGMA busy_timeout=5000')
+
+        return conn
+
+    def reader(self) -> sqlite3.Connection:
+        conn = getattr(self.local, 'conn', None)
+
+        if conn is None:
+            conn = self.local.conn = self.connect()
+            self.readers.append(conn)
+
+        return conn
+
+    def close(self) -> None:
+        """
+        Commits the queued writes and closes the database.
+        """
+
+        with self.cond:
+            self.closing = True
+            self.cond.notify()
+
+        self.thread.join()
+        self.writer.close()
+
+        for conn in self.readers:
+            conn.close()
+
+    # group commit
+
+    def submit[T](self, op: Op[T]) -> Future[T]:
+        result: Future[T] = Future()
+
+        with self.cond:
+            if self.closing:
+                raise StoreError('store closed')
+
+            self.pending.append((op, result))
+
+            if len(self.pending) == 1 or len(self.pending) >= self.max_batch:
+                self.cond.notify()
+
+        return result
+
+    def write[T](self, op: Op[T]) -> T:
+        return self.submit(op).result()
+
+    def run_writer(self) -> None:
+        while True:
+            with self.cond:
+                while not self.pending and not self.closing:
+                    self.cond.wait()
+
+                if not self.pending:
+                    return
+
+                # gathers a batch
+                deadline = time.monotonic() + self.commit_interval
+
+                while len(self.pending) < self.max_batch and not self.closing:
+                    if (left := deadline - time.monotonic()) <= 0:
+                        break
+
+                    self.cond.wait(left)
+
+                batch = self.pending[: self.max_batch]
+                del self.pending[: self.max_batch]
+
+            self.commit(batch)
+
+    def commit(self, batch: list[tuple[Op, Future]]) -> None:
+        conn = self.writer
+        results: list[tuple[Future, object, BaseException | None]] = []
+
+        # writes cancelled while queued are dropped, the others can't be
+        # cancelled anymore
+        batch = [(op, result) for op, result in batch if result.set_running_or_notify_cancel()]
+
+        if not batch:
+            return
+
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+
+            for op, result in batch:
+                # a failing write doesn't fail the batch
+                conn.execute('SAVEPOINT op')
+
+                try:
+                    results.append((result, op(conn), None))
+
+                except Exception as e:
+                    conn.execute('ROLLBACK TO op')
+                    results.append((result, None, e))
+
+                conn.execute('RELEASE op')
+
+            conn.execute('COMMIT')
+
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+
+            for _, result in batch:
+                if not result.done():
+                    result.set_exception(e)
+
+            return
+
+        for result, value, error in results:
+            if result.done():
+                continue
+
+            if error is None:
+                result.set_result(value)
+
+            else:
+                result.set_exception(error)
+
+    # writes
+
+    def create(self, match_id: str, game: Game) -> None:
+        check_match_id(match_id)
+        data = encode(game)
+
+        def op(conn: sqlite3.Connection) -> None:
+            try:
+                conn.execute('INSERT INTO matches VALUES (?)', (match_id,))
+
+            except sqlite3.IntegrityError:
+                raise StoreError(f'match already exists: {match_id}')
+
+            conn.execute('INSERT INTO snapshots VALUES (?, 0, ?)', (match_id, data))
+
+        self.write(op)
+
+    def append(self, match_id: str, move: Move, game: Game) -> int:
+        return self.write(self.append_op(match_id, move, game))
+
+    async def append_async(self, match_id: str, move: Move, game: Game) -> int:
+        # no thread blocked waiting for the commit
+        return await asyncio.wrap_future(self.submit(self.append_op(match_id, move, game)))
+
+    def append_op(self, match_id: str, move: Move, game: Game) -> Op[int]:
+        line = move.model_dump_json().encode()
+
+        def op(conn: sqlite3.Connection) -> int:
+            count = self.insert_moves(conn, match_id, [(line, to_signed(game.zobrist))])
+
+            if count % self.snapshot_every == 0:
+                conn.execute(
+                    'INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?)',
+                    (match_id, count, encode(game)),
+                )
+
+            return count
+
+        return op
+
+    def append_moves(self, match_id: str, lines: Iterable[bytes]) -> int:
+        rows = [(line, None) for line in lines]
+
+        return self.write(lambda conn: self.insert_moves(conn, match_id, rows))
+
+    def insert_moves(
+        self, conn: sqlite3.Connection, match_id: str, rows: list[tuple[bytes, int | None]]
+    ) -> int:
+        count = self.query_count(conn, match_id)
+
+        conn.executemany(
+            'INSERT INTO moves VALUES (?, ?, ?, ?)',
+            [(match_id, count + i, line, zobrist) for i, (line, zobrist) in enumerate(rows, 1)],
+        )
+
+        return count + len(rows)
+
+    def write_snapshot(self, match_id: str, count: int, data: bytes) -> None:
+        self.write(
+            lambda conn: conn.execute(
+                'INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?)', (match_id, count, data)
+            )
+        )
+
+    def delete(self, match_id: str) -> None:
+        def op(conn: sqlite3.Connection) -> None:
+            if not conn.execute('DELETE FROM matches WHERE id = ?', (match_id,)).rowcount:
+                raise MatchNotFound(match_id)
+
+            conn.execute('DELETE FROM moves WHERE match_id = ?', (match_id,))
+            conn.execute('DELETE FROM snapshots WHERE match_id = ?', (match_id,))
+
+        self.write(op)
+
+    # reads
+
+    def exists(self, match_id: str) -> bool:
+        check_match_id(match_id)
+
+        return (
+            self.reader().execute('SELECT 1 FROM matches WHERE id = ?', (match_id,)).fetchone()
+            is not None
+        )
+
+    def check_exists(self, conn: sqlite3.Connection, match_id: str) -> None:
+        if conn.execute('SELECT 1 FROM matches WHERE id = ?', (match_id,)).fetchone() is None:
+            raise MatchNotFound(match_id)
+
+    def query_count(self, conn: sqlite3.Connection, match_id: str) -> int:
+        self.check_exists(conn, match_id)
+
+        (count,) = conn.execute(
+            'SELECT coalesce(max(seq), 0) FROM moves WHERE match_id = ?', (match_id,)
+        ).fetchone()
+
+        return count
+
+    def count(self, match_id: str) -> int:
+        return self.query_count(self.reader(), match_id)
+
+    def read_moves(self, match_id: str, start: int) -> Iterator[bytes]:
+        rows = self.reader().execute(
+            'SELECT move FROM moves WHERE match_id = ? AND seq > ? ORDER BY seq', (match_id, start)
+        )
+
+        return (move for (move,) in rows)
+
+    def latest_snapshot(self, match_id: str) -> tuple[int, bytes]:
+        conn = self.reader()
+        row = conn.execute(
+            'SELECT count, game FROM snapshots WHERE match_id = ? ORDER BY count DESC LIMIT 1',
+            (match_id,),
+        ).fetchone()
+
+        if row is None:
+            self.check_exists(conn, match_id)
+            raise StoreError(f'no snapshot of match {match_id}')
+
+        return row
+
+    def last_zobrist(self, match_id: str) -> int | None:
+        row = (
+            self.reader()
+            .execute(
+                'SELECT zobrist FROM moves WHERE match_id = ? ORDER BY seq DESC LIMIT 1',
+                (match_id,),
+            )
+            .fetchone()
+        )
+
+        return None if row is None or row[0] is None else to_unsigned(row[0])
+
+    def load(self, match_id: str) -> Game:
+        game = super().load(match_id)
+
+        # replaying the log must lead to the state it was logged from
+        zobrist = self.last_zobrist(match_id)
+
+        if zobrist is not None and zobrist != game.zobrist:
+            raise StoreError(f'match {match_id} replay does not match its logged state hash')
+
+        return game
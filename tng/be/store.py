@@ -0,0 +1,309 @@
+"""
+Event sourced match persistence.
+
+A match is stored as its initial game plus the append only log of the
+moves applied since, with a full game snapshot (see tng.game.codec) every
+snapshot_every moves. Loading a match decodes the latest snapshot and
+replays (see TNGFSM.replay) only the moves logged after it.
+
+MatchStore implements the policy, subclasses the storage primitives
+(see FileMatchStore).
+"""
+
+import asyncio
+import os
+import re
+
+from abc import ABC, abstractmethod
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+from tng.game.codec import decode, encode
+from tng.game.fsm import TNGFSM
+from tng.game.game import Game
+from tng.game.moves import Move, decode_move_lines
+
+# ASCII, for the archive records (see archive.encode_record) and the
+# export ids, short enough for a file name with a suffix
+match_id_re = re.compile(r'[\w-]{1,128}', re.ASCII)
+
+
+class StoreError(Exception):
+    pass
+
+
+class MatchNotFound(StoreError):
+    pass
+
+
+class MatchStore(ABC):
+    def __init__(self, fsm: TNGFSM | None = None, snapshot_every: int = 50) -> None:
+        if snapshot_every < 1:
+            raise ValueError(f'invalid snapshot_every: {snapshot_every}')
+
+        self.fsm = fsm if fsm is not None else TNGFSM()
+        self.snapshot_every = snapshot_every
+
+    def create(self, match_id: str, game: Game) -> None:
+        check_match_id(match_id)
+
+        if self.exists(match_id):
+            raise StoreError(f'match already exists: {match_id}')
+
+        self.write_snapshot(match_id, 0, encode(game))
+
+    def append(self, match_id: str, move: Move, game: Game) -> int:
+        """
+        Logs move, game being the state it produced.
+        Returns the number of moves logged so far.
+        """
+
+        count = self.append_moves(match_id, [move.model_dump_json().encode()])
+
+        if count % self.snapshot_every == 0:
+            self.write_snapshot(match_id, count, encode(game))
+
+        return count
+
+    async def append_async(self, match_id: str, move: Move, game: Game) -> int:
+        """
+        append, for the event loop: in a thread unless overridden.
+        """
+
+        return await asyncio.to_thread(self.append, match_id, move, game)
+
+    def load(self, match_id: str) -> Game:
+        count, data = self.latest_snapshot(match_id)
+
+        # logged moves have been validated when played
+        return self.fsm.replay(decode(data), self.moves(match_id, count))
+
+    def moves(self, match_id: str, start: int = 0) -> Iterator[Move]:
+        """
+        Logged moves, from the start-th one.
+        """
+
+        return decode_move_lines(self.read_moves(match_id, start))
+
+    def forget(self, match_id: str) -> None:
+        """
+        Drops what is cached about match_id: another process is about to
+        write it.
+        """
+
+    def close(self) -> None:
+        pass
+
+    # storage
+
+    @abstractmethod
+    def exists(self, match_id: str) -> bool:
+        pass
+
+    @abstractmethod
+    def delete(self, match_id: str) -> None:
+        pass
+
+    @abstractmethod
+    def count(self, match_id: str) -> int:
+        """
+        Number of moves logged.
+        """
+
+    @abstractmethod
+    def append_moves(self, match_id: str, lines: Iterable[bytes]) -> int:
+        """
+        Durably appends JSON encoded moves to the log, returns the log length.
+        """
+
+    @abstractmethod
+    def read_moves(self, match_id: str, start: int) -> Iterator[bytes]:
+        pass
+
+    @abstractmethod
+    def write_snapshot(self, match_id: str, count: int, data: bytes) -> None:
+        """
+        Stores the encoded game after count moves.
+        """
+
+    @abstractmethod
+    def latest_snapshot(self, match_id: str) -> tuple[int, bytes]:
+        """
+        Moves count and encoded game of the most recent snapshot.
+        """
+
+
+def check_match_id(match_id: str) -> None:
+    # match ids end up in file names and keys
+    if not match_id_re.fullmatch(match_id):
+        raise ValueError(f'invalid match id: {match_id!r}')
+
+
+class FileMatchStore(MatchStore):
+    """
+    One directory per match under root:
+     * moves.jsonl: the log, one JSON move per line
+     * <count>.snapshot: encoded game after count moves
+
+    Appends are flushed (and fsynced, unless fsync is False) before
+    returning, snapshots are written to a temporary file then renamed,
+    the directory fsynced after the rename or a file creation: a crash
+    loses at most the move being written. A torn last line is dropped
+    when the match is next used.
+    """
+
+    log_name = 'moves.jsonl'
+    snapshot_suffix = '.snapshot'
+
+    def __init__(
+        self,
+        root: str | os.PathLike,
+        fsm: TNGFSM | None = None,
+        snapshot_every: int = 50,
+        fsync: bool = True,
+    ) -> None:
+        super().__init__(fsm, snapshot_every)
+
+        self.root = Path(root)
+        self.fsync = fsync
+
+        # match id -> log length, for the matches used so far
+        self.counts: dict[str, int] = {}
+
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def match_dir(self, match_id: str) -> Path:
+        check_match_id(match_id)
+
+        return self.root / match_id
+
+    def existing_match_dir(self, match_id: str) -> Path:
+        path = self.match_dir(match_id)
+
+        if not path.is_dir():
+            raise MatchNotFound(match_id)
+
+        return path
+
+    def exists(self, match_id: str) -> bool:
+        return self.match_dir(match_id).is_dir()
+
+    def delete(self, match_id: str) -> None:
+        path = self.existing_match_dir(match_id)
+
+        for f in path.iterdir():
+            f.unlink()
+
+        path.rmdir()
+        self.counts.pop(match_id, None)
+
+    def count(self, match_id: str) -> int:
+        count = self.counts.get(match_id)
+
+        if count is None:
+            count = self.counts[match_id] = self.recover_log(match_id)
+
+        return count
+
+    def forget(self, match_id: str) -> None:
+        self.counts.pop(match_id, None)
+
+    def recover_log(self, match_id: str) -> int:
+        """
+        Truncates a torn last line, if any, and returns the log length.
+        """
+
+        log = self.existing_match_dir(match_id) / self.log_name
+
+        if not log.exists():
+            return 0
+
+        data = log.read_bytes()
+        end = data.rfind(b'\n') + 1
+
+        if end != len(data):
+            with open(log, 'r+b') as f:
+                f.truncate(end)
+
+        return data.count(b'\n', 0, end)
+
+    def append_moves(self, match_id: str, lines: Iterable[bytes]) -> int:
+        count = self.count(match_id)
+        data = b''.join(line + b'\n' for line in lines)
+        path = self.existing_match_dir(match_id)
+
+        with open(path / self.log_name, 'ab') as f:
+            f.write(data)
+            f.flush()
+
+            if self.fsync:
+                os.fsync(f.fileno())
+
+        # the first append creates the log
+        if count == 0:
+            self.fsync_dir(path)
+
+        count = self.counts[match_id] = count + data.count(b'\n')
+
+        return count
+
+    def read_moves(self, match_id: str, start: int) -> Iterator[bytes]:
+        count = self.count(match_id)
+
+        if start >= count:
+            return iter(())
+
+        data = (self.existing_match_dir(match_id) / self.log_name).read_bytes()
+
+        return iter(data.split(b'\n', count)[start:count])
+
+    def fsync_dir(self, path: Path) -> None:
+        """
+        Makes the entries created or renamed in path durable.
+        """
+
+        if not self.fsync:
+            return
+
+        fd = os.open(path, os.O_RDONLY)
+
+        try:
+            os.fsync(fd)
+
+        finally:
+            os.close(fd)
+
+    def write_snapshot(self, match_id: str, count: int, data: bytes) -> None:
+        path = self.match_dir(match_id)
+
+        if not path.is_dir():
+            path.mkdir()
+            self.fsync_dir(self.root)
+
+        final = path / f'{count:010}{self.snapshot_suffix}'
+        tmp = final.with_suffix('.tmp')
+
+        with open(tmp, 'wb') as f:
+            f.write(data)
+            f.flush()
+
+            if self.fsync:
+                os.fsync(f.fileno())
+
+        tmp.replace(final)
+        self.fsync_dir(path)
+
+    def latest_snapshot(self, match_id: str) -> tuple[int, bytes]:
+        path = self.existing_match_dir(match_id)
+        count = self.count(match_id)
+
+        snapshots = sorted(
+            c
+            for f in path.glob(f'*{self.snapshot_suffix}')
+            if (c := int(f.name.removesuffix(self.snapshot_suffix))) <= count
+        )
+
+        if not snapshots:
+            raise StoreError(f'no snapshot of match {match_id}')
+
+        return snapshots[-1], (path / f'{snapshots[-1]:010}{self.snapshot_suffix}').read_bytes()
@@ -0,0 +1,375 @@
+"""
+Compact binary Game snapshots.
+
+encode packs a Game in about a hundred bytes, decode rebuilds it.
+Layout (version 1), all integers unsigned, multi byte ones big endian:
+
+    version           1 byte
+    board class       1 byte, 0 Board, 1 BitBoard
+    edge length       1 byte
+    cells             1 byte each: tile code (0 no tile, else tile index + 1)
+                      in the low nibble, orientation in bits 4-5
+    occupied cells    1 byte count, then per cell: index, players count,
+                      player color indexes (arrival order)
+    tile holder       2 bytes length, then tile indexes, two per byte
+    draw index        2 bytes
+    players           1 byte count, then 3 bytes each:
+                      color index (bits 0-2), has key (3), has light (4),
+                      falling (5), fall direction (6-7, 0 none, 1 row, 2 column);
+                      nerves; position index (0xff none)
+    turn              1 byte
+    phases            1 byte count, then phase indexes
+    last placed tile  2 bytes, x and y
+    decisions         1 byte count (0xff None), then color and move type indexes
+    lit               one bit per cell
+
+Enum codes are the enum declaration order: adding a member in the middle
+of Tile, Phase, PlayerColor or MoveType needs a new version.
+
+encode_moves packs moves in 2 bytes each, decode_moves unpacks them:
+
+    player, type      1 byte: color index (bits 0-2), move type index (3-6)
+    argument          1 byte, by move type:
+                      place_tile, discard_tile: position, x | y << 4 (0xff none)
+                      rotate_tile, crawl: direction index
+                      fall: fall direction code (1 row, 2 column)
+                      land: place
+                      optional_movement, block: 0 or 1
+                      pass_key: color index
+                      stay, move_again: 0
+"""
+
+from collections.abc import Callable, Iterable
+
+from itertools import batched
+
+from .game import BitBoard, Board, Cell, CellStore, Decision, Game, Phase, Player
+from .moves import (
+    Block,
+    Crawl,
+    DiscardTile,
+    Fall,
+    Land,
+    Move,
+    MoveAgain,
+    MoveType,
+    OptionalMovement,
+    PassKey,
+    PlaceTile,
+    RotateTile,
+    Stay,
+    trusted,
+    trusted_move,
+)
+from .types import (
+    FallDirection,
+    Position,
+    Tile,
+    all_colors,
+    all_directions,
+    all_tiles,
+    color_index,
+    direction_index,
+    tile_index,
+)
+
+VERSION = 1
+
+NO_POS = 0xFF
+NO_DECISIONS = 0xFF
+
+all_phases = list(Phase)
+phase_index = {p: idx for idx, p in enumerate(all_phases)}
+
+all_move_types = list(MoveType)
+move_type_index = {m: idx for idx, m in enumerate(all_move_types)}
+
+fall_direction_code = {None: 0, FallDirection.row: 1, FallDirection.column: 2}
+fall_direction_by_code = {code: fd for fd, code in fall_direction_code.items()}
+
+
+# unoccupied cells are immutable values: decoded boards share them
+empty_cells = {
+    code: Cell(
+        tile=None if code & 0xF == 0 else all_tiles[(code & 0xF) - 1],
+        direction=all_directions[code >> 4],
+        players=[],
+    )
+    for code in range(len(all_directions) << 4)
+    if code & 0xF <= len(all_tiles)
+}
+
+
+class CodecError(ValueError):
+    pass
+
+
+class Reader:
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        self.at = 0
+
+    def byte(self) -> int:
+        b = self.data[self.at]
+        self.at += 1
+
+        return b
+
+    def take(self, size: int) -> bytes:
+        start = self.at
+        end = self.at = start + size
+
+        if end > len(self.data):
+            raise CodecError('truncated snapshot')
+
+        return self.data[start:end]
+
+
+def encode(game: Game) -> bytes:
+    board = game.board
+    n = board.edge_length
+    out = bytearray([VERSION, 1 if isinstance(board, BitBoard) else 0, n])
+
+    occupied: list[tuple[int, Cell]] = []
+
+    for idx, cell in enumerate(board.cells):
+        code = 0 if cell.tile is None else tile_index[cell.tile] + 1
+
+        out.append(code | direction_index[cell.direction] << 4)
+
+        if cell.players:
+            occupied.append((idx, cell))
+
+    out.append(len(occupied))
+
+    for idx, cell in occupied:
+        out.append(idx)
+        out.append(len(cell.players))
+        out.extend(color_index[c] for c in cell.players)
+
+    out.extend(encode_tile_holder(game.tile_holder))
+
+    out.extend(game.draw_index.to_bytes(2))
+
+    out.append(len(game.players))
+
+    for p in game.players:
+        out.append(
+            color_index[p.color]
+            | p.has_key << 3
+            | p.has_light << 4
+            | p.falling << 5
+            | fall_direction_code[p.fall_direction] << 6
+        )
+        out.append(p.nerves)
+        out.append(NO_POS if p.pos is None else p.pos.idx(n))
+
+    out.append(game.turn)
+
+    out.append(len(game.phases))
+    out.extend(phase_index[p] for p in game.phases)
+
+    out.append(game.last_placed_tile_pos.x)
+    out.append(game.last_placed_tile_pos.y)
+
+    if game.decisions is None:
+        out.append(NO_DECISIONS)
+
+    else:
+        out.append(len(game.decisions))
+
+        for d in game.decisions:
+            out.append(color_index[d.player])
+            out.append(move_type_index[d.action])
+
+    out.extend(game.lit.to_bytes(lit_size(n)))
+
+    return bytes(out)
+
+
+def encode_tile_holder(tile_holder: list[Tile]) -> bytes:
+    codes = [tile_index[t] for t in tile_holder] + [0]
+
+    return len(tile_holder).to_bytes(2) + bytes(
+        codes[i] | codes[i + 1] << 4 for i in range(0, len(tile_holder), 2)
+    )
+
+
+def decode_tile_holder(r: Reader) -> list[Tile]:
+    size = int.from_bytes(r.take(2))
+
+    return [all_tiles[code] for b in r.take((size + 1) // 2) for code in (b & 0xF, b >> 4)][:size]
+
+
+def decode(data: bytes) -> Game:
+    try:
+        return _decode(Reader(data))
+
+    except (IndexError, KeyError) as e:
+        raise CodecError(f'corrupted game snapshot: {e!r}') from e
+
+
+def _decode(r: Reader) -> Game:
+    version = r.byte()
+
+    if version != VERSION:
+        raise CodecError(f'unsupported snapshot version {version}')
+
+    board_class = r.byte()
+    n = r.byte()
+    cells = [empty_cells[code] for code in r.take(n * n)]
+
+    for _ in range(r.byte()):
+        idx = r.byte()
+        cell = cells[idx]
+
+        cells[idx] = cell._replace(players=[all_colors[c] for c in r.take(r.byte())])
+
+    board: Board | BitBoard = Board(cells=CellStore.from_cells(cells, n), edge_length=n)
+
+    if board_class == 1:
+        board = BitBoard.from_board(board)
+
+    tile_holder = decode_tile_holder(r)
+
+    draw_index = int.from_bytes(r.take(2))
+
+    players = []
+
+    for _ in range(r.byte()):
+        flags, nerves, pos = r.take(3)
+
+        players.append(
+            Player(
+                color=all_colors[flags & 7],
+                has_key=bool(flags >> 3 & 1),
+                nerves=nerves,
+                has_light=bool(flags >> 4 & 1),
+                falling=bool(flags >> 5 & 1),
+                pos=None if pos == NO_POS else Position(pos % n, pos // n),
+                fall_direction=fall_direction_by_code[flags >> 6],
+            )
+        )
+
+    turn = r.byte()
+
+    phases = [all_phases[p] for p in r.take(r.byte())]
+
+    last_placed_tile_pos = Position(r.byte(), r.byte())
+
+    decisions: list[Decision] | None = None
+    decision_count = r.byte()
+
+    if decision_count != NO_DECISIONS:
+        decisions = [
+            Decision(all_colors[c], all_move_types[m])
+            for c, m in batched(r.take(2 * decision_count), 2)
+        ]
+
+    lit = int.from_bytes(r.take(lit_size(n)))
+
+    if r.at != len(r.data):
+        raise CodecError(f'unexpected snapshot length: {len(r.data)}, expected {r.at}')
+
+    return Game(
+        board=board,
+        tile_holder=tile_holder,
+        draw_index=draw_index,
+        players=players,
+        turn=turn,
+        phases=phases,
+        last_placed_tile_pos=last_placed_tile_pos,
+        decisions=decisions,
+        player_index={p.color: idx for idx, p in enumerate(players)},
+        lit=lit,
+    ).rehash()
+
+
+def lit_size(edge_length: int) -> int:
+    return (edge_length * edge_length + 7) // 8
+
+
+def pos_code(pos: Position | None) -> int:
+    return NO_POS if pos is None else pos.x | pos.y << 4
+
+
+def code_pos(code: int) -> Position | None:
+    return None if code == NO_POS else Position(code & 0xF, code >> 4)
+
+
+def move_arg(move: Move) -> int:
+    param = move.param
+
+    match param.move:
+        case MoveType.place_tile | MoveType.discard_tile:
+            return pos_code(param.pos)
+        case MoveType.rotate_tile | MoveType.crawl:
+            return direction_index[param.direction]
+        case MoveType.fall:
+            return fall_direction_code[param.direction]
+        case MoveType.land:
+            if not 0 <= param.place < 0x100:
+                raise CodecError(f'land place out of range: {param.place}')
+
+            return param.place
+        case MoveType.optional_movement:
+            return int(param.move_again)
+        case MoveType.block:
+            return int(param.block)
+        case MoveType.pass_key:
+            return color_index[param.player]
+
+    return 0
+
+
+def encode_moves(moves: Iterable[Move]) -> bytes:
+    out = bytearray()
+
+    for move in moves:
+        out.append(color_index[move.player] | move_type_index[move.param.move] << 3)
+        out.append(move_arg(move))
+
+    return bytes(out)
+
+
+# move type index -> param from the argument byte
+param_decoders: list[Callable[[int], object]] = [
+    {
+        MoveType.place_tile: lambda a: trusted(
+            PlaceTile, move=MoveType.place_tile, pos=code_pos(a)
+        ),
+        MoveType.rotate_tile: lambda a: trusted(
+            RotateTile, move=MoveType.rotate_tile, direction=all_directions[a]
+        ),
+        MoveType.stay: lambda a: trusted(Stay, move=MoveType.stay),
+        MoveType.crawl: lambda a: trusted(Crawl, move=MoveType.crawl, direction=all_directions[a]),
+        MoveType.optional_movement: lambda a: trusted(
+            OptionalMovement, move=MoveType.optional_movement, move_again=bool(a)
+        ),
+        MoveType.fall: lambda a: trusted(
+            Fall, move=MoveType.fall, direction=fall_direction_by_code[a]
+        ),
+        MoveType.land: lambda a: trusted(Land, move=MoveType.land, place=a),
+        MoveType.discard_tile: lambda a: trusted(
+            DiscardTile, move=MoveType.discard_tile, pos=code_pos(a)
+        ),
+        MoveType.pass_key: lambda a: trusted(PassKey, move=MoveType.pass_key, player=all_colors[a]),
+        MoveType.block: lambda a: trusted(Block, move=MoveType.block, block=bool(a)),
+        MoveType.move_again: lambda a: trusted(MoveAgain, move=MoveType.move_again),
+    }[m]
+    for m in all_move_types
+]
+
+
+def decode_moves(data: bytes) -> list[Move]:
+    if len(data) % 2:
+        raise CodecError(f'odd moves length: {len(data)}')
+
+    try:
+        return [
+            trusted_move(all_colors[head & 7], param_decoders[head >> 3](arg))
+            for head, arg in batched(data, 2)
+        ]
+
+    except (IndexError, KeyError) as e:
+        raise CodecError(f'corrupted moves: {e!r}') from e
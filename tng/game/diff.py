@@ -0,0 +1,211 @@
+"""
+Game deltas, to send clients just what a move changed.
+
+diff compares two games, usually before and after a move, returning a
+GamePatch; apply_patch rebuilds the second game from the first one and
+the patch.
+
+Games share whatever a move doesn't touch (board rows, players, lists),
+so diff compares by identity first and looks into changed parts only.
+
+Patches (de)serialize to compact JSON with encode_patch/decode_patch.
+"""
+
+from typing import Any, NamedTuple
+
+from pydantic import TypeAdapter
+
+from .game import BitBoard, Board, Cell, Decision, Game, GameRuntimeError, Phase, Player
+from .geometry import mask_indexes
+from .types import Position
+
+
+class ListDelta[T](NamedTuple):
+    # new list: the first keep items of the old one, followed by tail
+    keep: int
+    # None when the list itself becomes None (Game.decisions only)
+    tail: list[T] | None
+
+
+class GamePatch(NamedTuple):
+    cells: dict[int, Cell]  # cell index -> new cell
+    players: dict[int, dict[str, Any]]  # player index -> changed fields
+    draw_index: int | None  # None when unchanged, as below
+    turn: int | None
+    phases: ListDelta[Phase] | None
+    last_placed_tile_pos: Position | None
+    decisions: ListDelta[Decision] | None
+    lit: int | None
+
+    zobrist: int  # of the new game
+
+
+def diff(old: Game, new: Game) -> GamePatch:
+    """
+    The patch turning old into new, two states of the same match.
+    """
+
+    if (
+        old.board.edge_length != new.board.edge_length
+        or old.players is not new.players
+        and [p.color for p in old.players] != [p.color for p in new.players]
+    ):
+        raise GameRuntimeError('not the same match')
+
+    return GamePatch(
+        cells=diff_cells(old.board, new.board),
+        players=diff_players(old.players, new.players),
+        draw_index=changed(old.draw_index, new.draw_index),
+        turn=changed(old.turn, new.turn),
+        phases=diff_list(old.phases, new.phases),
+        last_placed_tile_pos=changed(old.last_placed_tile_pos, new.last_placed_tile_pos),
+        decisions=diff_list(old.decisions, new.decisions),
+        lit=changed(old.lit, new.lit),
+        zobrist=new.zobrist,
+    )
+
+
+def apply_patch(game: Game, patch: GamePatch) -> Game:
+    board = game.board.set_cells(patch.cells.items()) if patch.cells else game.board
+    players = game.players
+
+    if patch.players:
+        players = list(players)
+
+        for idx, fields in patch.players.items():
+            players[idx] = players[idx]._replace(**fields)
+
+    return game._replace(
+        board=board,
+        players=players,
+        draw_index=game.draw_index if patch.draw_index is None else patch.draw_index,
+        turn=game.turn if patch.turn is None else patch.turn,
+        phases=patch_list(game.phases, patch.phases),
+        last_placed_tile_pos=(
+            game.last_placed_tile_pos
+            if patch.last_placed_tile_pos is None
+            else patch.last_placed_tile_pos
+        ),
+        decisions=patch_list(game.decisions, patch.decisions),
+        lit=game.lit if patch.lit is None else patch.lit,
+        zobrist=patch.zobrist,
+    )
+
+
+def changed[T](old: T, new: T) -> T | None:
+    return None if old == new else new
+
+
+def diff_cells(old: Board | BitBoard, new: Board | BitBoard) -> dict[int, Cell]:
+    if old is new:
+        return {}
+
+    if isinstance(old, BitBoard) and isinstance(new, BitBoard):
+        changed_mask = 0
+
+        for masks in ('tiles', 'directions', 'players'):
+            for mo, mn in zip(getattr(old, masks), getattr(new, masks)):
+                changed_mask |= mo ^ mn
+
+        return {idx: new.at_idx(idx) for idx in mask_indexes(changed_mask)}
+
+    if isinstance(old, Board) and isinstance(new, Board):
+        n = old.edge_length
+        cells: dict[int, Cell] = {}
+
+        for y, (old_row, new_row) in enumerate(zip(old.cells.rows, new.cells.rows)):
+            if old_row is new_row:
+                continue
+
+            for x, (old_cell, new_cell) in enumerate(zip(old_row, new_row)):
+                if old_cell is not new_cell and old_cell != new_cell:
+                    cells[y * n + x] = new_cell
+
+        return cells
+
+    return {idx: c for idx, (o, c) in enumerate(zip(old.cells, new.cells)) if o != c}
+
+
+def diff_players(old: list[Player], new: list[Player]) -> dict[int, dict[str, Any]]:
+    if old is new:
+        return {}
+
+    players: dict[int, dict[str, Any]] = {}
+
+    for idx, (old_player, new_player) in enumerate(zip(old, new)):
+        if old_player is new_player:
+            continue
+
+        fields = {
+            name: value
+            for name, old_value, value in zip(Player._fields, old_player, new_player)
+            if old_value != value
+        }
+
+        if fields:
+            players[idx] = fields
+
+    return players
+
+
+def diff_list[T](old: list[T] | None, new: list[T] | None) -> ListDelta[T] | None:
+    if old is new:
+        return None
+
+    if new is None:
+        return ListDelta(0, None)
+
+    if old is None:
+        return ListDelta(0, list(new))
+
+    keep = 0
+
+    for o, n in zip(old, new):
+        if o != n:
+            break
+
+        keep += 1
+
+    if keep == len(old) == len(new):
+        return None
+
+    return ListDelta(keep, new[keep:])
+
+
+def patch_list[T](old: list[T] | None, delta: ListDelta[T] | None) -> list[T] | None:
+    if delta is None:
+        return old
+
+    if delta.tail is None:
+        return None
+
+    keep = delta.keep
+
+    return ([] if old is None else old[:keep]) + delta.tail
+
+
+patch_adapter = TypeAdapter(GamePatch)
+
+# changed player fields are deserialized as plain JSON values: the field
+# adapters convert them back
+player_field_adapters = {
+    name: TypeAdapter(annotation) for name, annotation in Player.__annotations__.items()
+}
+
+
+def encode_patch(patch: GamePatch) -> bytes:
+    return patch_adapter.dump_json(patch)
+
+
+def decode_patch(data: str | bytes) -> GamePatch:
+    patch = patch_adapter.validate_json(data)
+
+    return patch._replace(
+        players={
+            idx: {
+                name: player_field_adapters[name].validate_python(value)
+                for name, value in fields.items()
+            }
+            for idx, fields in patch.players.items()
+        }
+    )
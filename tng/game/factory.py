@@ -1,7 +1,7 @@
 from random import Random
 
-from .types import Tile, PlayerColor, Direction, Position
-from .game import Game, Board, Cell, Player, Phase
+from .types import Tile, PlayerColor, Position
+from .game import Game, Board, BitBoard, Player, Phase
 
 
 class GameFactory:
@@ -35,8 +35,11 @@ class GameFactory:
         Tile.straight_passage: 10 - standard_deck_up_to_four_players_opening[Tile.straight_passage],
     }
 
-    def __init__(self, random: Random | None = None) -> None:
+    def __init__(
+        self, random: Random | None = None, board_class: type[Board] | type[BitBoard] = Board
+    ) -> None:
         self.random = random if random is not None else Random()
+        self.board_class = board_class
 
     def build_cards(self, specs: dict[Tile, int]) -> list[Tile]:
         return [v for t, x in specs.items() for v in [t] * x]
@@ -50,7 +53,12 @@ class GameFactory:
 
         return deck_initial + deck_remaining
 
-    def new_game(self, *colors: PlayerColor) -> Game:
+    def new_game(self, *colors: PlayerColor, deck: list[Tile] | None = None) -> Game:
+        """
+        A new game for colors, in turn order. The deck is shuffled unless
+        given, eg. to rebuild an archived match.
+        """
+
         if not colors:
             raise ValueError("no players")
 
@@ -74,14 +82,8 @@ class GameFactory:
             remaining = self.standard_deck_up_to_four_players
 
         g = Game(
-            board=Board(
-                cells=[
-                    Cell(tile=None, direction=Direction.n, players=[])
-                    for _ in range(edge_length * edge_length)
-                ],
-                edge_length=edge_length,
-            ),
-            tile_holder=self.build_deck(initial, remaining),
+            board=self.board_class.empty(edge_length),
+            tile_holder=self.build_deck(initial, remaining) if deck is None else list(deck),
             draw_index=0,
             players=[
                 Player(
@@ -99,6 +101,7 @@ class GameFactory:
             phases=[Phase.place_start],
             last_placed_tile_pos=Position(0, 0),
             decisions=[],
+            player_index={color: idx for idx, color in enumerate(colors)},
         )
 
-        return g
+        return g.rehash()
@@ -6,9 +6,11 @@ It:
 2. executes that move returning the resulting game state.
 """
 
-from typing import override
+from collections.abc import Iterable, Iterator
+from time import perf_counter
+from typing import Any, Callable, NamedTuple, override
 
-from .game import Cell, Game, Phase, GameRuntimeError, Player, Decision
+from .game import Cell, Game, GameEdit, Phase, GameRuntimeError, Player, Decision
 from .moves import (
     Move,
     PlaceTile,
@@ -23,76 +25,109 @@ from .moves import (
     MoveAgain,
     DiscardTile,
     MoveType,
+    trusted,
+    trusted_move,
+)
+from .types import (
+    PlayerColor,
+    Tile,
+    Direction,
+    is_monster,
+    FallDirection,
+    Position,
+    is_crumbling,
+    direction_bit,
+    all_directions,
 )
-from .types import PlayerColor, Tile, Direction, is_monster, FallDirection, Position, is_crumbling
 from .monsters import AttackingMonsters
+from .latency import LatencyCollector
 from .exc import IllegalMove
 
 
 # TODO: check that game has ended
 
 
-class SubphaseComplete(Exception):
-    def __init__(self, game: Game) -> None:
-        super().__init__()
+class SubphaseComplete(NamedTuple):
+    """
+    Returned by a handler (instead of the new game) when the running sub
+    phase is over: TNGFSM pops it and lets the parent phase continue.
+    """
+
+    game: Game
+
+
+type Outcome = Game | SubphaseComplete
 
-        self.game = game
+
+def raise_illegal(reason: str | None) -> None:
+    if reason is not None:
+        raise IllegalMove(reason)
 
 
 class PhaseLogic:
-    def place_tile(self, game: Game, player: PlayerColor, move: PlaceTile) -> Game:
+    """
+    Each accepted move has a handler, named after the move type, and
+    a check_<move type> method. The check validates the move without
+    applying it, returning the reason it is illegal (or None): it is
+    run by TNGFSM.apply before the handler and by TNGFSM.legal_moves.
+    Handlers assume the move has passed the check.
+    """
+
+    def place_tile(self, game: Game, player: PlayerColor, move: PlaceTile) -> Outcome:
         raise IllegalMove(f'illegal move {move} in phase {game.current_phase}')
 
-    def rotate_tile(self, game: Game, player: PlayerColor, move: RotateTile) -> Game:
+    def rotate_tile(self, game: Game, player: PlayerColor, move: RotateTile) -> Outcome:
         raise IllegalMove(f'illegal move {move} in phase {game.current_phase}')
 
-    def stay(self, game: Game, player: PlayerColor, move: Stay) -> Game:
+    def stay(self, game: Game, player: PlayerColor, move: Stay) -> Outcome:
         raise IllegalMove(f'illegal move {move} in phase {game.current_phase}')
 
-    def crawl(self, game: Game, player: PlayerColor, move: Crawl) -> Game:
+    def crawl(self, game: Game, player: PlayerColor, move: Crawl) -> Outcome:
         raise IllegalMove(f'illegal move {move} in phase {game.current_phase}')
 
-    def optional_movement(self, game: Game, player: PlayerColor, move: OptionalMovement) -> Game:
+    def optional_movement(self, game: Game, player: PlayerColor, move: OptionalMovement) -> Outcome:
         raise IllegalMove(f'illegal move {move} in phase {game.current_phase}')
 
-    def fall(self, game: Game, player: PlayerColor, move: Fall) -> Game:
+    def fall(self, game: Game, player: PlayerColor, move: Fall) -> Outcome:
         raise IllegalMove(f'illegal move {move} in phase {game.current_phase}')
 
-    def land(self, game: Game, player: PlayerColor, move: Land) -> Game:
+    def land(self, game: Game, player: PlayerColor, move: Land) -> Outcome:
         raise IllegalMove(f'illegal move {move} in phase {game.current_phase}')
 
-    def pass_key(self, game: Game, player: PlayerColor, move: PassKey) -> Game:
+    def pass_key(self, game: Game, player: PlayerColor, move: PassKey) -> Outcome:
         raise IllegalMove(f'illegal move {move} in phase {game.current_phase}')
 
-    def discard_tile(self, game: Game, player: PlayerColor, move: DiscardTile) -> Game:
+    def discard_tile(self, game: Game, player: PlayerColor, move: DiscardTile) -> Outcome:
         raise IllegalMove(f'illegal move {move} in phase {game.current_phase}')
 
-    def block(self, game: Game, player: PlayerColor, move: Block) -> Game:
+    def block(self, game: Game, player: PlayerColor, move: Block) -> Outcome:
         raise IllegalMove(f'illegal move {move} in phase {game.current_phase}')
 
-    def move_again(self, game: Game, player: PlayerColor, move: MoveAgain) -> Game:
+    def move_again(self, game: Game, player: PlayerColor, move: MoveAgain) -> Outcome:
         raise IllegalMove(f'illegal move {move} in phase {game.current_phase}')
 
-    def sub_phase_complete(self, game: Game, player: PlayerColor, move: Move) -> Game:
+    def sub_phase_complete(self, game: Game, player: PlayerColor, move: Move) -> Outcome:
         raise IllegalMove(f'illegal move {move} in phase {game.current_phase}')
 
 
 class PlaceStart(PhaseLogic):
+    def check_place_tile(self, game: Game, player: PlayerColor, move: PlaceTile) -> str | None:
+        return check_place_tile(game, player, move, replace_allowed=False)
+
     @override
     def place_tile(self, game: Game, player: PlayerColor, move: PlaceTile) -> Game:
-        g1 = apply_place_tile(game, player, move, Tile.start, replace_allowed=False)
-        g2 = g1.move_player(g1.turn, move.pos)
+        e = apply_place_tile(game.edit(), move, Tile.start)
 
-        return g2.push_phase(Phase.rotate_placed)
+        return e.place_player(e.turn, move.pos).push_phase(Phase.rotate_placed).commit()
 
     @override
     def sub_phase_complete(self, game: Game, player: PlayerColor, move: Move) -> Game:
         next_player = game.turn + 1
 
         if next_player == len(game.players):
-            return game.set_turn(0).new_phase(Phase.move_player)
+            return game.edit().set_turn(0).new_phase(Phase.move_player).commit()
 
-        return game.set_turn(next_player).new_phase(Phase.place_start)
+        return game.edit().set_turn(next_player).new_phase(Phase.place_start).commit()
 
 
 class RotatePlaced(PhaseLogic):
@@ -101,16 +136,15 @@ class RotatePlaced(PhaseLogic):
     landing after a fall.
     """
 
-    @override
-    def rotate_tile(self, game: Game, player: PlayerColor, move: RotateTile) -> Game:
-        # validate move
-
-        player_status = game.players[game.turn]
+    def check_rotate_tile(self, game: Game, player: PlayerColor, move: RotateTile) -> str | None:
+        if game.players[game.turn].color != player:
+            return 'not player turn'
 
-        if player_status.color != player:
-            raise IllegalMove('not player turn')
+        return None
 
-        # apply
+    @override
+    def rotate_tile(self, game: Game, player: PlayerColor, move: RotateTile) -> Outcome:
+        player_status = game.players[game.turn]
 
         if player_status.pos is None:
             raise GameRuntimeError('player without pos')
@@ -120,48 +154,44 @@ class RotatePlaced(PhaseLogic):
         if cell.tile is None:
             raise GameRuntimeError('player\'s cell has no tile')
 
-        g1 = game.place_tile(player_status.pos, cell.tile, move.direction)
-
-        cells = g1.board.visible_cells_from(player_status.pos)
+        e = game.edit().place_tile(player_status.pos, cell.tile, move.direction)
 
-        if any(cell.tile is None for cell in cells):
-            return g1.new_phase(Phase.discover_tiles)
-
-        raise SubphaseComplete(g1)
+        return next_from_discover_tiles(e, player_status.pos)
 
 
 class DiscoverTiles(PhaseLogic):
-    @override
-    def place_tile(self, game: Game, player: PlayerColor, move: PlaceTile) -> Game:
+    def check_place_tile(self, game: Game, player: PlayerColor, move: PlaceTile) -> str | None:
         if game.final_flickers():
-            raise IllegalMove('final flickers')
+            return 'final flickers'
 
+        return check_place_tile(game, player, move, replace_allowed=False)
+
+    @override
+    def place_tile(self, game: Game, player: PlayerColor, move: PlaceTile) -> Outcome:
         placed_tile = game.tile_holder[game.draw_index]
 
-        g1 = apply_place_tile(game, player, move, placed_tile, replace_allowed=False)
+        e = apply_place_tile(game.edit(), move, placed_tile)
 
-        g2 = g1.draw_tile()
+        e.draw_tile()
 
-        if placed_tile == Tile.t_passage:
-            return g2.new_phase(Phase.rotate_discovered_tile)
+        # as when landing or crawling on a discovered tile
+        if placed_tile in (Tile.t_passage, Tile.straight_passage):
+            return e.new_phase(Phase.rotate_discovered_tile).commit()
 
-        start_pos = g2.players[g2.turn].pos
+        start_pos = e.players[e.turn].pos
 
         if start_pos is None:
             raise GameRuntimeError('current player without pos')
 
-        return next_from_discover_tiles(g2, start_pos)
+        return next_from_discover_tiles(e, start_pos)
 
 
 class RotateDiscoveredTile(PhaseLogic):
-    @override
-    def rotate_tile(self, game: Game, player: PlayerColor, move: RotateTile) -> Game:
-        # validate move
-
+    def check_rotate_tile(self, game: Game, player: PlayerColor, move: RotateTile) -> str | None:
         player_status = game.players[game.turn]
 
         if player_status.color != player:
-            raise IllegalMove('not player turn')
+            return 'not player turn'
 
         if player_status.pos is None:
             raise GameRuntimeError('player without pos')
@@ -171,157 +201,73 @@ class RotateDiscoveredTile(PhaseLogic):
         if last_placed_cell.tile is None:
             raise GameRuntimeError('empty cell')
 
-        new_game = game.place_tile(game.last_placed_tile_pos, last_placed_cell.tile, move.direction)
+        # the rotated tile must lead back to the player
+        rotated_cell = last_placed_cell._replace(direction=move.direction)
 
-        if player_status.pos not in new_game.board.visible_cells_coords_from(
-            new_game.last_placed_tile_pos
+        if all(
+            game.board.dest_coords(game.last_placed_tile_pos, d) != player_status.pos
+            for d in rotated_cell.open_directions()
         ):
-            raise IllegalMove('not_connected')
-
-        # apply
-
-        return next_from_discover_tiles(new_game, player_status.pos)
+            return 'not_connected'
 
-
-class Landing(PhaseLogic):
-    """
-    Landing phase: the player is falling and must land on a tile.
-    See page 10 of the manual for details.
-    """
+        return None
 
     @override
-    def land(self, game: Game, player: PlayerColor, move: Land) -> Game:
+    def rotate_tile(self, game: Game, player: PlayerColor, move: RotateTile) -> Outcome:
         player_status = game.players[game.turn]
 
-        if player_status.color != player:
-            raise IllegalMove('not player turn')
-
-        if not player_status.falling:
-            # this is actually a game runtime error because
-            # we can be on landing phase only if the player is falling
-            raise IllegalMove('non falling player')
-
-        if player_status.fall_direction is None:
-            raise GameRuntimeError('falling player without fall direction')
-
         if player_status.pos is None:
-            raise GameRuntimeError('falling player without position')
-
-        if move.place < 0 or move.place >= game.board.edge_length:
-            raise IllegalMove('out of bounds')
-
-        match player_status.fall_direction:
-            case FallDirection.row:
-                destination = Position(move.place, player_status.pos.y)
-            case FallDirection.column:
-                destination = Position(player_status.pos.x, move.place)
-
-        cell = game.board.at(destination)
-
-        if cell.tile is not None and (
-            any(
-                game.board.at(Position(ccrow, player_status.pos.y)).tile is None
-                for ccrow in range(game.board.edge_length)
-            )
-            if player_status.fall_direction is FallDirection.column
-            else any(
-                game.board.at(Position(player_status.pos.x, cccol)).tile is None
-                for cccol in range(game.board.edge_length)
-            )
-        ):
-            raise IllegalMove('tile not empty')
-
-        if cell.tile is not None:
-            drawn_tile = cell.tile
+            raise GameRuntimeError('player without pos')
 
-            g1 = game.move_player(game.turn, destination)
+        last_placed_cell = game.board.at(game.last_placed_tile_pos)
 
-        elif game.final_flickers():
-            return game.new_phase(Phase.game_lost)
+        if last_placed_cell.tile is None:
+            raise GameRuntimeError('empty cell')
 
-        else:
-            drawn_tile = game.tile_holder[game.draw_index]
+        e = game.edit().place_tile(game.last_placed_tile_pos, last_placed_cell.tile, move.direction)
 
-            g1 = (
-                game.draw_tile()
-                .place_tile(destination, drawn_tile)
-                .move_player(game.turn, destination)
-            )
+        return next_from_discover_tiles(e, player_status.pos)
 
-        if is_monster[drawn_tile]:
-            monsters = AttackingMonsters(g1.board)
 
-            attacked_players_colors = monsters.trigger_monsters(destination)
+class Landing(PhaseLogic):
+    """
+    Landing phase: the player is falling and must land on a tile.
+    See page 10 of the manual for details.
+    """
 
-            g2 = activate_monsters(g1, attacked_players_colors)
+    def check_land(self, game: Game, player: PlayerColor, move: Land) -> str | None:
+        return check_land(game, player, move)
 
-            g3 = g2.add_decision(Decision(player, MoveType.crawl))
+    @override
+    def land(self, game: Game, player: PlayerColor, move: Land) -> Game:
+        return apply_land(game, player, move)
 
-            return g3
+    def check_block(self, game: Game, player: PlayerColor, move: Block) -> str | None:
+        return check_block(game, player, move)
 
-        if drawn_tile in (Tile.t_passage, Tile.straight_passage):
-            # note: there is no constraint that forces the rotation
-            # so that the straight is aligned to an already placed tile
+    def block(self, game: Game, player: PlayerColor, move: Block) -> Game:
+        return block(game, player, move)
 
-            return g1.push_phase(Phase.rotate_discovered_tile)
+    def check_crawl(self, game: Game, player: PlayerColor, move: Crawl) -> str | None:
+        if not game.has_decision(player, MoveType.crawl):
+            return f'decision not found: player={player}'
 
-        if any(cell.tile is None for cell in g1.board.visible_cells_from(destination)):
-            return g1.push_phase(Phase.discover_tiles)
+        player_idx = game.player_idx(player)
 
-        return g1.new_phase(Phase.move_player)
+        if player_idx != game.turn:
+            raise GameRuntimeError('the crawling player should be the moving one')
 
-    def block(self, game: Game, player: PlayerColor, move: Block) -> Game:
-        return block(game, player, move)
+        return check_crawl(game, game.players[player_idx], move.direction)
 
     def crawl(self, game: Game, player: PlayerColor, move: Crawl) -> Game:
         '''
         Landed on monster. This move must be in response of a decision.
         '''
 
-        # validate move
-
-        g1 = game.discard_decision(player, MoveType.crawl)
-
-        player_idx = g1.player_idx(player)
-
-        if player_idx != g1.turn:
-            raise GameRuntimeError('the crawling player should be the moving one')
-
-        player_status = g1.players[player_idx]
-
-        if player_status.pos is None:
-            raise GameRuntimeError('player without pos')
-
-        player_cell = g1.board.at(player_status.pos)
-
-        if player_cell.tile is None:
-            raise GameRuntimeError('player\'s cell has no tile')
-
-        if move.direction not in player_cell.open_directions():
-            raise IllegalMove('illegal direction')
-
-        dest_pos = g1.board.dest_coords(player_status.pos, move.direction)
-
-        dest_cell = g1.board.at(dest_pos)
-
-        if dest_cell.tile is None:
-            if player_status.has_light:
-                raise GameRuntimeError('empty tile that shouldn\'t')
+        # the landing is over: the crawl ends as any other
+        e = game.edit().discard_decision(player, MoveType.crawl).new_phase(Phase.move_player)
 
-            if g1.final_flickers():
-                if any(
-                    cell.tile is not None for cell in g1.board.visible_cells_from(player_status.pos)
-                ):
-                    raise IllegalMove('empty dest tile')
-
-                return g1.new_phase(Phase.game_lost)
-
-        elif len(dest_cell.players) > 0 and dest_cell.tile is not Tile.gate:
-            raise IllegalMove('dest tile already occupied')
-
-        # apply
-
-        return apply_crawl(g1, dest_pos, player_cell, dest_cell)
+        return apply_crawl(e, e.players[e.turn], move.direction)
 
     def sub_phase_complete(self, game: Game, player: PlayerColor, move: Move) -> Game:
         """
@@ -338,108 +284,104 @@ class Landing(PhaseLogic):
         if player_status.pos is None:
             raise GameRuntimeError('player without pos')
 
-        if any(cell.tile is None for cell in game.board.visible_cells_from(player_status.pos)):
+        if (
+            any(cell.tile is None for cell in game.board.visible_cells_from(player_status.pos))
+            and not game.final_flickers()
+        ):
             return game.push_phase(Phase.discover_tiles)
 
         return game.new_phase(Phase.move_player)
 
 
 class MovePlayer(PhaseLogic):
-    def stay(self, game: Game, player: PlayerColor, move: Stay) -> Game:
+    def check_stay(self, game: Game, player: PlayerColor, move: Stay) -> str | None:
         player_status = game.players[game.turn]
 
         if player_status.color != player:
-            raise IllegalMove('not player turn')
+            return 'not player turn'
 
-        if player_status.falling:
-            raise IllegalMove('falling player')
+        if game.has_decision(player, MoveType.optional_movement):
+            return 'optional movement to decide first'
 
-        if not player_status.has_light and player_status.nerves == 0:
-            raise IllegalMove('no nerves, forced to crawl')
+        if game.decisions:
+            return 'decisions pending'
 
-        # apply
+        if player_status.falling:
+            return 'falling player'
 
-        if not player_status.has_light:
-            g1 = game.change_nerves(game.turn, -1)
+        if not player_status.has_light and player_status.nerves == 0:
+            return 'no nerves, forced to crawl'
 
-        elif player_status.nerves < 2:
-            g1 = game.change_nerves(game.turn, +1)
+        if game.final_flickers():
+            return 'no tile left to draw'
 
-        else:
-            g1 = game
+        return None
 
-        drawn_tile = g1.tile_holder[g1.draw_index]
+    def stay(self, game: Game, player: PlayerColor, move: Stay) -> Game:
+        player_status = game.players[game.turn]
 
-        g2 = g1.draw_tile()
+        # apply
 
-        if is_monster[drawn_tile]:
-            return g2.push_phase(Phase.place_monster)
+        e = game.edit()
 
-        g3, fallen = check_falling(g2, player_status)
+        if not player_status.has_light:
+            e.change_nerves(game.turn, -1)
 
-        if g3.players[g3.turn].nerves > 0:
-            return g3.add_decision(Decision(player, MoveType.optional_movement))
+        elif player_status.nerves < 2:
+            e.change_nerves(game.turn, +1)
 
-        if g3.final_flickers():
-            if fallen:
-                # TODO: detect game lost if both column and row have empty tiles
-                return g3.push_phase(Phase.falling)
+        drawn_tile = e.tile_holder[e.draw_index]
 
-            else:
-                return g3.new_phase(Phase.final_flickers)
+        e.draw_tile()
 
-        return g3.set_turn(turn=(game.turn + 1) % len(game.players))
+        if is_monster[drawn_tile]:
+            return e.push_phase(Phase.place_monster).commit()
 
-    def crawl(self, game: Game, player: PlayerColor, move: Crawl) -> Game:
-        # validate move
+        return end_stay(e)
 
+    def check_crawl(self, game: Game, player: PlayerColor, move: Crawl) -> str | None:
         # TODO: check if crawl'ed on monster in lights out move in response to a Decision
 
         player_status = game.players[game.turn]
 
         if player_status.color != player:
-            raise IllegalMove('not player turn')
-
-        if player_status.falling:
-            raise IllegalMove('falling player')
+            return 'not player turn'
 
-        if player_status.pos is None:
-            raise GameRuntimeError('player without pos')
+        if game.has_decision(player, MoveType.optional_movement):
+            return 'optional movement to decide first'
 
-        player_cell = game.board.at(player_status.pos)
+        if game.decisions:
+            return 'decisions pending'
 
-        if player_cell.tile is None:
-            raise GameRuntimeError('player\'s cell has no tile')
-
-        if move.direction not in player_cell.open_directions():
-            raise IllegalMove('illegal direction')
+        if player_status.falling:
+            return 'falling player'
 
-        dest_pos = game.board.dest_coords(player_status.pos, move.direction)
+        return check_crawl(game, player_status, move.direction)
 
-        dest_cell = game.board.at(dest_pos)
+    def crawl(self, game: Game, player: PlayerColor, move: Crawl) -> Game:
+        return apply_crawl(game.edit(), game.players[game.turn], move.direction)
 
-        if dest_cell.tile is None:
-            if player_status.has_light:
-                raise GameRuntimeError('empty tile that shouldn\'t')
+    def check_block(self, game: Game, player: PlayerColor, move: Block) -> str | None:
+        return check_block(game, player, move)
 
-            if game.final_flickers():
-                if any(
-                    cell.tile is not None
-                    for cell in game.board.visible_cells_from(player_status.pos)
-                ):
-                    raise IllegalMove('empty dest tile')
+    def block(self, game: Game, player: PlayerColor, move: Block) -> Game:
+        return block(game, player, move)
 
-                return game.new_phase(Phase.game_lost)
+    def check_optional_movement(
+        self, game: Game, player: PlayerColor, move: OptionalMovement
+    ) -> str | None:
+        if not game.has_decision(player, MoveType.optional_movement):
+            return f'decision not found: player={player}'
 
-        elif len(dest_cell.players) > 0 and dest_cell.tile is not Tile.gate:
-            raise IllegalMove('dest tile already occupied')
+        player_idx = game.player_idx(player)
 
-        # apply
+        if player_idx != game.turn:
+            raise GameRuntimeError('the choosing player should be the moving one')
 
-        return apply_crawl(game, dest_pos, player_cell, dest_cell)
+        if move.move_again and game.players[player_idx].nerves == 0:
+            return 'no nerves to move again'
 
-    def block(self, game: Game, player: PlayerColor, move: Block) -> Game:
-        return block(game, player, move)
+        return None
 
     def optional_movement(self, game: Game, player: PlayerColor, move: OptionalMovement) -> Game:
         '''
@@ -448,49 +390,49 @@ class MovePlayer(PhaseLogic):
 
         g1 = game.discard_decision(player, MoveType.optional_movement)
 
-        player_idx = g1.player_idx(player)
-
-        if player_idx != g1.turn:
-            raise GameRuntimeError('the choosing player should be the moving one')
-
-        player_status = g1.players[g1.turn]
-
-        if move.move_again and player_status.nerves == 0:
-            raise IllegalMove('no nerves to move again')
-
         # apply
 
         if move.move_again:
-            g2 = g1.change_nerves(g1.turn, -1)
-
-            if not g2.decisions:
-                return g2
-
-            # TODO: save decision somewhere
-
-            return g3
+            # the turn stays, any other decision stays pending
+            return g1.change_nerves(g1.turn, -1)
 
         if g1.decisions:
             return g1
 
         return g1.set_turn((game.turn + 1) % len(game.players))
 
+    def check_land(self, game: Game, player: PlayerColor, move: Land) -> str | None:
+        return check_land(game, player, move)
+
+    def land(self, game: Game, player: PlayerColor, move: Land) -> Game:
+        '''
+        A falling player lands on their turn following the fall.
+        '''
+
+        return apply_land(game.new_phase(Phase.landing), player, move)
+
     def sub_phase_complete(self, game: Game, player: PlayerColor, move: Move) -> Game:
         """
-        TODO return from discover tiles, falling or place_monster
+        Either returning from a fall or from discovering the tiles around
+        after a crawl.
         """
 
+        if game.players[game.turn].falling:
+            # landing is left to the player's next turn
+            if game.final_flickers():
+                return game.new_phase(Phase.final_flickers)
 
-class PlaceMonster(PhaseLogic):
-    @override
-    def place_tile(self, game: Game, player: PlayerColor, move: PlaceTile) -> Game:
-        player_status = game.players[game.turn]
+            return game.set_turn((game.turn + 1) % len(game.players))
 
-        if player_status.color != player:
-            raise IllegalMove('not player turn')
+        return end_crawl(game.edit())
 
-        # apply
 
+class PlaceMonster(PhaseLogic):
+    def check_place_tile(self, game: Game, player: PlayerColor, move: PlaceTile) -> str | None:
+        return check_place_tile(game, player, move, replace_allowed=True)
+
+    @override
+    def place_tile(self, game: Game, player: PlayerColor, move: PlaceTile) -> Outcome:
         monster_tile = game.tile_holder[game.draw_index - 1]
 
         # TODO: if player is in lights out, the monster disappears soon. We can either:
@@ -498,32 +440,36 @@ class PlaceMonster(PhaseLogic):
         # 2. place it and then remove it after activation check (if the player falls)
         # right now we do 2.
 
-        g1 = apply_place_tile(game, player, move, monster_tile, replace_allowed=True)
+        e = apply_place_tile(game.edit(), move, monster_tile)
 
-        raise SubphaseComplete(g1)
+        # the stay that drew the monster goes on
+        return end_stay(e.pop_phase())
 
 
 class Falling(PhaseLogic):
-    @override
-    def fall(self, game: Game, player: PlayerColor, move: Fall) -> Game:
+    def check_fall(self, game: Game, player: PlayerColor, move: Fall) -> str | None:
         player_status = game.players[game.turn]
 
         if player_status.color != player:
-            raise IllegalMove('not player turn')
+            return 'not player turn'
 
         if not player_status.falling:
-            raise IllegalMove('non falling player')
+            return 'non falling player'
 
         if player_status.fall_direction is not None:
-            raise IllegalMove('already has fall direction')
+            return 'already has fall direction'
 
         if player_status.pos is None:
             raise GameRuntimeError('falling player without position')
 
         if move.direction not in (FallDirection.row, FallDirection.column):
-            raise IllegalMove('illegal fall direction')
+            return 'illegal fall direction'
 
-        raise SubphaseComplete(
+        return None
+
+    @override
+    def fall(self, game: Game, player: PlayerColor, move: Fall) -> Outcome:
+        return SubphaseComplete(
             game.fall_direction(game.turn, move.direction)
             # .set_turn(turn=(game.turn + 1) % len(game.players))
             # .new_phase(Phase.move_player)
@@ -531,36 +477,42 @@ class Falling(PhaseLogic):
 
 
 class FinalFlickers(PhaseLogic):
-    @override
-    def discard_tile(self, game: Game, player: PlayerColor, move: DiscardTile) -> Game:
+    def check_discard_tile(self, game: Game, player: PlayerColor, move: DiscardTile) -> str | None:
         player_status = game.players[game.turn]
 
         if player_status.color != player:
-            raise IllegalMove('not player turn')
+            return 'not player turn'
 
         if not game.final_flickers():
-            raise IllegalMove('not in final flickers')
+            return 'not in final flickers'
 
         if move.pos is not None:
             cell = game.board.at(move.pos)
 
             if cell.tile is None:
-                raise IllegalMove('empty cell')
+                return 'empty cell'
+
+            if cell.tile is Tile.pit:
+                return 'already discarded'
 
             if len(cell.players) > 0:
-                raise IllegalMove('cell occupied')
+                return 'cell occupied'
 
         elif player_status.nerves == 0:
-            raise IllegalMove('no nerves, must discard a tile')
+            return 'no nerves, must discard a tile'
 
-        # apply
+        return None
+
+    @override
+    def discard_tile(self, game: Game, player: PlayerColor, move: DiscardTile) -> Game:
+        e = game.edit()
 
         if move.pos is not None:
-            g1 = game.place_tile(move.pos, Tile.pit)
+            e.place_tile(move.pos, Tile.pit)
         else:
-            g1 = game.change_nerves(game.turn, -1)
+            e.change_nerves(game.turn, -1)
 
-        return g1.set_turn((game.turn + 1) % len(game.players))
+        return e.set_turn((game.turn + 1) % len(game.players)).commit()
 
 
 class GameWon(PhaseLogic):
@@ -571,8 +523,167 @@ class GameLost(PhaseLogic):
     pass
 
 
+def move_params(game: Game, move_type: MoveType) -> Iterator[Any]:
+    """
+    Candidate parameters of a move type, a superset of the legal ones.
+    """
+
+    match move_type:
+        case MoveType.place_tile:
+            pos = game.players[game.turn].pos
+
+            positions = (
+                game.board.geometry.positions
+                if pos is None
+                else game.board.visible_cells_coords_from(pos)
+            )
+
+            for p in positions:
+                yield trusted(PlaceTile, move=move_type, pos=p)
+
+        case MoveType.rotate_tile:
+            for d in all_directions:
+                yield trusted(RotateTile, move=move_type, direction=d)
+
+        case MoveType.stay:
+            yield trusted(Stay, move=move_type)
+
+        case MoveType.crawl:
+            for d in all_directions:
+                yield trusted(Crawl, move=move_type, direction=d)
+
+        case MoveType.optional_movement:
+            yield trusted(OptionalMovement, move=move_type, move_again=True)
+            yield trusted(OptionalMovement, move=move_type, move_again=False)
+
+        case MoveType.fall:
+            for fd in FallDirection:
+                yield trusted(Fall, move=move_type, direction=fd)
+
+        case MoveType.land:
+            for place in range(game.board.edge_length):
+                yield trusted(Land, move=move_type, place=place)
+
+        case MoveType.discard_tile:
+            yield trusted(DiscardTile, move=move_type, pos=None)
+
+            for p in game.board.geometry.positions:
+                yield trusted(DiscardTile, move=move_type, pos=p)
+
+        case MoveType.block:
+            yield trusted(Block, move=move_type, block=True)
+            yield trusted(Block, move=move_type, block=False)
+
+
+def landing_destination(player_status: Player, place: int) -> Position:
+    if player_status.pos is None:
+        raise GameRuntimeError('falling player without position')
+
+    match player_status.fall_direction:
+        case FallDirection.row:
+            return Position(place, player_status.pos.y)
+        case FallDirection.column:
+            return Position(player_status.pos.x, place)
+
+    raise GameRuntimeError('falling player without fall direction')
+
+
+def check_land(game: Game, player: PlayerColor, move: Land) -> str | None:
+    player_status = game.players[game.turn]
+
+    if player_status.color != player:
+        return 'not player turn'
+
+    if not player_status.falling:
+        # a runtime error in the landing phase, only entered by
+        # falling players
+        return 'non falling player'
+
+    if player_status.fall_direction is None:
+        raise GameRuntimeError('falling player without fall direction')
+
+    if player_status.pos is None:
+        raise GameRuntimeError('falling player without position')
+
+    if move.place < 0 or move.place >= game.board.edge_length:
+        return 'out of bounds'
+
+    destination = landing_destination(player_status, move.place)
+
+    cell = game.board.at(destination)
+
+    if cell.tile is Tile.pit:
+        return 'pit'
+
+    geometry = game.board.geometry
+
+    if cell.tile is not None and any(
+        game.board.at_idx(idx).tile is None
+        for idx in (
+            geometry.rows[player_status.pos.y]
+            if player_status.fall_direction is FallDirection.column
+            else geometry.columns[player_status.pos.x]
+        )
+    ):
+        return 'tile not empty'
+
+    return None
+
+
+def apply_land(game: Game, player: PlayerColor, move: Land) -> Game:
+    """
+    The move must have been validated by check_land.
+    """
+
+    destination = landing_destination(game.players[game.turn], move.place)
+
+    cell = game.board.at(destination)
+
+    e = game.edit()
+
+    if cell.tile is not None:
+        drawn_tile = cell.tile
+
+        e.land_player(game.turn, destination)
+
+    elif game.final_flickers():
+        return game.new_phase(Phase.game_lost)
+
+    else:
+        drawn_tile = game.tile_holder[game.draw_index]
+
+        e.draw_tile().place_tile(destination, drawn_tile).land_player(game.turn, destination)
+
+    if is_monster[drawn_tile]:
+        monsters = AttackingMonsters(e.board)
+
+        attacked_players_colors = monsters.trigger_monsters(destination)
+
+        activate_monsters(e, attacked_players_colors)
+
+        return e.add_decision(Decision(player, MoveType.crawl)).commit()
+
+    if drawn_tile in (Tile.t_passage, Tile.straight_passage):
+        # note: there is no constraint that forces the rotation
+        # so that the straight is aligned to an already placed tile:
+        # the player rotates the tile they stand on, as at the start
+
+        return e.push_phase(Phase.rotate_placed).commit()
+
+    if (
+        any(cell.tile is None for cell in e.board.visible_cells_from(destination))
+        and not e.final_flickers()
+    ):
+        return e.push_phase(Phase.discover_tiles).commit()
+
+    return e.new_phase(Phase.move_player).commit()
+
+
 class TNGFSM:
-    def __init__(self) -> None:
+    def __init__(self, latency: LatencyCollector | None = None) -> None:
+        # opt-in timing of apply, see latency.py
+        self.latency = latency
+
         self.phases = {
             Phase.place_start: PlaceStart(),
             Phase.rotate_placed: RotatePlaced(),
@@ -587,159 +698,154 @@ class TNGFSM:
             Phase.game_won: GameWon(),
         }
 
-    def apply(self, game: Game, move: Move) -> Game:
-        try:
-            return self._apply(game, move)
-
-        except SubphaseComplete as e:
-            game = e.game
-
-            return self._apply_sub_phase_complete(game, move)
-
-    def _apply(self, game: Game, move: Move) -> Game:
-        logic = self.phases[game.current_phase]
-
-        handler = getattr(logic, move.param.move.value)
-
-        return handler(game, move.player, move.param)
-
-    def _apply_sub_phase_complete(self, game: Game, move: Move) -> Game:
-        g1 = game.pop_phase()
-
-        if not g1.phases:
-            raise GameRuntimeError('no subphase running')
-
-        logic = self.phases[g1.current_phase]
-
-        return logic.sub_phase_complete(g1, move.player, move.param)
-
-    # def discover_tiles_place_tile(self, game: Game, player: PlayerColor, move: PlaceTile) -> Game:
-    #     # validate
-
-    #     player_status = game.players[game.turn]
+        # phase -> move type -> handler, only for the moves the phase accepts
+        self.handlers: dict[Phase, dict[MoveType, Callable[[Game, PlayerColor, Any], Outcome]]] = {
+            phase: {
+                move_type: getattr(logic, move_type.value)
+                for move_type in MoveType
+                if getattr(type(logic), move_type.value) is not getattr(PhaseLogic, move_type.value)
+            }
+            for phase, logic in self.phases.items()
+        }
 
-    #     # checked in the _apply_place_tile
-    #     # if player_status.color != player:
-    #     #     raise IllegalMove('not player turn')
+        # phase -> move type -> check, see PhaseLogic
+        self.checks: dict[Phase, dict[MoveType, Callable[[Game, PlayerColor, Any], str | None]]] = {
+            phase: {
+                move_type: getattr(self.phases[phase], f'check_{move_type.value}')
+                for move_type in handlers
+            }
+            for phase, handlers in self.handlers.items()
+        }
 
-    #     if game.final_flickers():
-    #         # TODO: set game lost phase at the previous move
-    #         raise IllegalMove('final flickres')
+    def legal_moves(self, game: Game) -> Iterator[Move]:
+        """
+        Every move apply would accept in the current phase, including the
+        answers to pending decisions. Moves are validated by the same checks
+        apply runs, but no game state is built.
+        """
 
-    #     # apply
+        checks = self.checks[game.current_phase]
 
-    #     placed_tile = game.tile_holder[game.draw_index]
+        if not checks:
+            return
 
-    #     new_game = self._apply_place_tile(
-    #         game, player, move, placed_tile, replace_allowed=False
-    #     ).draw_tile()
+        players = [game.players[game.turn].color]
 
-    #     if placed_tile in (Tile.t_passage, Tile.straight_passage):
-    #         return new_game.new_phase(Phase.rotate_discovered_tile)
+        for d in game.decisions or ():
+            if d.player not in players:
+                players.append(d.player)
 
-    #     if player_status.pos is None:
-    #         raise GameRuntimeError('player without pos')
+        for move_type, check in checks.items():
+            for param in move_params(game, move_type):
+                for player in players:
+                    if check(game, player, param) is None:
+                        yield trusted_move(player, param)
 
-    #     cells = new_game.board.visible_cells_from(player_status.pos)
+    def apply(self, game: Game, move: Move) -> Game:
+        if self.latency is not None:
+            return self._timed_apply(self.latency, game, move)
 
-    #     if any(cell.tile is None for cell in cells):
-    #         return new_game.new_phase(Phase.discover_tiles)
+        r = self._apply(game, move)
 
-    #     return new_game.new_phase(Phase.move_player).set_turn((game.turn + 1) % len(game.players))
+        if type(r) is SubphaseComplete:
+            return self._apply_sub_phase_complete(r.game, move)
 
-    # def rotate_discovered_tile_rotate_tile(
-    #     self, game: Game, player: PlayerColor, move: RotateTile
-    # ) -> Game:
-    #     # validate move
+        return r
 
-    #     player_status = game.players[game.turn]
+    def _timed_apply(self, latency: LatencyCollector, game: Game, move: Move) -> Game:
+        phase = game.current_phase
+        move_type = move.param.move
 
-    #     if player_status.color != player:
-    #         raise IllegalMove('not player turn')
+        started = perf_counter()
 
-    #     if player_status.pos is None:
-    #         raise GameRuntimeError('player without pos')
+        try:
+            r = self._apply(game, move)
 
-    #     last_placed_cell = game.board.at(game.last_placed_tile_pos)
+        except Exception:
+            latency.record(phase, move_type, 'move', perf_counter() - started, True)
+            raise
 
-    #     if last_placed_cell.tile is None:
-    #         raise GameRuntimeError('empty cell')
+        handled = perf_counter()
 
-    #     new_game = game.place_tile(game.last_placed_tile_pos, last_placed_cell.tile, move.direction)
+        latency.record(phase, move_type, 'move', handled - started, False)
 
-    #     if player_status.pos not in new_game.board.visible_cells_coords_from(
-    #         new_game.last_placed_tile_pos
-    #     ):
-    #         raise IllegalMove('not_connected')
+        if type(r) is not SubphaseComplete:
+            return r
 
-    #     # apply
+        if len(r.game.phases) > 1:
+            phase = r.game.phases[-2]
 
-    #     cells = new_game.board.visible_cells_from(player_status.pos)
+        try:
+            g = self._apply_sub_phase_complete(r.game, move)
 
-    #     if any(cell.tile is None for cell in cells):
-    #         return new_game.new_phase(Phase.discover_tiles)
+        except Exception:
+            latency.record(phase, move_type, 'sub_phase_complete', perf_counter() - handled, True)
+            raise
 
-    #     return new_game.new_phase(Phase.move_player).set_turn(
-    #         (new_game.turn + 1) % len(new_game.players)
-    #     )
+        latency.record(phase, move_type, 'sub_phase_complete', perf_counter() - handled, False)
 
-    # def lights_out_rotate_rotate_tile(
-    #     self, game: Game, player: PlayerColor, move: RotateTile
-    # ) -> Game:
-    #     # validate move
+        return g
 
-    #     player_status = game.players[game.turn]
+    def replay(self, game: Game, moves: Iterable[Move]) -> Game:
+        """
+        Applies moves already accepted once by apply (eg. read back from a
+        match log), skipping their checks: the resulting game is the one
+        apply would return, as long as the moves are legal.
 
-    #     if player_status.color != player:
-    #         raise IllegalMove('not player turn')
+        Latency is not collected.
+        """
 
-    #     if player_status.pos is None:
-    #         raise GameRuntimeError('player without pos')
+        handlers = self.handlers
 
-    #     last_placed_cell = game.board.at(game.last_placed_tile_pos)
+        for move in moves:
+            param = move.param
+            handler = handlers[game.current_phase].get(param.move)
 
-    #     if last_placed_cell.tile is None:
-    #         raise GameRuntimeError('empty cell')
+            if handler is None:
+                raise IllegalMove(f'illegal move {param} in phase {game.current_phase}')
 
-    #     new_game = game.place_tile(game.last_placed_tile_pos, last_placed_cell.tile, move.direction)
+            r = handler(game, move.player, param)
 
-    #     if player_status.pos not in new_game.board.visible_cells_coords_from(
-    #         new_game.last_placed_tile_pos
-    #     ):
-    #         raise IllegalMove('not_connected')
+            if type(r) is SubphaseComplete:
+                r = self._apply_sub_phase_complete(r.game, move)
 
-    #     # apply
+            if r is None:
+                raise GameRuntimeError(f'no game returned replaying {move}')
 
-    #     new_game = new_game.relight_me(player_status)
+            game = r
 
-    #     player_status = new_game.players[game.turn]
+        return game
 
-    #     monsters = VisibleMonsters(new_game.board)
+    def _apply(self, game: Game, move: Move) -> Outcome:
+        phase = game.current_phase
+        param = move.param
+        handler = self.handlers[phase].get(param.move)
 
-    #     if player_status.pos is None:
-    #         raise GameRuntimeError('player without pos')
+        if handler is None:
+            raise IllegalMove(f'illegal move {param} in phase {phase}')
 
-    #     monsters.check(player_status.pos)
+        raise_illegal(self.checks[phase][param.move](game, move.player, param))
 
-    #     new_game = activate_monsters(new_game, monsters)
+        return handler(game, move.player, param)
 
-    #     cells = new_game.board.visible_cells_from(player_status.pos)
+    def _apply_sub_phase_complete(self, game: Game, move: Move) -> Game:
+        g1 = game.pop_phase()
 
-    #     if any(cell.tile is None for cell in cells):
-    #         return new_game.new_phase(Phase.discover_tiles)
+        if not g1.phases:
+            raise GameRuntimeError('no subphase running')
 
-    #     return new_game.new_phase(Phase.move_player).set_turn((game.turn + 1) % len(game.players))
+        logic = self.phases[g1.current_phase]
 
+        return logic.sub_phase_complete(g1, move.player, move.param)
 
-def apply_place_tile(
-    game: Game, player: PlayerColor, move: PlaceTile, tile: Tile, *, replace_allowed: bool
-) -> Game:
-    # validate move
 
+def check_place_tile(
+    game: Game, player: PlayerColor, move: PlaceTile, *, replace_allowed: bool
+) -> str | None:
     player_status = game.players[game.turn]
 
     if player_status.color != player:
-        raise IllegalMove('not player turn')
+        return 'not player turn'
 
     if player_status.pos is None:
         # assuming placing start
@@ -749,26 +855,34 @@ def apply_place_tile(
         edge_length = game.board.edge_length
 
         if x < 0 or x >= edge_length:
-            raise IllegalMove('x out of board')
+            return 'x out of board'
 
         if y < 0 or y >= edge_length:
-            raise IllegalMove('y out of board')
+            return 'y out of board'
 
     elif move.pos not in game.board.visible_cells_coords_from(player_status.pos):
-        raise IllegalMove('not connected')
+        return 'not connected'
 
     cell = game.board.at(move.pos)
 
     if not replace_allowed and cell.tile is not None:
-        raise IllegalMove('tile not empty')
+        return 'tile not empty'
+
+    return None
+
+
+def apply_place_tile(game: GameEdit, move: PlaceTile, tile: Tile) -> GameEdit:
+    """
+    The move must have been validated by check_place_tile.
+    """
 
-    # apply
+    player_status = game.players[game.turn]
 
     if player_status.pos is not None and tile == Tile.straight_passage:
         # force correct direction
-        open_dirs = game.board.at(player_status.pos).open_directions()
+        open_dirs = game.board.at(player_status.pos).open_edges()
 
-        if Direction.n in open_dirs or Direction.s in open_dirs:
+        if open_dirs & (direction_bit[Direction.n] | direction_bit[Direction.s]):
             dir = Direction.n
         else:
             dir = Direction.e
@@ -779,16 +893,42 @@ def apply_place_tile(
     return game.place_tile(move.pos, tile, dir)
 
 
-def next_from_discover_tiles(game: Game, start_pos: Position) -> Game:
+def next_from_discover_tiles(game: GameEdit, start_pos: Position) -> Outcome:
     cells = game.board.visible_cells_from(start_pos)
 
-    if any(cell.tile is None for cell in cells):
-        return game.new_phase(Phase.discover_tiles)
+    # the discovery ends with the deck
+    if any(cell.tile is None for cell in cells) and not game.final_flickers():
+        return game.new_phase(Phase.discover_tiles).commit()
+
+    return SubphaseComplete(game.commit())
+
+
+def end_stay(game: GameEdit) -> Game:
+    """
+    What comes after a stay, once the drawn tile is dealt with: falling off
+    a crumbling tile, deciding to move again or passing the turn.
+    """
+
+    player_status = game.players[game.turn]
+
+    if check_falling(game, player_status):
+        # TODO: detect game lost if both column and row have empty tiles
+        return game.push_phase(Phase.falling).commit()
+
+    if player_status.nerves > 0:
+        return game.add_decision(Decision(player_status.color, MoveType.optional_movement)).commit()
+
+    if game.final_flickers():
+        return game.new_phase(Phase.final_flickers).commit()
 
-    raise SubphaseComplete(game)
+    return game.set_turn(turn=(game.turn + 1) % len(game.players)).commit()
 
 
-def check_falling(game: Game, player_status: Player) -> tuple[Game, bool]:
+def check_falling(game: GameEdit, player_status: Player) -> bool:
+    """
+    Returns True if the player fell.
+    """
+
     if player_status.pos is None:
         raise GameRuntimeError('player without pos')
 
@@ -798,22 +938,23 @@ def check_falling(game: Game, player_status: Player) -> tuple[Game, bool]:
         raise GameRuntimeError('player\'s cell has no tile')
 
     if is_crumbling[player_cell.tile]:
-        return (game.place_tile(player_status.pos, Tile.pit).player_falls(game.turn)), True
+        game.place_tile(player_status.pos, Tile.pit).player_falls(game.turn)
 
-    return game, False
+        return True
 
+    return False
 
-def activate_monsters(game: Game, attacks: dict[PlayerColor, list[Cell]]) -> Game:
+
+def activate_monsters(game: GameEdit, attacks: dict[PlayerColor, list[Cell]]) -> GameEdit:
     if not attacks:
         return game
 
-    for p in game.players:
-        hitting_monsters = attacks.get(p.color)
+    players = tuple(game.players)
 
-        if not hitting_monsters:
-            continue
+    for player_idx in sorted(map(game.player_idx, attacks)):
+        p = players[player_idx]
 
-        for monster in hitting_monsters:
+        for monster in attacks[p.color]:
             monster_tile = monster.tile
 
             if monster_tile is None:
@@ -824,7 +965,7 @@ def activate_monsters(game: Game, attacks: dict[PlayerColor, list[Cell]]) -> Gam
     return game
 
 
-def monster_attack(game: Game, monster: Tile, player_status: Player) -> Game:
+def monster_attack(game: GameEdit, monster: Tile, player_status: Player) -> GameEdit:
     if monster == Tile.wax_eater:
         if player_status.nerves > 0:
             return game.add_decision(
@@ -838,136 +979,158 @@ def monster_attack(game: Game, monster: Tile, player_status: Player) -> Game:
         raise GameRuntimeError(f'unknown monster {monster}')
 
 
-def enlighted_cells(game: Game) -> set[Position]:
-    visible_cells: set[Position] = set()
+def check_block(game: Game, player: PlayerColor, move: Block) -> str | None:
+    if not game.has_decision(player, MoveType.block):
+        return f'decision not found: player={player}'
 
-    for player_status in game.players:
-        if player_status.pos is None:
-            continue
+    # if d.action != MoveType.block:
+    #     raise IllegalMove(f'unexpected decision: player={player}, move={MoveType.block}')
 
-        visible_cells.add(player_status.pos)
+    if move.block and game.player_status(player).nerves < 1:
+        return f'can\'t block, no nerves to spend: player={player}'
 
-        if not player_status.has_light:
-            continue
+    return None
+
+
+def block(game: Game, player: PlayerColor, move: Block) -> Game:
+    '''
+    Answers a decision, see check_block.
+    If the player decided to spent a nerve just discard 2 tiles instead of 3.
+    '''
 
-        visible_cells.update(game.board.visible_cells_coords_from(player_status.pos))
+    e = game.edit().discard_decision(player, MoveType.block)
 
-    return visible_cells
+    if move.block:
+        e.change_nerves(e.player_idx(player), -1).draw_tiles(2)
+    else:
+        e.draw_tiles(3)
 
+    if e.decisions or e.current_phase is not Phase.move_player:
+        return e.commit()
 
-def refresh_lighting(game: Game) -> Game:
-    cells = enlighted_cells(game)
+    # the last decision taken, the crawl that triggered the attacks ends
+    return end_crawl(e)
 
-    return game.drop_tiles(
-        Position(x, y)
-        for x in range(game.board.edge_length)
-        for y in range(game.board.edge_length)
-        if Position(x, y) not in cells
-    )
 
+def check_crawl(game: Game, player_status: Player, direction: Direction) -> str | None:
+    """
+    Checks the crawling player can move toward direction.
+    """
 
-def block(game: Game, player: PlayerColor, move: Block) -> Game:
-    '''
-    This is a decision, check if there is one.
-    If so and the player decided to spent a nerve just discard 2 tiles instead of 3.
-    '''
+    if player_status.pos is None:
+        raise GameRuntimeError('player without pos')
 
-    # validate
+    player_cell = game.board.at(player_status.pos)
 
-    g1 = game.discard_decision(player, MoveType.block)
+    if player_cell.tile is None:
+        raise GameRuntimeError('player\'s cell has no tile')
 
-    # if d.action != MoveType.block:
-    #     raise IllegalMove(f'unexpected decision: player={player}, move={MoveType.block}')
+    if not player_cell.is_open(direction):
+        return 'illegal direction'
 
-    player_status = g1.player_status(player)
+    dest_cell = game.board.at(game.board.dest_coords(player_status.pos, direction))
 
-    if move.block and player_status.nerves < 1:
-        raise IllegalMove(f'can\'t block, no nerves to spend: player={player}')
+    # even lit players may see empty cells: once the deck is over, after
+    # landing on a monster, or when a monster replaced their tile
+    if dest_cell.tile is None:
+        if game.final_flickers() and any(
+            cell.tile is not None for cell in game.board.visible_cells_from(player_status.pos)
+        ):
+            return 'empty dest tile'
 
-    # apply
+    elif len(dest_cell.players) > 0 and dest_cell.tile is not Tile.gate:
+        return 'dest tile already occupied'
 
-    if move.block:
-        g2 = g1.change_nerves(g1.player_idx(player), -1).draw_tiles(2)
-    else:
-        g2 = g1.draw_tiles(3)
+    return None
 
-    return g2
 
+def apply_crawl(game: GameEdit, player_status: Player, direction: Direction) -> Game:
+    """
+    The move must have been validated by check_crawl.
+    """
+
+    if player_status.pos is None:
+        raise GameRuntimeError('player without pos')
+
+    start_pos = player_status.pos
+    player_cell = game.board.at(start_pos)
+    dest_pos = game.board.dest_coords(start_pos, direction)
+    dest_cell = game.board.at(dest_pos)
 
-def apply_crawl(game: Game, dest_pos: Position, player_cell: Cell, dest_cell: Cell) -> Game:
-    g1 = game.move_player(game.turn, dest_pos)
+    if dest_cell.tile is None and game.final_flickers():
+        return game.new_phase(Phase.game_lost).commit()
+
+    game.move_player(game.turn, dest_pos)
 
     if player_cell.tile is None:
         raise GameRuntimeError('player\'s cell has no tile')
 
-    player_status = g1.players[game.turn]
+    player_status = game.players[game.turn]
 
     if player_status.pos is None:
         raise GameRuntimeError('player without pos')
 
+    # the tile left behind crumbles
     if is_crumbling[player_cell.tile]:
-        g2 = g1.place_tile(player_status.pos, Tile.pit)
-    else:
-        g2 = g1
+        game.place_tile(start_pos, Tile.pit)
 
     if dest_cell.tile == Tile.pit:
-        return g2.player_falls(game.turn).push_phase(Phase.falling)
+        return game.player_falls(game.turn).push_phase(Phase.falling).commit()
 
     if dest_cell.tile is None:
-        # lights out
-        drawn_tile = g2.tile_holder[g2.draw_index]
+        # lights out, or an undiscovered cell (see check_crawl)
+        drawn_tile = game.tile_holder[game.draw_index]
 
-        g3 = g2.draw_tile().place_tile(dest_pos, drawn_tile)
-
-        if is_monster[drawn_tile]:
-            # this is a move, not a decision, but from the
-            # f/e pov both actions (nerves and moving) are to be taken
-            # at once, therefore I use this mechanism on the b/e
-            g3.add_decision(
-                Decision(player_status.color, MoveType.crawl),
-            )
+        game.draw_tile().place_tile(dest_pos, drawn_tile)
 
     else:
         drawn_tile = None
 
-        g3 = g2
-
     # we calc visible monsters on the NEW table because if the player was in a crumbling tile
     # and moves the opposite way of a monster, that monster will be triggered but the
     # moving player will remain unaffected
 
-    monsters = AttackingMonsters(g3.board)
+    monsters = AttackingMonsters(game.board)
 
     attacks = monsters.trigger_monsters(player_status.pos)
 
-    g4 = activate_monsters(g3, attacks)
-
-    if g4.decisions:
-        return g4
+    # the attacked players decide whether to block once the crawl is over,
+    # see end_crawl
+    activate_monsters(game, attacks)
 
-    g5 = refresh_lighting(g4)
+    game.refresh_lighting()
 
     if drawn_tile in [Tile.t_passage, Tile.straight_passage]:
-        return g5.new_phase(Phase.rotate_discovered_tile)
+        # the player stands on it: rotated as when landing
+        return game.push_phase(Phase.rotate_placed).commit()
+
+    return end_crawl(game)
+
 
-    player_status5 = g5.players[g5.turn]
+def end_crawl(game: GameEdit) -> Game:
+    """
+    What comes after a crawl ending on a known tile: discovering the
+    tiles around, deciding to move again or passing the turn.
+    """
 
-    if player_status5.pos is None:
+    player_status = game.players[game.turn]
+
+    if player_status.pos is None:
         raise GameRuntimeError('player without pos')
 
-    cells = g5.board.visible_cells_from(player_status5.pos)
+    cells = game.board.visible_cells_from(player_status.pos)
 
-    if any(cell.tile is None for cell in cells) and not g5.final_flickers():
-        return g5.push_phase(Phase.discover_tiles)
+    if any(cell.tile is None for cell in cells) and not game.final_flickers():
+        return game.push_phase(Phase.discover_tiles).commit()
 
-    if player_status5.nerves > 0:
-        return g5.add_decision(Decision(player_status.color, MoveType.optional_movement))
+    if game.decisions:
+        # the attacked players are to decide first, see block
+        return game.commit()
 
-    if g5.decisions:
-        # can happen when moving due to a decision
-        return g5
+    if player_status.nerves > 0:
+        return game.add_decision(Decision(player_status.color, MoveType.optional_movement)).commit()
 
-    if g5.final_flickers():
-        return g5.new_phase(Phase.final_flickers)
+    if game.final_flickers():
+        return game.new_phase(Phase.final_flickers).commit()
 
-    return g5.set_turn((g5.turn + 1) % len(g5.players))
+    return game.set_turn((game.turn + 1) % len(game.players)).commit()
@@ -23,17 +23,43 @@ Note: an exception to this principle are the turn/phase flags.
 They are managed by FSM which uses several Game calls.
 """
 
-from typing import NamedTuple, Iterable, Iterator
+from collections.abc import Sequence
 from enum import Enum
+from itertools import batched
+from math import isqrt
+from typing import NamedTuple, Iterable, Iterator
+
+from pydantic import GetCoreSchemaHandler
+from pydantic_core import core_schema
 
 from .types import (
     Tile,
     Direction,
     PlayerColor,
     Position,
-    open_directions,
     FallDirection,
     is_crumbling,
+    all_directions,
+    direction_index,
+    all_tiles,
+    tile_index,
+    all_colors,
+    color_index,
+    rotated_open_directions,
+    rotated_open_direction_indexes,
+    open_edges,
+    direction_bit,
+)
+from .geometry import Geometry, geometry, mask_indexes
+from .sight import SightLines
+from .zobrist import (
+    cell_key,
+    cells_key,
+    decisions_key,
+    player_key,
+    tile_holder_key,
+    tile_key,
+    zobrist_keys,
 )
 from .moves import MoveType
 from .exc import IllegalMove
@@ -60,35 +86,233 @@ class Cell(NamedTuple):
 
         return self._replace(players=new_players)
 
-    def open_directions(self) -> list[Direction]:
+    def open_directions(self) -> tuple[Direction, ...]:
         if self.tile is None:
             raise GameRuntimeError('no tile')
 
-        return [d.rotate(self.direction) for d in open_directions[self.tile]]
+        return rotated_open_directions[self.tile][self.direction]
+
+    def open_edges(self) -> int:
+        """
+        Open directions as a direction_bit mask, 0 if there is no tile.
+        """
+
+        if self.tile is None:
+            return 0
+
+        return open_edges[self.tile][self.direction]
+
+    def is_open(self, d: Direction) -> bool:
+        return self.tile is not None and bool(
+            open_edges[self.tile][self.direction] & direction_bit[d]
+        )
+
+
+class CellStore(Sequence[Cell]):
+    """
+    Persistent, row chunked, board cells.
+
+    Changing a cell copies just its row, every other row is shared with
+    the original store: old boards (and games) stay valid and a state
+    history costs one row per changed cell instead of a whole board.
+
+    Reads behave like a read only list of cells.
+
+    The store also keeps the monsters' sight lines, updated when a tile
+    changes, see sight.py, and the zobrist hash of the cells, see zobrist.py.
+    """
+
+    __slots__ = ('rows', 'edge_length', 'sight_lines', 'zobrist')
+
+    rows: tuple[tuple[Cell, ...], ...]
+    edge_length: int
+    sight_lines: SightLines
+    zobrist: int
+
+    def __init__(
+        self,
+        rows: tuple[tuple[Cell, ...], ...],
+        edge_length: int,
+        sight_lines: SightLines | None = None,
+        zobrist: int | None = None,
+    ) -> None:
+        self.rows = rows
+        self.edge_length = edge_length
+        self.sight_lines = (
+            SightLines.build(self, geometry(edge_length)) if sight_lines is None else sight_lines
+        )
+        self.zobrist = cells_key(zobrist_keys(edge_length), self) if zobrist is None else zobrist
+
+    @classmethod
+    def from_cells(cls, cells: Iterable[Cell], edge_length: int | None = None) -> 'CellStore':
+        flat = tuple(cells)
+
+        if edge_length is None:
+            edge_length = isqrt(len(flat))
+
+        if edge_length * edge_length != len(flat):
+            raise GameRuntimeError(f'not a square board: cells={len(flat)}')
+
+        return cls(tuple(batched(flat, edge_length)), edge_length)
+
+    def set(self, idx: int, cell: Cell) -> 'CellStore':
+        return self.update([(idx, cell)])
+
+    def update(self, changes: Iterable[tuple[int, Cell]]) -> 'CellStore':
+        """
+        Like many set calls, but touched rows are copied once.
+        """
+
+        n = self.edge_length
+        new_rows: dict[int, list[Cell]] = {}
+        new_cells: dict[int, Cell] = {}
+        changed_tiles: list[int] = []
+
+        for idx, cell in changes:
+            y = idx // n
+            row = new_rows.get(y)
+
+            if row is None:
+                row = new_rows[y] = list(self.rows[y])
+
+            old_cell = self.rows[y][idx % n]
+
+            if old_cell.tile is not cell.tile or old_cell.direction is not cell.direction:
+                changed_tiles.append(idx)
+
+            row[idx % n] = new_cells[idx] = cell
+
+        if not new_rows:
+            return self
+
+        keys = zobrist_keys(n)
+        zobrist = self.zobrist
+
+        for idx, cell in new_cells.items():
+            old_cell = self.rows[idx // n][idx % n]
+
+            if old_cell.tile is not cell.tile or old_cell.direction is not cell.direction:
+                zobrist ^= tile_key(
+                    keys, idx, old_cell.tile, direction_index[old_cell.direction]
+                ) ^ tile_key(keys, idx, cell.tile, direction_index[cell.direction])
+
+            if old_cell.players is not cell.players:
+                occupants = keys.occupants[idx]
+
+                for c in old_cell.players:
+                    zobrist ^= occupants[color_index[c]]
+
+                for c in cell.players:
+                    zobrist ^= occupants[color_index[c]]
+
+        r = CellStore(
+            tuple(
+                self.rows[y] if y not in new_rows else tuple(new_rows[y])
+                for y in range(len(self.rows))
+            ),
+            n,
+            self.sight_lines,
+            zobrist,
+        )
+
+        if changed_tiles:
+            r.sight_lines = self.sight_lines.update(r, geometry(n), changed_tiles)
+
+        return r
+
+    def __getitem__(self, idx):  # type: ignore[override]
+        # int or slice, like a list
+        if isinstance(idx, slice):
+            return list(self)[idx]
+
+        if idx < 0:
+            idx += len(self)
+
+        return self.rows[idx // self.edge_length][idx % self.edge_length]
+
+    def __len__(self) -> int:
+        return self.edge_length * self.edge_length
+
+    def __iter__(self) -> Iterator[Cell]:
+        for row in self.rows:
+            yield from row
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, CellStore):
+            return self.rows == other.rows
+
+        if isinstance(other, (list, tuple)):
+            return list(self) == list(other)
+
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return self.zobrist
+
+    def __repr__(self) -> str:
+        return f'CellStore({list(self)!r})'
+
+    @classmethod
+    def __get_pydantic_core_schema__(
+        cls, source: type, handler: GetCoreSchemaHandler
+    ) -> core_schema.CoreSchema:
+        # (de)serialized as a plain list of cells
+        from_list = core_schema.no_info_after_validator_function(
+            cls.from_cells, handler.generate_schema(list[Cell])
+        )
+
+        return core_schema.union_schema(
+            [core_schema.is_instance_schema(cls), from_list],
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                list, return_schema=handler.generate_schema(list[Cell])
+            ),
+        )
 
 
 class Board(NamedTuple):
-    cells: list[Cell]
+    cells: CellStore
     edge_length: int  # can be 6 (up to 4 players) or 7 (5 players)
 
+    @property
+    def geometry(self) -> Geometry:
+        return geometry(self.edge_length)
+
+    @property
+    def sight_lines(self) -> SightLines:
+        return self.cells.sight_lines
+
+    @property
+    def zobrist(self) -> int:
+        return self.cells.zobrist
+
     def at(self, pos: Position) -> Cell:
         return self.cells[pos.idx(self.edge_length)]
 
-    def place_tile(self, pos: Position, tile: Tile, direction: Direction = Direction.n) -> 'Board':
-        new_cells = list(self.cells)
+    @property
+    def tiled_mask(self) -> int:
+        r = 0
+
+        for idx, cell in enumerate(self.cells):
+            if cell.tile is not None:
+                r |= 1 << idx
 
-        idx = pos.idx(self.edge_length)
+        return r
 
-        orig_cell = new_cells[idx]
+    def at_idx(self, idx: int) -> Cell:
+        return self.cells[idx]
+
+    def place_tile(self, pos: Position, tile: Tile, direction: Direction = Direction.n) -> 'Board':
+        return self.place_tile_idx(pos.idx(self.edge_length), tile, direction)
+
+    def place_tile_idx(self, idx: int, tile: Tile, direction: Direction = Direction.n) -> 'Board':
+        orig_cell = self.cells[idx]
 
         new_cell = orig_cell._replace(
             tile=tile,
             direction=direction,
         )
 
-        new_cells[idx] = new_cell
-
-        return self._replace(cells=new_cells)
+        return self._replace(cells=self.cells.set(idx, new_cell))
 
     def move_player(
         self,
@@ -96,59 +320,441 @@ class Board(NamedTuple):
         from_pos: Position | None,
         to_pos: Position | None,
     ) -> 'Board':
-        new_cells = list(self.cells)
+        return self.move_player_idx(
+            player_color,
+            None if from_pos is None else from_pos.idx(self.edge_length),
+            None if to_pos is None else to_pos.idx(self.edge_length),
+        )
 
-        if from_pos is not None:
-            old_idx = from_pos.idx(self.edge_length)
-            old_cell = self.cells[old_idx]
+    def move_player_idx(
+        self,
+        player_color: PlayerColor,
+        from_idx: int | None,
+        to_idx: int | None,
+    ) -> 'Board':
+        changes: list[tuple[int, Cell]] = []
 
-            new_cells[old_idx] = old_cell.remove_player(player_color)
+        if from_idx is not None:
+            old_cell = self.cells[from_idx]
 
-        if to_pos is not None:
-            new_idx = to_pos.idx(self.edge_length)
-            new_cell = self.cells[new_idx]
+            changes.append((from_idx, old_cell.remove_player(player_color)))
 
-            new_cells[new_idx] = new_cell.add_player(player_color)
+        if to_idx is not None:
+            new_cell = self.cells[to_idx]
 
-        return self._replace(cells=new_cells)
+            changes.append((to_idx, new_cell.add_player(player_color)))
+
+        return self._replace(cells=self.cells.update(changes))
 
     def visible_cells_from(self, pos: Position) -> list[Cell]:
-        return [self.at(pos) for pos in self.visible_cells_coords_from(pos)]
+        cells = self.cells
+
+        return [cells[idx] for idx in self.visible_idx_from(pos.idx(self.edge_length))]
 
     def visible_cells_coords_from(self, pos: Position) -> list[Position]:
-        cell = self.at(pos)
-        directions = cell.open_directions()
-        r = []
+        positions = self.geometry.positions
 
-        for direction in directions:
-            dx, dy = direction.neighbor(pos, self.edge_length)
+        return [positions[idx] for idx in self.visible_idx_from(pos.idx(self.edge_length))]
 
-            r.append(Position(dx, dy))
+    def visible_idx_from(self, idx: int) -> list[int]:
+        cell = self.cells[idx]
 
-        return r
+        if cell.tile is None:
+            raise GameRuntimeError('no tile')
+
+        nbs = self.geometry.neighbors[idx]
+
+        return [nbs[d] for d in rotated_open_direction_indexes[cell.tile][cell.direction]]
 
     def is_connected(self, from_pos: Position, d: Direction) -> bool:
-        cell = self.at(from_pos)
+        return self.at(from_pos).is_open(d)
 
-        if cell.tile is None:
-            return False
+    def set_cells(self, changes: Iterable[tuple[int, Cell]]) -> 'Board':
+        """
+        Replaces whole cells, by index.
+        """
 
-        return any(od is d for od in cell.open_directions())
+        return self._replace(cells=self.cells.update(changes))
 
     def drop_tiles(self, dropped_tiles: Iterable[Position]) -> 'Board':
-        new_cells = list(self.cells)
+        return self.drop_tiles_idx(p.idx(self.edge_length) for p in dropped_tiles)
+
+    def drop_tiles_idx(self, dropped_tiles: Iterable[int]) -> 'Board':
+        cells = self.cells
+
+        return self._replace(
+            cells=cells.update(
+                (idx, cell._replace(tile=None))
+                for idx in dropped_tiles
+                if (cell := cells[idx]).tile is not None
+            )
+        )
+
+    def dest_coords(self, pos: Position, direction: Direction) -> Position:
+        return direction.neighbor(pos, self.edge_length)
+
+    @classmethod
+    def empty(cls, edge_length: int) -> 'Board':
+        return cls(
+            cells=CellStore.from_cells(
+                (
+                    Cell(tile=None, direction=Direction.n, players=[])
+                    for _ in range(edge_length * edge_length)
+                ),
+                edge_length,
+            ),
+            edge_length=edge_length,
+        )
+
+
+class BitBoard(NamedTuple):
+    """
+    Alternative Board implementation, with the same public API,
+    storing the board as integer bitmasks.
+
+    Bit `pos.idx(edge_length)` of a mask is set when the cell at `pos` has
+    that tile (or orientation or player). Every cell has exactly one
+    orientation, even if empty, as in Board.
+
+    Since a mask doesn't remember insertion order, `Cell.players` lists
+    players in PlayerColor order instead of arrival order.
+    """
+
+    tiles: tuple[int, ...]  # one mask per Tile, see all_tiles
+    directions: tuple[int, ...]  # one mask per Direction, see all_directions
+    players: tuple[int, ...]  # one mask per PlayerColor, see all_colors
+    edge_length: int
+    zobrist: int  # same as Board.zobrist, for the same cells
+
+    @classmethod
+    def empty(cls, edge_length: int) -> 'BitBoard':
+        return cls.from_board(Board.empty(edge_length))
+
+    @classmethod
+    def from_board(cls, board: Board) -> 'BitBoard':
+        tiles = [0] * len(all_tiles)
+        directions = [0] * len(all_directions)
+        players = [0] * len(all_colors)
+
+        for idx, cell in enumerate(board.cells):
+            bit = 1 << idx
+
+            if cell.tile is not None:
+                tiles[tile_index[cell.tile]] |= bit
+
+            directions[direction_index[cell.direction]] |= bit
+
+            for p in cell.players:
+                players[color_index[p]] |= bit
 
-        for p in dropped_tiles:
-            pos = p.idx(self.edge_length)
+        return cls(
+            tiles=tuple(tiles),
+            directions=tuple(directions),
+            players=tuple(players),
+            edge_length=board.edge_length,
+            zobrist=board.zobrist,
+        )
+
+    def to_board(self) -> Board:
+        return Board(
+            cells=CellStore.from_cells(self.cells, self.edge_length),
+            edge_length=self.edge_length,
+        )
+
+    @property
+    def geometry(self) -> Geometry:
+        return geometry(self.edge_length)
+
+    @property
+    def cells(self) -> list[Cell]:
+        return [self._cell(1 << idx) for idx in range(self.edge_length * self.edge_length)]
+
+    @property
+    def sight_lines(self) -> SightLines:
+        # not kept up to date as Board does, built on demand
+        return SightLines.build(self.cells, self.geometry)
+
+    def at(self, pos: Position) -> Cell:
+        return self._cell(1 << pos.idx(self.edge_length))
+
+    def at_idx(self, idx: int) -> Cell:
+        return self._cell(1 << idx)
+
+    def _cell(self, bit: int) -> Cell:
+        return Cell(
+            tile=self._tile(bit),
+            direction=self._direction(bit),
+            players=[c for c, m in zip(all_colors, self.players) if m & bit],
+        )
+
+    def _tile(self, bit: int) -> Tile | None:
+        for t, m in zip(all_tiles, self.tiles):
+            if m & bit:
+                return t
+
+        return None
+
+    def _direction(self, bit: int) -> Direction:
+        for d, m in zip(all_directions, self.directions):
+            if m & bit:
+                return d
+
+        raise GameRuntimeError('cell without direction')
+
+    def place_tile(
+        self, pos: Position, tile: Tile, direction: Direction = Direction.n
+    ) -> 'BitBoard':
+        return self.place_tile_idx(pos.idx(self.edge_length), tile, direction)
+
+    def place_tile_idx(
+        self, idx: int, tile: Tile, direction: Direction = Direction.n
+    ) -> 'BitBoard':
+        bit = 1 << idx
+        ti = tile_index[tile]
+        di = direction_index[direction]
+        keys = zobrist_keys(self.edge_length)
+
+        return self._replace(
+            tiles=tuple(m | bit if i == ti else m & ~bit for i, m in enumerate(self.tiles)),
+            directions=tuple(
+                m | bit if i == di else m & ~bit for i, m in enumerate(self.directions)
+            ),
+            zobrist=self.zobrist
+            ^ tile_key(keys, idx, self._tile(bit), direction_index[self._direction(bit)])
+            ^ tile_key(keys, idx, tile, di),
+        )
+
+    def move_player(
+        self,
+        player_color: PlayerColor,
+        from_pos: Position | None,
+        to_pos: Position | None,
+    ) -> 'BitBoard':
+        return self.move_player_idx(
+            player_color,
+            None if from_pos is None else from_pos.idx(self.edge_length),
+            None if to_pos is None else to_pos.idx(self.edge_length),
+        )
+
+    def move_player_idx(
+        self,
+        player_color: PlayerColor,
+        from_idx: int | None,
+        to_idx: int | None,
+    ) -> 'BitBoard':
+        ci = color_index[player_color]
+        mask = old_mask = self.players[ci]
+
+        if from_idx is not None:
+            mask &= ~(1 << from_idx)
+
+        if to_idx is not None:
+            mask |= 1 << to_idx
+
+        zobrist = self.zobrist
+        occupants = zobrist_keys(self.edge_length).occupants
+
+        for idx in mask_indexes(mask ^ old_mask):
+            zobrist ^= occupants[idx][ci]
+
+        return self._replace(
+            players=tuple(mask if i == ci else m for i, m in enumerate(self.players)),
+            zobrist=zobrist,
+        )
+
+    def visible_cells_from(self, pos: Position) -> list[Cell]:
+        return [self.at_idx(idx) for idx in self.visible_idx_from(pos.idx(self.edge_length))]
+
+    def visible_cells_coords_from(self, pos: Position) -> list[Position]:
+        positions = self.geometry.positions
+
+        return [positions[idx] for idx in self.visible_idx_from(pos.idx(self.edge_length))]
+
+    def visible_idx_from(self, idx: int) -> list[int]:
+        bit = 1 << idx
+        tile = self._tile(bit)
+
+        if tile is None:
+            raise GameRuntimeError('no tile')
+
+        nbs = self.geometry.neighbors[idx]
+
+        return [nbs[d] for d in rotated_open_direction_indexes[tile][self._direction(bit)]]
+
+    def is_connected(self, from_pos: Position, d: Direction) -> bool:
+        return bool(self.open_mask(d) & 1 << from_pos.idx(self.edge_length))
+
+    def set_cells(self, changes: Iterable[tuple[int, Cell]]) -> 'BitBoard':
+        """
+        Replaces whole cells, by index.
+        """
+
+        tiles = list(self.tiles)
+        directions = list(self.directions)
+        players = list(self.players)
+        keys = zobrist_keys(self.edge_length)
+        zobrist = self.zobrist
 
-            cell = new_cells[pos]
-            new_cells[pos] = cell._replace(tile=None)
+        for idx, cell in dict(changes).items():
+            bit = 1 << idx
+            zobrist ^= cell_key(keys, idx, self.at_idx(idx)) ^ cell_key(keys, idx, cell)
 
-        return self._replace(cells=new_cells)
+            for masks in (tiles, directions, players):
+                for i, m in enumerate(masks):
+                    masks[i] = m & ~bit
+
+            if cell.tile is not None:
+                tiles[tile_index[cell.tile]] |= bit
+
+            directions[direction_index[cell.direction]] |= bit
+
+            for c in cell.players:
+                players[color_index[c]] |= bit
+
+        return self._replace(
+            tiles=tuple(tiles),
+            directions=tuple(directions),
+            players=tuple(players),
+            zobrist=zobrist,
+        )
+
+    def drop_tiles(self, dropped_tiles: Iterable[Position]) -> 'BitBoard':
+        return self.drop_tiles_idx(p.idx(self.edge_length) for p in dropped_tiles)
+
+    def drop_tiles_idx(self, dropped_tiles: Iterable[int]) -> 'BitBoard':
+        dropped = 0
+
+        for idx in dropped_tiles:
+            dropped |= 1 << idx
+
+        dropped &= self.tiled_mask
+
+        if not dropped:
+            return self
+
+        keys = zobrist_keys(self.edge_length)
+        zobrist = self.zobrist
+
+        for idx in mask_indexes(dropped):
+            bit = 1 << idx
+            di = direction_index[self._direction(bit)]
+
+            zobrist ^= tile_key(keys, idx, self._tile(bit), di) ^ tile_key(keys, idx, None, di)
+
+        return self._replace(tiles=tuple(m & ~dropped for m in self.tiles), zobrist=zobrist)
 
     def dest_coords(self, pos: Position, direction: Direction) -> Position:
         return direction.neighbor(pos, self.edge_length)
 
+    # whole board queries
+
+    @property
+    def full_mask(self) -> int:
+        return (1 << self.edge_length * self.edge_length) - 1
+
+    @property
+    def tiled_mask(self) -> int:
+        r = 0
+
+        for m in self.tiles:
+            r |= m
+
+        return r
+
+    @property
+    def empty_mask(self) -> int:
+        return self.full_mask & ~self.tiled_mask
+
+    @property
+    def occupied_mask(self) -> int:
+        r = 0
+
+        for m in self.players:
+            r |= m
+
+        return r
+
+    def open_mask(self, d: Direction) -> int:
+        """
+        Cells whose tile is open toward d.
+        """
+
+        r = 0
+        bit = direction_bit[d]
+
+        for t, tm in zip(all_tiles, self.tiles):
+            if not tm:
+                continue
+
+            edges = open_edges[t]
+
+            for o, om in zip(all_directions, self.directions):
+                if edges[o] & bit:
+                    r |= tm & om
+
+        return r
+
+    def shift(self, mask: int, d: Direction) -> int:
+        """
+        Moves every bit of mask to its neighbor in direction d, wrapping
+        around the board edges.
+        """
+
+        n = self.edge_length
+
+        match d:
+            case Direction.n:
+                first_row = (1 << n) - 1
+                return (mask >> n) | ((mask & first_row) << n * (n - 1))
+
+            case Direction.s:
+                last_row = ((1 << n) - 1) << n * (n - 1)
+                return ((mask & ~last_row) << n) | ((mask & last_row) >> n * (n - 1))
+
+            case Direction.e:
+                last_col = column_mask(n, n - 1)
+                return ((mask & ~last_col) << 1) | ((mask & last_col) >> (n - 1))
+
+            case Direction.w:
+                first_col = column_mask(n, 0)
+                return ((mask & ~first_col) >> 1) | ((mask & first_col) << (n - 1))
+
+    def visible_mask(self, mask: int) -> int:
+        """
+        Cells reachable in one step through an open edge from any cell in mask.
+        """
+
+        r = 0
+
+        for d in Direction:
+            r |= self.shift(mask & self.open_mask(d), d)
+
+        return r
+
+    def player_mask(self, player_color: PlayerColor) -> int:
+        return self.players[color_index[player_color]]
+
+    def lit_mask(self, candles: Iterable[PlayerColor]) -> int:
+        """
+        Occupied cells plus cells visible from a player with a lit candle.
+        """
+
+        candle_cells = 0
+
+        for c in candles:
+            candle_cells |= self.players[color_index[c]]
+
+        return self.occupied_mask | self.visible_mask(candle_cells)
+
+
+def column_mask(edge_length: int, x: int) -> int:
+    r = 0
+
+    for y in range(edge_length):
+        r |= 1 << (y * edge_length + x)
+
+    return r
+
 
 class Player(NamedTuple):
     color: PlayerColor
@@ -186,6 +792,9 @@ class Phase(Enum):
     game_won = 'game_won'
 
 
+phase_index = {p: idx for idx, p in enumerate(Phase)}
+
+
 class Decision(NamedTuple):
     player: PlayerColor
     action: MoveType
@@ -193,7 +802,7 @@ class Decision(NamedTuple):
 
 
 class Game(NamedTuple):
-    board: Board
+    board: Board | BitBoard
     tile_holder: list[Tile]
     draw_index: int  # index in the tile_holder deck
 
@@ -207,35 +816,379 @@ class Game(NamedTuple):
 
     decisions: list[Decision] | None
 
+    # color -> index in players, players never change order. None on games
+    # built by other means (eg. JSON from before it was added): rehash
+    # builds it
+    player_index: dict[PlayerColor, int] | None = None
+
+    # bitmask of the cells lit at the last lighting refresh, plus the ones
+    # tiled since: the only cells a refresh may have to drop, see lit_mask;
+    # rehash builds it from the board
+    lit: int = 0
+
+    # 64 bit zobrist hash of the whole state but lit (see zobrist.py), kept
+    # up to date by the updates: call rehash on games built by other means
+    zobrist: int = 0
+
+    def __hash__(self) -> int:
+        return self.zobrist
+
+    def rehash(self) -> 'Game':
+        return self._replace(
+            player_index=(
+                self.player_index
+                if self.player_index is not None
+                else {p.color: idx for idx, p in enumerate(self.players)}
+            ),
+            # every tile may be unlit on a game built by other means
+            lit=self.board.tiled_mask,
+            zobrist=self.board.zobrist ^ state_zobrist(self),
+        )
+
+    def edit(self) -> 'GameEdit':
+        """
+        Starts composing several updates, see GameEdit.
+        """
+
+        return GameEdit(self)
+
     def new_phase(self, phase: Phase) -> 'Game':
-        return self._replace(phases=[*self.phases[:-1], phase])
+        return self.edit().new_phase(phase).commit()
 
     def push_phase(self, phase: Phase) -> 'Game':
-        return self._replace(phases=[*self.phases, phase])
+        return self.edit().push_phase(phase).commit()
 
     def pop_phase(self) -> 'Game':
-        if len(self.phases) < 2:
-            raise GameRuntimeError('no phases to pop')
-
-        return self._replace(phases=self.phases[:-1])
+        return self.edit().pop_phase().commit()
 
     @property
     def current_phase(self) -> Phase:
         return self.phases[-1]
 
     def set_turn(self, turn: int) -> 'Game':
-        return self._replace(turn=turn)
+        return self.edit().set_turn(turn).commit()
 
     def draw_tile(self):
-        return self._replace(draw_index=self.draw_index + 1)
+        return self.edit().draw_tile().commit()
 
     def place_tile(self, pos: Position, tile: Tile, direction: Direction = Direction.n) -> 'Game':
-        return self._replace(
-            board=self.board.place_tile(pos, tile, direction),
-            last_placed_tile_pos=pos,
-        )
+        return self.edit().place_tile(pos, tile, direction).commit()
 
     def move_player(self, player_idx: int, pos: Position) -> 'Game':
+        return self.edit().move_player(player_idx, pos).commit()
+
+    def place_player(self, player_idx: int, pos: Position) -> 'Game':
+        return self.edit().place_player(player_idx, pos).commit()
+
+    def land_player(self, player_idx: int, pos: Position) -> 'Game':
+        return self.edit().land_player(player_idx, pos).commit()
+
+    def change_nerves(self, player_idx: int, delta: int) -> 'Game':
+        return self.edit().change_nerves(player_idx, delta).commit()
+
+    def player_falls(self, player_idx: int) -> 'Game':
+        return self.edit().player_falls(player_idx).commit()
+
+    def relight_near_players(self, player_status: Player) -> 'Game':
+        return self.edit().relight_near_players(player_status).commit()
+
+    def light_out(self, player_status: Player) -> 'Game':
+        return self.edit().light_out(player_status).commit()
+
+    def draw_tiles(self, how_many: int) -> 'Game':
+        return self.edit().draw_tiles(how_many).commit()
+
+    def relight_me(self, player_status: Player) -> 'Game':
+        return self.edit().relight_me(player_status).commit()
+
+    def near_players(self, pos: Position) -> Iterator[Player]:
+        for cell in self.board.visible_cells_from(pos):
+            yield from map(self.player_status, cell.players)
+
+    def drop_tiles(self, dropped_tiles: Iterable[Position]) -> 'Game':
+        return self.edit().drop_tiles(dropped_tiles).commit()
+
+    def drop_tiles_idx(self, dropped_tiles: Iterable[int]) -> 'Game':
+        return self.edit().drop_tiles_idx(dropped_tiles).commit()
+
+    def final_flickers(self) -> bool:
+        return self.draw_index >= len(self.tile_holder)
+
+    def is_enlightened(self, pos: Position) -> bool:
+        """
+        A tile is enlightened if either a player is in it or
+        there is a player (with a lit candle) in a directly
+        connected tile.
+        """
+        return self.is_enlightened_idx(pos.idx(self.board.edge_length))
+
+    def is_enlightened_idx(self, idx: int) -> bool:
+        board = self.board
+        cell = board.at_idx(idx)
+
+        if cell.players:
+            return True
+
+        return any(
+            self.player_status(p).has_light
+            for i in board.visible_idx_from(idx)
+            for p in board.at_idx(i).players
+        )
+
+    def lit_mask(self) -> int:
+        """
+        Bitmask of the cells lit now: the ones a player is in and
+        the ones visible from a player with a lit candle.
+        """
+
+        board = self.board
+        edge_length = board.edge_length
+        mask = 0
+
+        for player_status in self.players:
+            # falling players are off the board, their last pos kept to land
+            if player_status.pos is None or player_status.falling:
+                continue
+
+            idx = player_status.pos.idx(edge_length)
+
+            mask |= 1 << idx
+
+            if not player_status.has_light:
+                continue
+
+            for i in board.visible_idx_from(idx):
+                mask |= 1 << i
+
+        return mask
+
+    def refresh_lighting(self) -> 'Game':
+        return self.edit().refresh_lighting().commit()
+
+    def player_status(self, player: PlayerColor) -> Player:
+        return self.players[self.player_idx(player)]
+
+    def player_idx(self, player: PlayerColor) -> int:
+        if self.player_index is None:
+            for idx, p in enumerate(self.players):
+                if p.color == player:
+                    return idx
+
+            raise GameRuntimeError('player not found')
+
+        try:
+            return self.player_index[player]
+
+        except KeyError:
+            raise GameRuntimeError('player not found')
+
+    def fall_direction(self, player_idx: int, direction: FallDirection) -> 'Game':
+        return self.edit().fall_direction(player_idx, direction).commit()
+
+    def add_decision(self, decision: Decision) -> 'Game':
+        return self.edit().add_decision(decision).commit()
+
+    def has_decision(self, player: PlayerColor, move: MoveType) -> bool:
+        return any(d.player == player and d.action == move for d in self.decisions or ())
+
+    def discard_decision(self, player: PlayerColor, move: MoveType) -> 'Game':
+        return self.edit().discard_decision(player, move).commit()
+
+
+def state_zobrist(game: Game) -> int:
+    """
+    Zobrist hash of everything but the board (and lit).
+    """
+
+    keys = zobrist_keys(game.board.edge_length)
+    r = (
+        tile_holder_key(keys, game.tile_holder)
+        ^ keys.draw_index[game.draw_index % len(keys.draw_index)]
+        ^ keys.turn[game.turn % len(keys.turn)]
+        ^ keys.last_placed_tile[game.last_placed_tile_pos.idx(game.board.edge_length)]
+        ^ decisions_key(keys, game.decisions)
+    )
+
+    for slot, p in enumerate(game.players):
+        r ^= player_key(keys, slot, p)
+
+    for depth, phase in enumerate(game.phases):
+        r ^= keys.phases[depth % len(keys.phases)][phase_index[phase]]
+
+    return r
+
+
+class GameEdit:
+    """
+    Scratch copy of a Game to compose many updates at once, see Game.edit.
+
+    It has the same methods as Game, but updates change the scratch copy
+    in place (returning it, so calls can still be chained) and commit
+    materializes a single new Game. Lists are copied on first write: the
+    original game, as well as every committed one, is never changed.
+
+    Example:
+        g2 = game.edit().move_player(idx, pos).draw_tile().push_phase(phase).commit()
+    """
+
+    def __init__(self, game: Game) -> None:
+        self.game = game
+
+        self.board = game.board
+        self.tile_holder = game.tile_holder
+        self.draw_index = game.draw_index
+        self.players = game.players
+        self.turn = game.turn
+        self.phases = game.phases
+        self.last_placed_tile_pos = game.last_placed_tile_pos
+        self.decisions = game.decisions
+        self.lit = game.lit
+        self.player_index = game.player_index
+
+        # zobrist hash of everything but the board, updated along the
+        # changes: commit adds the board one back
+        self.zobrist = game.zobrist ^ game.board.zobrist
+        self.keys = zobrist_keys(game.board.edge_length)
+
+        # lists copied since the last commit, safe to change in place
+        self._own_players = False
+        self._own_phases = False
+        self._own_decisions = False
+
+    def commit(self) -> Game:
+        self.game = self.game._replace(
+            board=self.board,
+            draw_index=self.draw_index,
+            players=self.players,
+            turn=self.turn,
+            phases=self.phases,
+            last_placed_tile_pos=self.last_placed_tile_pos,
+            decisions=self.decisions,
+            lit=self.lit,
+            zobrist=self.zobrist ^ self.board.zobrist,
+        )
+
+        # the lists belong to the committed game now
+        self._own_players = False
+        self._own_phases = False
+        self._own_decisions = False
+
+        return self.game
+
+    # queries, shared with Game
+
+    current_phase = Game.current_phase
+    near_players = Game.near_players
+    final_flickers = Game.final_flickers
+    is_enlightened = Game.is_enlightened
+    is_enlightened_idx = Game.is_enlightened_idx
+    lit_mask = Game.lit_mask
+    has_decision = Game.has_decision
+    player_status = Game.player_status
+    player_idx = Game.player_idx
+
+    # updates
+
+    def _players(self) -> list[Player]:
+        if not self._own_players:
+            self.players = list(self.players)
+            self._own_players = True
+
+        return self.players
+
+    def _phases(self) -> list[Phase]:
+        if not self._own_phases:
+            self.phases = list(self.phases)
+            self._own_phases = True
+
+        return self.phases
+
+    def _put_player(self, player_idx: int, player_status: Player) -> None:
+        players = self._players()
+
+        self.zobrist ^= player_key(self.keys, player_idx, players[player_idx]) ^ player_key(
+            self.keys, player_idx, player_status
+        )
+
+        players[player_idx] = player_status
+
+    def _set_player(self, player_status: Player) -> None:
+        """
+        Replaces the player with the same color.
+        """
+
+        self._put_player(self.player_idx(player_status.color), player_status)
+
+    def _phase_key(self, depth: int, phase: Phase) -> int:
+        return self.keys.phases[depth % len(self.keys.phases)][phase_index[phase]]
+
+    def new_phase(self, phase: Phase) -> 'GameEdit':
+        phases = self._phases()
+
+        if phases:
+            self.zobrist ^= self._phase_key(len(phases) - 1, phases[-1])
+            phases[-1] = phase
+        else:
+            phases.append(phase)
+
+        self.zobrist ^= self._phase_key(len(phases) - 1, phase)
+
+        return self
+
+    def push_phase(self, phase: Phase) -> 'GameEdit':
+        self.zobrist ^= self._phase_key(len(self.phases), phase)
+        self._phases().append(phase)
+
+        return self
+
+    def pop_phase(self) -> 'GameEdit':
+        if len(self.phases) < 2:
+            raise GameRuntimeError('no phases to pop')
+
+        phase = self._phases().pop()
+
+        self.zobrist ^= self._phase_key(len(self.phases), phase)
+
+        return self
+
+    def set_turn(self, turn: int) -> 'GameEdit':
+        keys = self.keys.turn
+
+        self.zobrist ^= keys[self.turn % len(keys)] ^ keys[turn % len(keys)]
+        self.turn = turn
+
+        return self
+
+    def _set_draw_index(self, draw_index: int) -> None:
+        keys = self.keys.draw_index
+
+        self.zobrist ^= keys[self.draw_index % len(keys)] ^ keys[draw_index % len(keys)]
+        self.draw_index = draw_index
+
+    def draw_tile(self) -> 'GameEdit':
+        self._set_draw_index(self.draw_index + 1)
+
+        return self
+
+    def draw_tiles(self, how_many: int) -> 'GameEdit':
+        self._set_draw_index(min(self.draw_index + how_many, len(self.tile_holder)))
+
+        return self
+
+    def place_tile(
+        self, pos: Position, tile: Tile, direction: Direction = Direction.n
+    ) -> 'GameEdit':
+        n = self.board.edge_length
+        keys = self.keys.last_placed_tile
+
+        self.board = self.board.place_tile(pos, tile, direction)
+        self.zobrist ^= keys[self.last_placed_tile_pos.idx(n)] ^ keys[pos.idx(n)]
+        self.last_placed_tile_pos = pos
+        self.lit |= 1 << pos.idx(n)
+
+        return self
+
+    def move_player(self, player_idx: int, pos: Position) -> 'GameEdit':
         """
         Updates:
          * player status:
@@ -277,31 +1230,56 @@ class Game(NamedTuple):
         else:
             new_board = self.board
 
-        new_players = list(self.players)
+        self._put_player(player_idx, new_player_status)
 
-        new_players[player_idx] = new_player_status
+        self.board = new_board.move_player(player_status.color, player_status.pos, board_pos)
 
-        return self._replace(
-            players=new_players,
-            board=new_board.move_player(player_status.color, player_status.pos, board_pos),
-        )
+        return self
+
+    def place_player(self, player_idx: int, pos: Position) -> 'GameEdit':
+        """
+        Puts a player not on the board yet at pos, eg. on their start tile.
+        """
+
+        player_status = self.players[player_idx]
 
-        # if player_status.pos is None:
-        #     return new_game
+        if player_status.pos is not None:
+            raise GameRuntimeError('placing a player already on the board')
 
-        # return new_game._drop_tiles(player_status.pos, player_status.has_light)
+        self._put_player(player_idx, player_status._replace(pos=pos))
+        self.board = self.board.move_player(player_status.color, None, pos)
+
+        return self
+
+    def land_player(self, player_idx: int, pos: Position) -> 'GameEdit':
+        """
+        Puts a falling player back on the board at pos, collecting the key
+        if any.
+        """
 
-    def change_nerves(self, player_idx: int, delta: int) -> 'Game':
         player_status = self.players[player_idx]
 
-        player_status = player_status._replace(nerves=player_status.nerves + delta)
+        if not player_status.falling:
+            raise GameRuntimeError('landing a player not falling')
 
-        new_players = list(self.players)
-        new_players[player_idx] = player_status
+        new_player_status = player_status._replace(pos=pos, falling=False, fall_direction=None)
 
-        return self._replace(players=new_players)
+        if self.board.at(pos).tile is Tile.key:
+            new_player_status = new_player_status._replace(has_key=True)
 
-    def player_falls(self, player_idx: int) -> 'Game':
+        self._put_player(player_idx, new_player_status)
+        self.board = self.board.move_player(player_status.color, None, pos)
+
+        return self
+
+    def change_nerves(self, player_idx: int, delta: int) -> 'GameEdit':
+        player_status = self.players[player_idx]
+
+        self._put_player(player_idx, player_status._replace(nerves=player_status.nerves + delta))
+
+        return self
+
+    def player_falls(self, player_idx: int) -> 'GameEdit':
         """
         Updates:
         * player status:
@@ -314,165 +1292,128 @@ class Game(NamedTuple):
 
         player_status = self.players[player_idx]
 
-        new_player_status = player_status._replace(falling=True)
+        self._put_player(player_idx, player_status._replace(falling=True))
 
-        new_players = list(self.players)
-        new_players[player_idx] = new_player_status
+        self.board = self.board.move_player(player_status.color, player_status.pos, None)
 
-        new_board = self.board.move_player(player_status.color, player_status.pos, None)
+        return self
 
-        return self._replace(
-            board=new_board,
-            players=new_players,
-        )
-
-        # if player_status.pos is None:
-        #     raise GameRuntimeError('player not placed')
-
-        # return new_game._drop_tiles(player_status.pos, player_status.has_light)
-
-    def relight_near_players(self, player_status: Player) -> 'Game':
+    def relight_near_players(self, player_status: Player) -> 'GameEdit':
         if player_status.pos is None:
             raise GameRuntimeError('player without pos')
 
-        player_updates: dict[PlayerColor, Player] = {}
-
-        for p in filter(lambda p: not p.has_light, self.near_players(player_status.pos)):
-            player_updates[p.color] = p._replace(has_light=True)
-
-        if not player_updates:
-            return self
-
-        new_players = [player_updates.get(p.color, p) for p in self.players]
+        for p in list(self.near_players(player_status.pos)):
+            if not p.has_light:
+                self._set_player(p._replace(has_light=True))
 
-        return self._replace(players=new_players)
+        return self
 
-    def light_out(self, player_status: Player) -> 'Game':
+    def light_out(self, player_status: Player) -> 'GameEdit':
         if not player_status.has_light:
             return self
 
         new_player_status = player_status._replace(has_light=False)
 
-        new_players = [
-            p if p.color != new_player_status.color else new_player_status for p in self.players
-        ]
-
-        new_game = self._replace(players=new_players)
+        self._set_player(new_player_status)
 
         if new_player_status.pos is None:
-            return new_game
+            return self
 
         # TODO: optimize, refresh visible cells after having processed all attacks
         # note: there is refresh_enlightment function to do so
 
-        dropped_tiles: list[Position] = []
-
-        for p in new_game.board.visible_cells_coords_from(new_player_status.pos):
-            if new_game.is_enlightened(p):
-                continue
-
-            cell = new_game.board.at(p)
+        dropped_tiles: list[int] = []
+        board = self.board
 
-            if cell.tile is None:
+        for idx in board.visible_idx_from(new_player_status.pos.idx(board.edge_length)):
+            # empty cells first: there's no sight from them
+            if board.at_idx(idx).tile is None or self.is_enlightened_idx(idx):
                 continue
 
-            dropped_tiles.append(p)
+            dropped_tiles.append(idx)
 
-        if not dropped_tiles:
-            return new_game
+        if dropped_tiles:
+            self.board = board.drop_tiles_idx(dropped_tiles)
 
-        new_board = new_game.board.drop_tiles(dropped_tiles)
+        return self
 
-        return new_game._replace(board=new_board)
-
-    def draw_tiles(self, how_many: int) -> 'Game':
-        return self._replace(draw_index=min(self.draw_index + how_many, len(self.tile_holder)))
-
-    def relight_me(self, player_status: Player) -> 'Game':
+    def relight_me(self, player_status: Player) -> 'GameEdit':
         if player_status.pos is None:
             raise GameRuntimeError('player without pos')
 
         if all(not p.has_light for p in self.near_players(player_status.pos)):
             return self
 
-        new_player_status = player_status._replace(has_light=True)
+        self._set_player(player_status._replace(has_light=True))
 
-        new_players = [
-            p if p.color != new_player_status.color else new_player_status for p in self.players
-        ]
+        return self
 
-        return self._replace(players=new_players)
+    def refresh_lighting(self) -> 'GameEdit':
+        """
+        Drops the tiles no longer lit. Only the cells that were lit at the
+        previous refresh (or tiled since) are examined.
+        """
 
-    def near_players(self, pos: Position) -> Iterator[Player]:
-        for cell in self.board.visible_cells_from(pos):
-            yield from map(self.player_status, cell.players)
+        lit = self.lit_mask()
+        dropped = self.lit & ~lit
 
-    def drop_tiles(self, dropped_tiles: Iterable[Position]) -> 'Game':
-        new_board = self.board.drop_tiles(dropped_tiles)
+        if dropped:
+            self.board = self.board.drop_tiles_idx(mask_indexes(dropped))
 
-        return self._replace(board=new_board)
+        self.lit = lit
 
-    def final_flickers(self) -> bool:
-        return self.draw_index >= len(self.tile_holder)
+        return self
 
-    def is_enlightened(self, pos: Position) -> bool:
-        """
-        A tile is enlightened if either a player is in it or
-        there is a player (with a lit candle) in a directly
-        connected tile.
-        """
-        cell = self.board.at(pos)
+    def drop_tiles(self, dropped_tiles: Iterable[Position]) -> 'GameEdit':
+        self.board = self.board.drop_tiles(dropped_tiles)
 
-        if cell.players:
-            return True
+        return self
 
-        return any(
-            self.player_status(p).has_light
-            for c in self.board.visible_cells_from(pos)
-            for p in c.players
-        )
+    def drop_tiles_idx(self, dropped_tiles: Iterable[int]) -> 'GameEdit':
+        self.board = self.board.drop_tiles_idx(dropped_tiles)
 
-    def player_status(self, player: PlayerColor) -> Player:
-        for p in self.players:
-            if p.color == player:
-                return p
+        return self
 
-        raise GameRuntimeError('player not found')
+    def fall_direction(self, player_idx: int, direction: FallDirection) -> 'GameEdit':
+        player_status = self.players[player_idx]
 
-    def player_idx(self, player: PlayerColor) -> int:
-        for idx, p in enumerate(self.players):
-            if p.color == player:
-                return idx
+        self._put_player(player_idx, player_status._replace(fall_direction=direction))
 
-        raise GameRuntimeError('player not found')
+        return self
 
-    def fall_direction(self, player_idx: int, direction: FallDirection) -> 'Game':
-        player_status = self.players[player_idx]
+    def add_decision(self, decision: Decision) -> 'GameEdit':
+        if decision.action not in (MoveType.block, MoveType.crawl, MoveType.optional_movement):
+            raise GameRuntimeError(f'unsupported decison action: action={decision.action}')
 
-        new_player_status = player_status._replace(fall_direction=direction)
+        # a few decisions at most: rehashing them all is as cheap as updating
+        self.zobrist ^= decisions_key(self.keys, self.decisions)
 
-        new_players = list(self.players)
+        if not self.decisions:
+            self.decisions = [decision]
+            self._own_decisions = True
 
-        new_players[player_idx] = new_player_status
+        elif self._own_decisions:
+            self.decisions.append(decision)
 
-        return self._replace(players=new_players)
+        else:
+            self.decisions = [*self.decisions, decision]
+            self._own_decisions = True
 
-    def add_decision(self, decision: Decision) -> 'Game':
-        if decision.action not in (MoveType.block, MoveType.block, MoveType.optional_movement):
-            raise GameRuntimeError(f'unsupported decison action: action={decision.action}')
+        self.zobrist ^= decisions_key(self.keys, self.decisions)
 
-        return self._replace(
-            decisions=[decision] if not self.decisions else [*self.decisions, decision]
-        )
+        return self
 
-    def discard_decision(self, player: PlayerColor, move: MoveType) -> 'Game':
+    def discard_decision(self, player: PlayerColor, move: MoveType) -> 'GameEdit':
         if not self.decisions:
             raise IllegalMove(f'decision not found: player={player}')
 
         for d in self.decisions:
             if d.player == player and d.action == move:
-                new_dd = [x for x in self.decisions if x is not d]
+                self.zobrist ^= decisions_key(self.keys, self.decisions)
+                self.decisions = [x for x in self.decisions if x is not d]
+                self.zobrist ^= decisions_key(self.keys, self.decisions)
+                self._own_decisions = True
 
-                return self._replace(decisions=new_dd)
+                return self
 
         raise IllegalMove(f'decision not found: player={player}')
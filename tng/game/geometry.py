@@ -0,0 +1,98 @@
+"""
+Precomputed board geometry.
+
+The board is a torus of edge_length x edge_length cells. Internally cells
+are addressed by their index `y * edge_length + x` (see Position.idx),
+Position is used only at the API boundary.
+
+Tables are built once per edge length and shared by every board.
+"""
+
+from collections.abc import Iterator
+from functools import cache
+from typing import NamedTuple
+
+from .types import Position, Direction, all_directions, direction_index, neighbors
+
+
+class Geometry(NamedTuple):
+    edge_length: int
+
+    # cell index -> position
+    positions: tuple[Position, ...]
+
+    # cell index -> neighbour index, one per direction in all_directions order
+    neighbors: tuple[tuple[int, ...], ...]
+
+    # cell index -> cells met walking in each direction (all_directions order),
+    # stopping before coming back to the starting cell
+    rays: tuple[tuple[tuple[int, ...], ...], ...]
+
+    # y -> cell indexes of that row, x -> cell indexes of that column
+    rows: tuple[tuple[int, ...], ...]
+    columns: tuple[tuple[int, ...], ...]
+
+    @property
+    def size(self) -> int:
+        return self.edge_length * self.edge_length
+
+    def idx(self, pos: Position) -> int:
+        return pos.y * self.edge_length + pos.x
+
+    def neighbor(self, idx: int, d: Direction) -> int:
+        return self.neighbors[idx][direction_index[d]]
+
+
+@cache
+def geometry(edge_length: int) -> Geometry:
+    size = edge_length * edge_length
+
+    positions = tuple(Position(idx % edge_length, idx // edge_length) for idx in range(size))
+
+    nbs = tuple(
+        tuple(
+            positions[idx].add(*neighbors[d], edge_length).idx(edge_length) for d in all_directions
+        )
+        for idx in range(size)
+    )
+
+    def ray(idx: int, d_idx: int) -> tuple[int, ...]:
+        r = []
+        p = nbs[idx][d_idx]
+
+        while p != idx:
+            r.append(p)
+            p = nbs[p][d_idx]
+
+        return tuple(r)
+
+    return Geometry(
+        edge_length=edge_length,
+        positions=positions,
+        neighbors=nbs,
+        rays=tuple(tuple(ray(idx, d_idx) for d_idx in range(4)) for idx in range(size)),
+        rows=tuple(
+            tuple(y * edge_length + x for x in range(edge_length)) for y in range(edge_length)
+        ),
+        columns=tuple(
+            tuple(y * edge_length + x for y in range(edge_length)) for x in range(edge_length)
+        ),
+    )
+
+
+def mask_indexes(mask: int) -> Iterator[int]:
+    """
+    Cell indexes of the bits set in mask, lowest first.
+    """
+
+    while mask:
+        low = mask & -mask
+
+        yield low.bit_length() - 1
+
+        mask ^= low
+
+
+# standard boards: 6 (up to 4 players) and 7 (5 players)
+geometry(6)
+geometry(7)
@@ -0,0 +1,118 @@
+"""
+Opt-in latency instrumentation of TNGFSM.apply.
+
+Pass a LatencyCollector to TNGFSM to time every applied move, keyed by
+the phase it ran in, its move type and the stage:
+ * move: the phase handler
+ * sub_phase_complete: the parent phase continuation, run when the
+   handler completes a sub phase (keyed by the parent phase)
+
+Subclass LatencyCollector and override record to forward samples
+elsewhere (eg. a metrics exporter).
+"""
+
+from bisect import bisect_left
+from typing import Literal
+
+from .game import Phase
+from .moves import MoveType
+
+type Stage = Literal['move', 'sub_phase_complete']
+
+type Key = tuple[Phase, MoveType, Stage]
+
+
+# histogram bucket upper bounds, in seconds: 1us, 2us, 4us ... ~1s, plus overflow
+bucket_bounds = tuple(2**i / 1_000_000 for i in range(21))
+
+
+class LatencyStats:
+    __slots__ = ('count', 'errors', 'total', 'min', 'max', 'buckets')
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        self.buckets = [0] * (len(bucket_bounds) + 1)
+
+    def add(self, seconds: float, error: bool) -> None:
+        self.count += 1
+        self.total += seconds
+
+        if error:
+            self.errors += 1
+
+        if seconds < self.min:
+            self.min = seconds
+
+        if seconds > self.max:
+            self.max = seconds
+
+        self.buckets[bisect_left(bucket_bounds, seconds)] += 1
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q: float) -> float:
+        """
+        Upper bound of the bucket holding the q-th (0..100) percentile.
+        """
+
+        if not self.count:
+            return 0.0
+
+        rank = q / 100 * self.count
+        seen = 0
+
+        for bound, n in zip(bucket_bounds, self.buckets):
+            seen += n
+
+            if seen >= rank:
+                return bound
+
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'total': self.total,
+            'min': self.min if self.count else 0.0,
+            'max': self.max,
+            'mean': self.mean,
+            'p50': self.percentile(50),
+            'p99': self.percentile(99),
+            'buckets': list(self.buckets),
+        }
+
+
+class LatencyCollector:
+    def __init__(self) -> None:
+        self.stats: dict[Key, LatencyStats] = {}
+
+    def record(
+        self, phase: Phase, move: MoveType, stage: Stage, seconds: float, error: bool
+    ) -> None:
+        key = (phase, move, stage)
+        stats = self.stats.get(key)
+
+        if stats is None:
+            stats = self.stats[key] = LatencyStats()
+
+        stats.add(seconds, error)
+
+    def reset(self) -> None:
+        self.stats.clear()
+
+    def snapshot(self) -> dict[str, dict]:
+        """
+        JSON friendly copy, keys are `phase/move type/stage`.
+        """
+
+        return {
+            f'{phase.value}/{move.value}/{stage}': stats.to_dict()
+            for (phase, move, stage), stats in self.stats.items()
+        }
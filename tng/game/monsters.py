@@ -1,7 +1,7 @@
 from collections import defaultdict
 
-from .game import Cell, Board
-from .types import Tile, is_monster, Position, PlayerColor
+from .game import Cell, Board, GameRuntimeError
+from .types import Tile, is_monster, Position, PlayerColor, rotated_open_direction_indexes
 
 
 class AttackingMonsters:
@@ -19,27 +19,27 @@ class AttackingMonsters:
         Returns, for each player a list of monters that hit them.
         """
 
+        board = self.board
+        rays = board.geometry.rays
+
         r: dict[PlayerColor, list[Cell]] = defaultdict(list)
 
         # phase 1
 
-        monster_queue: list[Position] = []
-
-        starting_cell = self.board.at(player_moved_from)
-
-        if starting_cell.tile is not None and is_monster[starting_cell.tile]:
-            monster_queue.append(player_moved_from)
+        monster_queue: list[int] = []
 
-        for d in starting_cell.open_directions():
-            p = player_moved_from
+        start = player_moved_from.idx(board.edge_length)
+        starting_cell = board.at_idx(start)
 
-            while True:
-                p = d.neighbor(p, self.board.edge_length)
+        if starting_cell.tile is None:
+            raise GameRuntimeError('no tile')
 
-                if p == player_moved_from:
-                    break
+        if is_monster[starting_cell.tile]:
+            monster_queue.append(start)
 
-                cell = self.board.at(p)
+        for d in rotated_open_direction_indexes[starting_cell.tile][starting_cell.direction]:
+            for p in rays[start][d]:
+                cell = board.at_idx(p)
 
                 if cell.tile is None or cell.tile is Tile.pit:
                     break
@@ -50,7 +50,8 @@ class AttackingMonsters:
 
         # phase 2
 
-        examined_monsters: set[Position] = set()
+        sight_lines = board.sight_lines.lines
+        examined_monsters: set[int] = set()
 
         while monster_queue:
             pos = monster_queue.pop()
@@ -59,30 +60,15 @@ class AttackingMonsters:
                 continue
 
             examined_monsters.add(pos)
+            monster = board.at_idx(pos)
 
-            cell = self.board.at(pos)
-
-            if cell.tile is None:
-                continue
-
-            for d in cell.open_directions():
-                p = pos
-
-                while True:
-                    p = d.neighbor(p, self.board.edge_length)
-
-                    if p == pos:
-                        break
+            for p in sight_lines.get(pos, ()):
+                cell = board.at_idx(p)
 
-                    cell = self.board.at(p)
-
-                    if cell.tile is None or cell.tile is Tile.pit:
-                        break
-
-                    if is_monster[cell.tile]:
-                        monster_queue.append(p)
+                if cell.tile is not None and is_monster[cell.tile]:
+                    monster_queue.append(p)
 
-                    for player in cell.players:
-                        r[player].append(cell)
+                for player in cell.players:
+                    r[player].append(monster)
 
         return r
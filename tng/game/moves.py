@@ -1,7 +1,8 @@
+from collections.abc import Iterable, Iterator
 from enum import Enum
-from typing import Literal
+from typing import Any, Literal
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
 
 from .types import PlayerColor, Direction, Position, FallDirection
 
@@ -99,3 +100,67 @@ class Move(BaseModel):
         | Block
         | MoveAgain
     ) = Field(discriminator='move')
+
+
+# built once: validating through them skips the per call schema lookup
+move_adapter = TypeAdapter(Move)
+moves_adapter = TypeAdapter(list[Move])
+
+
+def decode_move(data: str | bytes) -> Move:
+    return move_adapter.validate_json(data)
+
+
+def decode_moves(data: str | bytes) -> list[Move]:
+    """
+    A JSON array of moves, validated in a single call.
+    """
+
+    return moves_adapter.validate_json(data)
+
+
+def decode_move_lines(lines: Iterable[str | bytes]) -> Iterator[Move]:
+    """
+    Moves of a JSONL stream (eg. a replay file), one per non blank line.
+
+    On error, the location starts with the line number (from 1).
+    """
+
+    for lineno, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+
+        try:
+            move = move_adapter.validate_json(line)
+
+        except ValidationError as e:
+            raise ValidationError.from_exception_data(
+                e.title,
+                [
+                    {
+                        'type': error['type'],
+                        'loc': (lineno, *error['loc']),
+                        'input': error['input'],
+                        **({'ctx': error['ctx']} if 'ctx' in error else {}),
+                    }
+                    for error in e.errors()
+                ],
+                input_type='json',
+            ) from None
+
+        yield move
+
+
+def trusted[M: BaseModel](cls: type[M], **fields: Any) -> M:
+    """
+    Builds a model from already valid field values, skipping validation.
+
+    For server internal moves only (eg. the ones generated by
+    TNGFSM.legal_moves): fields are neither checked nor converted.
+    """
+
+    return cls.model_construct(**fields)
+
+
+def trusted_move(player: PlayerColor, param: Any) -> Move:
+    return trusted(Move, player=player, param=param)
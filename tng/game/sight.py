@@ -0,0 +1,92 @@
+"""
+Monsters' sight lines.
+
+A monster sees the cells met walking each open direction of its tile,
+up to (not including) the first empty cell or pit. Monster attacks
+(see AttackingMonsters) only follow these lines, so the board keeps
+them indexed and updates them when tiles change, instead of casting
+rays on every query.
+
+Only monsters sharing a row or a column with a changed cell can see
+it (or be blocked by it), so an update recomputes just those lines.
+"""
+
+from collections.abc import Iterable, Sequence
+from typing import TYPE_CHECKING, NamedTuple
+
+from .geometry import Geometry
+from .types import Tile, is_monster, rotated_open_direction_indexes
+
+if TYPE_CHECKING:
+    from .game import Cell
+
+
+class SightLines(NamedTuple):
+    # monster cell index -> cells seen, in walking order
+    lines: dict[int, tuple[int, ...]]
+
+    @classmethod
+    def build(cls, cells: Sequence['Cell'], geo: Geometry) -> 'SightLines':
+        return cls(
+            {
+                idx: sight_line(cells, geo, idx)
+                for idx, cell in enumerate(cells)
+                if cell.tile is not None and is_monster[cell.tile]
+            }
+        )
+
+    def update(
+        self, cells: Sequence['Cell'], geo: Geometry, changed: Iterable[int]
+    ) -> 'SightLines':
+        """
+        Sight lines after the tiles (or orientations) of the changed cells
+        have been replaced, cells being the updated board.
+        """
+
+        positions = geo.positions
+        affected: set[int] = set()
+
+        for c in changed:
+            pos = positions[c]
+
+            affected.add(c)
+            affected.update(
+                m for m in self.lines if positions[m].x == pos.x or positions[m].y == pos.y
+            )
+
+        if not affected:
+            return self
+
+        lines = dict(self.lines)
+
+        for idx in affected:
+            tile = cells[idx].tile
+
+            if tile is not None and is_monster[tile]:
+                lines[idx] = sight_line(cells, geo, idx)
+
+            else:
+                lines.pop(idx, None)
+
+        return SightLines(lines)
+
+
+def sight_line(cells: Sequence['Cell'], geo: Geometry, idx: int) -> tuple[int, ...]:
+    cell = cells[idx]
+
+    if cell.tile is None:
+        return ()
+
+    rays = geo.rays[idx]
+    r: list[int] = []
+
+    for d in rotated_open_direction_indexes[cell.tile][cell.direction]:
+        for p in rays[d]:
+            tile = cells[p].tile
+
+            if tile is None or tile is Tile.pit:
+                break
+
+            r.append(p)
+
+    return tuple(r)
@@ -10,6 +10,10 @@ class PlayerColor(Enum):
     purple = "purple"
 
 
+all_colors = [c for c in PlayerColor]
+color_index = {c: idx for idx, c in enumerate(PlayerColor)}
+
+
 class Position(NamedTuple):
     x: int
     y: int
@@ -28,9 +32,7 @@ class Direction(Enum):
     w = "w"
 
     def rotate(self, d: 'Direction') -> 'Direction':
-        new_index = (direction_index[self] + direction_index[d]) % 4
-
-        return all_directions[new_index]
+        return rotations[self][d]
 
     def neighbor(self, pos: Position, edge_length: int) -> Position:
         dx, dy = neighbors[self]
@@ -52,6 +54,12 @@ neighbors = {
     Direction.w: (-1, 0),
 }
 
+rotations = {
+    d: {by: all_directions[(direction_index[d] + direction_index[by]) % 4] for by in Direction}
+    for d in Direction
+}
+direction_bit = {d: 1 << idx for idx, d in enumerate(Direction)}
+
 connected_to = {
     Direction.n: Direction.s,
     Direction.e: Direction.w,
@@ -73,6 +81,9 @@ class Tile(Enum):
     pit = "pit"
 
 
+all_tiles = [t for t in Tile]
+tile_index = {t: idx for idx, t in enumerate(Tile)}
+
 is_crumbling = {
     Tile.start: True,
     Tile.key: True,
@@ -104,6 +115,27 @@ open_directions = {
     Tile.wax_eater: [Direction.n, Direction.e, Direction.s, Direction.w],
     Tile.straight_passage: [Direction.n, Direction.s],
     Tile.t_passage: [Direction.e, Direction.s, Direction.w],
+    Tile.crumbling_t_passage: [Direction.e, Direction.s, Direction.w],
     Tile.four_way_passage: [Direction.n, Direction.e, Direction.s, Direction.w],
     Tile.pit: [Direction.n, Direction.e, Direction.s, Direction.w],
 }
+
+# open_directions rotated by every orientation, as tuples and as edge masks
+# (see direction_bit), so that hot paths need one lookup and no allocation:
+# rotated_open_directions[tile][orientation], open_edges[tile][orientation]
+
+rotated_open_directions: dict[Tile, dict[Direction, tuple[Direction, ...]]] = {
+    tile: {o: tuple(d.rotate(o) for d in dirs) for o in Direction}
+    for tile, dirs in open_directions.items()
+}
+
+# same, as indexes in all_directions order
+rotated_open_direction_indexes: dict[Tile, dict[Direction, tuple[int, ...]]] = {
+    tile: {o: tuple(direction_index[d] for d in dirs) for o, dirs in by_orientation.items()}
+    for tile, by_orientation in rotated_open_directions.items()
+}
+
+open_edges: dict[Tile, dict[Direction, int]] = {
+    tile: {o: sum(direction_bit[d] for d in dirs) for o, dirs in by_orientation.items()}
+    for tile, by_orientation in rotated_open_directions.items()
+}
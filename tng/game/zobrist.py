@@ -0,0 +1,168 @@
+"""
+Zobrist hashing of game states.
+
+A state hash is the XOR of one random 64 bit key per feature of the state:
+a tile (with its orientation) on a cell, a player on a cell, a player field
+value, the phase at a given depth of the phase stack and so on. Changing a
+feature costs two XORs, taking the old key out and putting the new one in,
+so Board, BitBoard and GameEdit keep the hash up to date as they change the
+state instead of hashing it on every query.
+
+Keys are drawn from a fixed seed: hashes are the same across processes
+(eg. simulator workers) and runs.
+
+Tables sized by an unbounded value (draw index, phases depth ...) are used
+modulo their length: large values just share keys, the hash stays valid.
+"""
+
+from collections.abc import Iterable, Sequence
+from functools import cache
+from random import Random
+from typing import TYPE_CHECKING, NamedTuple
+
+from .moves import MoveType
+from .types import FallDirection, Tile, color_index, direction_index, tile_index
+
+if TYPE_CHECKING:
+    from .game import Cell, Decision, Player
+
+SEED = 0x746E67
+
+MAX_PLAYERS = 8
+MAX_NERVES = 16
+MAX_DRAW_INDEX = 128
+MAX_PHASES_DEPTH = 16
+MAX_PHASES = 16
+MAX_DECISIONS = 8
+
+all_move_types = list(MoveType)
+move_type_index = {m: idx for idx, m in enumerate(all_move_types)}
+
+fall_direction_code = {None: 0, FallDirection.row: 1, FallDirection.column: 2}
+
+
+class ZobristKeys(NamedTuple):
+    edge_length: int
+
+    # cell index -> tile code * 4 + direction index, tile code 0 for no tile
+    # else tile index + 1
+    cells: tuple[tuple[int, ...], ...]
+    # cell index -> color index
+    occupants: tuple[tuple[int, ...], ...]
+
+    # player slot (index in Game.players) -> key, XORed in when the flag is set
+    has_key: tuple[int, ...]
+    has_light: tuple[int, ...]
+    falling: tuple[int, ...]
+    # player slot -> value -> key
+    nerves: tuple[tuple[int, ...], ...]
+    pos: tuple[tuple[int, ...], ...]  # cell index, or board size for no position
+    fall_direction: tuple[tuple[int, ...], ...]  # see fall_direction_code
+
+    draw_index: tuple[int, ...]
+    turn: tuple[int, ...]
+    # depth in the phases stack -> phase index
+    phases: tuple[tuple[int, ...], ...]
+    # position in the list -> color index -> move type index
+    decisions: tuple[tuple[tuple[int, ...], ...], ...]
+    no_decisions: int
+    last_placed_tile: tuple[int, ...]  # cell index
+    # position in the deck -> tile index
+    tile_holder: tuple[tuple[int, ...], ...]
+
+
+@cache
+def zobrist_keys(edge_length: int) -> ZobristKeys:
+    random = Random(SEED + edge_length)
+    size = edge_length * edge_length
+
+    def keys(n: int) -> tuple[int, ...]:
+        return tuple(random.getrandbits(64) for _ in range(n))
+
+    def table(rows: int, n: int) -> tuple[tuple[int, ...], ...]:
+        return tuple(keys(n) for _ in range(rows))
+
+    return ZobristKeys(
+        edge_length=edge_length,
+        cells=table(size, (len(tile_index) + 1) * len(direction_index)),
+        occupants=table(size, len(color_index)),
+        has_key=keys(MAX_PLAYERS),
+        has_light=keys(MAX_PLAYERS),
+        falling=keys(MAX_PLAYERS),
+        nerves=table(MAX_PLAYERS, MAX_NERVES),
+        pos=table(MAX_PLAYERS, size + 1),
+        fall_direction=table(MAX_PLAYERS, len(fall_direction_code)),
+        draw_index=keys(MAX_DRAW_INDEX),
+        turn=keys(MAX_PLAYERS),
+        phases=table(MAX_PHASES_DEPTH, MAX_PHASES),
+        decisions=tuple(table(len(color_index), len(all_move_types)) for _ in range(MAX_DECISIONS)),
+        no_decisions=random.getrandbits(64),
+        last_placed_tile=keys(size),
+        tile_holder=table(MAX_DRAW_INDEX, len(tile_index)),
+    )
+
+
+def tile_key(keys: ZobristKeys, idx: int, tile: Tile | None, direction_idx: int) -> int:
+    code = 0 if tile is None else tile_index[tile] + 1
+
+    return keys.cells[idx][code * len(direction_index) + direction_idx]
+
+
+def cell_key(keys: ZobristKeys, idx: int, cell: 'Cell') -> int:
+    r = tile_key(keys, idx, cell.tile, direction_index[cell.direction])
+    occupants = keys.occupants[idx]
+
+    for c in cell.players:
+        r ^= occupants[color_index[c]]
+
+    return r
+
+
+def cells_key(keys: ZobristKeys, cells: Iterable['Cell']) -> int:
+    r = 0
+
+    for idx, cell in enumerate(cells):
+        r ^= cell_key(keys, idx, cell)
+
+    return r
+
+
+def player_key(keys: ZobristKeys, slot: int, p: 'Player') -> int:
+    pos = keys.pos[slot]
+    r = (
+        keys.nerves[slot][p.nerves % MAX_NERVES]
+        ^ (pos[-1] if p.pos is None else pos[p.pos.idx(keys.edge_length)])
+        ^ keys.fall_direction[slot][fall_direction_code[p.fall_direction]]
+    )
+
+    if p.has_key:
+        r ^= keys.has_key[slot]
+
+    if p.has_light:
+        r ^= keys.has_light[slot]
+
+    if p.falling:
+        r ^= keys.falling[slot]
+
+    return r
+
+
+def decisions_key(keys: ZobristKeys, decisions: Sequence['Decision'] | None) -> int:
+    if decisions is None:
+        return keys.no_decisions
+
+    r = 0
+
+    for i, d in enumerate(decisions):
+        r ^= keys.decisions[i % MAX_DECISIONS][color_index[d.player]][move_type_index[d.action]]
+
+    return r
+
+
+def tile_holder_key(keys: ZobristKeys, tile_holder: Sequence[Tile]) -> int:
+    r = 0
+
+    for i, t in enumerate(tile_holder):
+        r ^= keys.tile_holder[i % MAX_DRAW_INDEX][tile_index[t]]
+
+    return r
@@ -0,0 +1,178 @@
+"""
+Microbenchmarks of the engine hot primitives, on seeded mid-game boards.
+
+Results are written as JSON (per benchmark: best and median time per call,
+in nanoseconds) and can be compared with a previous run:
+
+    python benchmark.py --output new.json --compare old.json
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import timeit
+
+from collections.abc import Callable
+from random import Random
+
+from tng.game.factory import GameFactory
+from tng.game.game import Game
+from tng.game.monsters import AttackingMonsters
+from tng.game.moves import Move
+from tng.game.types import Direction, PlayerColor, Position, Tile
+
+mid_game_tiles = [
+    Tile.t_passage,
+    Tile.t_passage,
+    Tile.four_way_passage,
+    Tile.straight_passage,
+    Tile.key,
+    Tile.gate,
+    Tile.wax_eater,
+    Tile.pit,
+]
+
+
+def mid_game(seed: int) -> Game:
+    """
+    A 4 players game where every player stands, candle lit, on a passage.
+    The board is tiled at random, then unlit tiles are dropped, as they
+    are during a match.
+    """
+
+    random = Random(seed)
+    game = GameFactory(random).new_game(
+        PlayerColor.red, PlayerColor.blue, PlayerColor.green, PlayerColor.purple
+    )
+
+    n = game.board.edge_length
+    board = game.board
+
+    for idx in range(n * n):
+        if random.random() < 0.6:
+            board = board.place_tile(
+                Position(idx % n, idx // n),
+                random.choice(mid_game_tiles),
+                random.choice(list(Direction)),
+            )
+
+    players = []
+
+    for p, idx in zip(game.players, random.sample(range(n * n), len(game.players))):
+        pos = Position(idx % n, idx // n)
+
+        board = board.place_tile(pos, Tile.four_way_passage).move_player(p.color, None, pos)
+        players.append(p._replace(pos=pos))
+
+    game = game._replace(board=board, players=players, draw_index=20, lit=(1 << n * n) - 1)
+
+    return game.rehash().refresh_lighting()
+
+
+def benchmarks(game: Game) -> dict[str, Callable[[], object]]:
+    board = game.board
+    red = game.players[0]
+    pos = red.pos
+
+    assert pos is not None
+
+    free = next(
+        Position(idx % board.edge_length, idx // board.edge_length)
+        for idx, cell in enumerate(board.cells)
+        if cell.tile is None
+    )
+    cell = board.at(pos)
+    monsters = AttackingMonsters(board)
+    move_json = '{"player":"red","param":{"move":"crawl","direction":"e"}}'
+    factory = GameFactory(Random(0))
+
+    return {
+        'board.place_tile': lambda: board.place_tile(free, Tile.t_passage, Direction.e),
+        'board.move_player': lambda: board.move_player(red.color, pos, free),
+        'board.visible_cells_from': lambda: board.visible_cells_from(pos),
+        'cell.open_directions': lambda: cell.open_directions(),
+        'game.is_enlightened': lambda: game.is_enlightened(pos),
+        'game.refresh_lighting': lambda: game.refresh_lighting(),
+        'monsters.trigger_monsters': lambda: monsters.trigger_monsters(pos),
+        'factory.new_game': lambda: factory.new_game(
+            PlayerColor.red, PlayerColor.blue, PlayerColor.green, PlayerColor.purple
+        ),
+        'move.model_validate_json': lambda: Move.model_validate_json(move_json),
+    }
+
+
+def run(seeds: int, repeat: int, selected: list[str] | None = None) -> dict:
+    results: dict[str, dict[str, float]] = {}
+    games = [mid_game(seed) for seed in range(seeds)]
+
+    for name in benchmarks(games[0]):
+        if selected and name not in selected:
+            continue
+
+        samples: list[float] = []
+
+        for game in games:
+            timer = timeit.Timer(benchmarks(game)[name])
+            number, _ = timer.autorange()
+
+            samples.extend(t / number * 1e9 for t in timer.repeat(repeat, number))
+
+        results[name] = {
+            'best_ns': min(samples),
+            'median_ns': statistics.median(samples),
+        }
+
+    return {
+        'python': sys.version,
+        'platform': platform.platform(),
+        'seeds': seeds,
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def compare(new: dict, old: dict) -> str:
+    lines = []
+
+    for name, r in new['results'].items():
+        before = old['results'].get(name)
+
+        if before is None:
+            lines.append(f'{name:30} {r["median_ns"]:12.0f} ns  (new)')
+            continue
+
+        ratio = r['median_ns'] / before['median_ns']
+
+        lines.append(f'{name:30} {r["median_ns"]:12.0f} ns  x{ratio:.2f}')
+
+    return '\n'.join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='engine microbenchmarks')
+    parser.add_argument('--seeds', type=int, default=5, help='mid-game boards to run on')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='JSON file, default stdout')
+    parser.add_argument('--compare', help='JSON file of a previous run')
+    parser.add_argument('benchmark', nargs='*', help='run just these')
+
+    args = parser.parse_args()
+
+    report = run(args.seeds, args.repeat, args.benchmark)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            print(compare(report, json.load(f)), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""
+Exports archived matches as .npy columns (see tng.be.export), then
+prints their summary as JSON if numpy is installed.
+
+Usage:
+    python export_matches.py --archive data/archive --out export
+"""
+
+import argparse
+import json
+
+from tng.be.archive import Archive
+from tng.be.export import export, summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='columnar export of matches')
+    parser.add_argument('--archive', required=True, help='archive directory')
+    parser.add_argument('--out', required=True)
+
+    args = parser.parse_args()
+
+    archive = Archive(args.archive, readonly=True)
+
+    try:
+        count = export(archive.records(), args.out)
+
+    finally:
+        archive.close()
+
+    print(f'{count} matches exported to {args.out}')
+
+    try:
+        print(json.dumps(summary(args.out), indent=2))
+
+    except ImportError:
+        print('install numpy for the summary')
+
+
+if __name__ == '__main__':
+    main()
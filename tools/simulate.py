@@ -0,0 +1,213 @@
+"""
+Headless self-play: plays many matches with a random (or custom) policy,
+spreading them over a process pool, and reports games per second and how
+matches ended.
+
+The engine has no winning rule yet and not all of its dead ends end the
+match: besides the lost ones, matches mostly end stuck, with no legal
+move, reported by the phase they got stuck in.
+
+Usage:
+    python simulate.py --games 100000 --players 4
+"""
+
+import argparse
+import os
+import time
+
+from collections import Counter
+from collections.abc import Callable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from random import Random
+from typing import NamedTuple
+
+from tng.game.factory import GameFactory
+from tng.game.fsm import TNGFSM
+from tng.game.game import Game, Phase
+from tng.game.moves import Move
+from tng.game.types import PlayerColor
+
+# chooses the next move among the legal ones
+type Policy = Callable[[Game, Sequence[Move], Random], Move]
+
+
+def random_policy(game: Game, moves: Sequence[Move], random: Random) -> Move:
+    return random.choice(moves)
+
+
+class Playout(NamedTuple):
+    # won, lost, stuck in <phase> (no legal move), too_long, or error: the
+    # engine failed (see error)
+    outcome: str
+    moves: int
+    error: str | None
+
+
+class Report(NamedTuple):
+    games: int
+    seconds: float
+    # of the games played without engine errors
+    outcomes: Counter[str]
+    moves: int
+    # engine errors, by message
+    errors: Counter[str]
+
+    @property
+    def games_per_second(self) -> float:
+        return self.games / self.seconds if self.seconds else 0.0
+
+    @property
+    def ended(self) -> int:
+        return self.outcomes.total()
+
+    def __str__(self) -> str:
+        lines = [
+            f'games: {self.games} in {self.seconds:.2f}s ({self.games_per_second:.1f} games/s)',
+            f'moves: {self.moves} ({self.moves / max(self.games, 1):.1f} per game)',
+            f'ended: {self.ended}',
+        ]
+
+        for outcome, count in self.outcomes.most_common():
+            lines.append(f'  {outcome}: {count} ({100 * count / max(self.ended, 1):.1f}%)')
+
+        if self.errors:
+            errors = self.errors.total()
+
+            lines.append(f'ENGINE ERRORS: {errors} games ({100 * errors / self.games:.1f}%)')
+
+            for error, count in self.errors.most_common(10):
+                lines.append(f'  {count} x {error}')
+
+        return '\n'.join(lines)
+
+
+def playout(
+    seed: int,
+    colors: Sequence[PlayerColor],
+    max_moves: int = 2000,
+    policy: Policy = random_policy,
+) -> Playout:
+    random = Random(seed)
+    fsm = TNGFSM()
+    game = GameFactory(random).new_game(*colors)
+
+    for played in range(max_moves):
+        if game.current_phase is Phase.game_won:
+            return Playout('won', played, None)
+
+        if game.current_phase is Phase.game_lost:
+            return Playout('lost', played, None)
+
+        try:
+            moves = list(fsm.legal_moves(game))
+
+            if not moves:
+                return Playout(f'stuck in {game.current_phase.value}', played, None)
+
+            next_game = fsm.apply(game, policy(game, moves, random))
+
+        except Exception as e:
+            # legal moves are never illegal, any exception denotes an engine bug:
+            # report it and go on with the next match
+            return Playout('error', played, f'{game.current_phase.value}: {type(e).__name__}: {e}')
+
+        if next_game is None:
+            return Playout('error', played, f'{game.current_phase.value}: no game returned')
+
+        game = next_game
+
+    return Playout('too_long', max_moves, None)
+
+
+def play_batch(
+    seeds: range,
+    colors: Sequence[PlayerColor],
+    max_moves: int,
+    policy: Policy = random_policy,
+) -> tuple[Counter[str], int, Counter[str]]:
+    outcomes: Counter[str] = Counter()
+    errors: Counter[str] = Counter()
+    moves = 0
+
+    for seed in seeds:
+        p = playout(seed, colors, max_moves, policy)
+
+        moves += p.moves
+
+        if p.error is not None:
+            errors[p.error] += 1
+
+        else:
+            outcomes[p.outcome] += 1
+
+    return outcomes, moves, errors
+
+
+def simulate(
+    games: int,
+    colors: Sequence[PlayerColor],
+    *,
+    seed: int = 0,
+    workers: int | None = None,
+    batch_size: int = 500,
+    max_moves: int = 2000,
+    policy: Policy = random_policy,
+) -> Report:
+    """
+    Plays games matches, seeds seed .. seed + games - 1, in batches spread
+    over a pool of workers processes (default: one per core).
+
+    The policy must be picklable, ie. a module level function.
+    """
+
+    batches = [
+        range(s, min(s + batch_size, seed + games)) for s in range(seed, seed + games, batch_size)
+    ]
+
+    outcomes: Counter[str] = Counter()
+    errors: Counter[str] = Counter()
+    moves = 0
+
+    started = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(play_batch, b, colors, max_moves, policy) for b in batches]
+
+        for f in futures:
+            o, m, e = f.result()
+
+            outcomes.update(o)
+            errors.update(e)
+            moves += m
+
+    return Report(games, time.perf_counter() - started, outcomes, moves, errors)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='random self-play')
+    parser.add_argument('--games', type=int, default=10000)
+    parser.add_argument('--players', type=int, choices=[4, 5], default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--max-moves', type=int, default=2000)
+
+    args = parser.parse_args()
+
+    report = simulate(
+        args.games,
+        list(PlayerColor)[: args.players],
+        seed=args.seed,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        max_moves=args.max_moves,
+    )
+
+    print(report)
+
+    if report.errors:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()